@@ -1,8 +1,9 @@
-from flask import Flask
+from flask import Flask, jsonify, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_cors import CORS
 import logging
+import time
 import os
 from datetime import datetime
 
@@ -13,6 +14,7 @@ login_manager = LoginManager()
 
 def create_app(config_name='development'):
     """Application factory function"""
+    started = time.perf_counter()
     app = Flask(__name__)
 
     # Load configuration
@@ -24,6 +26,56 @@ def create_app(config_name='development'):
     login_manager.init_app(app)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+    from app.services.encoding_cache import encoding_cache
+    encoding_cache.init_app(app)
+
+    from app.services.image_cache import image_cache
+    image_cache.init_app(app)
+
+    from app.services.recognition_engine import recognition_engine, EngineBusyError
+    recognition_engine.init_app(app)
+
+    from app.services.session_state import session_states
+    session_states.init_app(app)
+
+    from app.services.session_events import session_events
+    session_events.init_app(app)
+
+    from app.services.capture_jobs import capture_jobs
+    capture_jobs.init_app(app)
+
+    from app.services.capture_recorder import capture_recorder
+    capture_recorder.init_app(app)
+
+    from app.services.metrics import metrics, server_timing
+    metrics.init_app(app)
+
+    from app.services.flight_recorder import flight_recorder
+    flight_recorder.init_app(app)
+
+    from app.services.student_index import student_index
+    student_index.init_app(app)
+
+    @app.errorhandler(EngineBusyError)
+    def engine_busy(error):
+        """Antrian recognition penuh - client diminta retry"""
+        response = jsonify({
+            'error': 'Service Busy',
+            'message': str(error),
+            'retry_after': error.retry_after
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
+
+    @app.after_request
+    def add_server_timing(response):
+        """Durasi per stage request capture/encode di header Server-Timing"""
+        timer = g.get('stage_timer')
+        if timer is not None:
+            response.headers['Server-Timing'] = server_timing(timer.stages, timer.elapsed_ms())
+        return response
+
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Silakan login terlebih dahulu'
@@ -38,13 +90,18 @@ def create_app(config_name='development'):
     setup_logging(app)
 
     # Register blueprints
-    from app.routes import auth_bp, lecturer_bp, student_bp, attendance_bp, face_api_bp, report_bp
+    from app.routes import auth_bp, lecturer_bp, student_bp, attendance_bp, face_api_bp, report_bp, metrics_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(lecturer_bp)
     app.register_blueprint(student_bp)
     app.register_blueprint(attendance_bp)
     app.register_blueprint(face_api_bp)
     app.register_blueprint(report_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
 
     # Shell context for flask shell
     @app.shell_context_processor
@@ -64,46 +121,24 @@ def create_app(config_name='development'):
             'AttendanceRecord': AttendanceRecord
         }
 
-    # Create tables
-    with app.app_context():
-        # Check if tables exist before creating by attempting to reflect the database
-        from sqlalchemy import text
-        try:
-            # Try to query the sqlite_master table to see if our tables exist
-            result = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table';"))
-            tables = [row[0] for row in result.fetchall()]
-            if 'users' not in tables:  # If main table doesn't exist, assume none exist
-                db.create_all()
-                print("✓ Tables created successfully")
-            else:
-                print(f"✓ Tables already exist: {tables}")
-        except:
-            # If we can't query sqlite_master, try creating tables but ignore errors
+    # Bootstrap database (tabel + admin default) di development/testing; production
+    # menjalankan `flask init-db` sekali saat deploy, bukan di setiap worker
+    if app.config.get('AUTO_INIT_DB', False):
+        from app.cli import init_database
+        with app.app_context():
             try:
-                db.create_all()
-                print("✓ Tables created successfully")
-            except:
-                print("✓ Tables already exist, skipping creation")
-
-        # Create default admin user jika belum ada
-        try:
-            from app.models.user import User
-            admin_user = User.query.filter_by(username='admin').first()
-            if not admin_user:
-                admin = User(
-                    username='admin',
-                    email='admin@attendance.local',
-                    name='Administrator',
-                    role='admin'
-                )
-                admin.set_password('admin123')
-                db.session.add(admin)
-                db.session.commit()
-                print("✓ Default admin user created (admin/admin123)")
-            else:
-                print("✓ Admin user already exists")
-        except Exception as e:
-            print(f"! Error creating admin user: {str(e)}")
+                created, added, admin_created = init_database()
+                if created:
+                    print(f"✓ Tables created: {', '.join(created)}")
+                if added:
+                    print(f"✓ Columns added to students: {', '.join(added)}")
+                if admin_created:
+                    print("✓ Default admin user created (admin/admin123)")
+            except Exception as e:
+                print(f"! Error init database: {str(e)}")
+
+    app.extensions['startup'] = {'create_app_ms': round((time.perf_counter() - started) * 1000.0, 1)}
+    app.logger.info(f"✓ App siap dalam {app.extensions['startup']['create_app_ms']:.0f} ms")
 
     return app
 
@@ -0,0 +1,649 @@
+import click
+from flask.cli import with_appcontext
+import json
+from sqlalchemy import inspect as sa_inspect, text
+from app import db
+
+
+def register_commands(app):
+    """Daftarkan custom flask CLI commands"""
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_encodings_command)
+    app.cli.add_command(evaluate_index_command)
+    app.cli.add_command(enroll_photos_command)
+    app.cli.add_command(reencode_encodings_command)
+    app.cli.add_command(benchmark_detectors_command)
+
+
+def _ensure_column(table, column, column_type):
+    """Tambah kolom ke tabel yang sudah ada jika belum ada (create_all tidak melakukan ALTER)"""
+    columns = {col['name'] for col in sa_inspect(db.engine).get_columns(table)}
+    if column in columns:
+        return False
+
+    type_sql = column_type.compile(dialect=db.engine.dialect)
+    with db.engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {type_sql}'))
+    return True
+
+
+# Kolom students yang ditambahkan setelah tabel dibuat (binary encoding, gallery, model re-encode)
+_STUDENT_COLUMNS = (
+    ('face_encoding_blob', db.LargeBinary()),
+    ('face_gallery_blob', db.LargeBinary()),
+    ('encoding_model', db.String(32)),
+    ('face_encoding_next_blob', db.LargeBinary()),
+    ('encoding_model_next', db.String(32)),
+)
+
+
+def ensure_student_columns():
+    """
+    Tambah kolom students yang belum ada di database lama (idempotent)
+
+    Returns:
+        list: nama kolom yang baru ditambahkan
+    """
+    return [column for column, column_type in _STUDENT_COLUMNS
+            if _ensure_column('students', column, column_type)]
+
+
+def init_database(admin_password='admin123'):
+    """
+    Buat tabel yang belum ada, tambah kolom students yang belum ada (database
+    dari versi sebelumnya) dan user admin default (idempotent)
+
+    Returns:
+        tuple: (list nama tabel yang baru dibuat, list kolom yang ditambahkan,
+        apakah admin baru dibuat)
+    """
+    from app.models.user import User
+
+    existing = set(sa_inspect(db.engine).get_table_names())
+    db.create_all()
+    created = sorted(set(sa_inspect(db.engine).get_table_names()) - existing)
+    added = ensure_student_columns()
+
+    if User.query.filter_by(username='admin').first():
+        return created, added, False
+
+    admin = User(
+        username='admin',
+        email='admin@attendance.local',
+        name='Administrator',
+        role='admin'
+    )
+    admin.set_password(admin_password)
+    db.session.add(admin)
+    db.session.commit()
+    return created, added, True
+
+
+@click.command('init-db')
+@click.option('--admin-password', envvar='ADMIN_PASSWORD', default='admin123', show_default=True,
+              help='Password user admin jika belum ada')
+@with_appcontext
+def init_db_command(admin_password):
+    """Buat tabel database, kolom baru dan user admin default (setiap deploy, aman diulang)"""
+    created, added, admin_created = init_database(admin_password)
+    click.echo(f"✓ Tabel dibuat: {', '.join(created)}" if created else "✓ Semua tabel sudah ada")
+    for column in added:
+        click.echo(f'✓ Kolom students.{column} ditambahkan')
+    click.echo("✓ User admin dibuat" if admin_created else "✓ User admin sudah ada")
+
+
+@click.command('migrate-encodings')
+@click.option('--batch-size', default=500, show_default=True, help='Jumlah row per transaksi')
+@click.option('--keep-json', is_flag=True, help='Jangan kosongkan kolom JSON lama setelah konversi')
+@click.option('--vacuum', is_flag=True, help='Jalankan VACUUM setelah migrasi (SQLite)')
+@with_appcontext
+def migrate_encodings_command(batch_size, keep_json, vacuum):
+    """Konversi face_encoding_json ke kolom binary face_encoding_blob secara batch"""
+    from app.models.student import Student
+    from app.services.encoding_codec import pack_encoding
+    from app.services.encoding_cache import encoding_cache
+
+    for column in ensure_student_columns():
+        click.echo(f'✓ Kolom students.{column} ditambahkan')
+
+    converted = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.query(Student.id, Student.face_encoding_json).filter(
+            Student.id > last_id,
+            Student.face_encoding_json.isnot(None),
+            Student.face_encoding_blob.is_(None)
+        ).order_by(Student.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        mappings = []
+        for row_id, encoding_json in rows:
+            last_id = row_id
+            try:
+                encoding = json.loads(encoding_json)
+                if len(encoding) != 128:
+                    raise ValueError(f'dimensi {len(encoding)}')
+            except (json.JSONDecodeError, TypeError, ValueError) as e:
+                failed += 1
+                click.echo(f'✗ Student {row_id}: encoding JSON tidak valid ({e})', err=True)
+                continue
+
+            mapping = {'id': row_id, 'face_encoding_blob': pack_encoding(encoding)}
+            if not keep_json:
+                mapping['face_encoding_json'] = None
+            mappings.append(mapping)
+
+        db.session.bulk_update_mappings(Student, mappings)
+        db.session.commit()
+        converted += len(mappings)
+        click.echo(f'  ... {converted} encoding dikonversi')
+
+    # bulk_update_mappings tidak melewati event ORM
+    encoding_cache.clear()
+
+    if vacuum and db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+        click.echo('✓ VACUUM selesai')
+
+    click.echo(f'✓ Migrasi selesai: {converted} dikonversi, {failed} gagal')
+
+
+def _percentile_ms(samples, q):
+    import numpy as np
+    return float(np.percentile(np.asarray(samples) * 1000.0, q)) if samples else 0.0
+
+
+@click.command('evaluate-index')
+@click.option('--synthetic', default=0, type=int, help='Pakai N encoding sintetis (0 = encoding dari database)')
+@click.option('--queries', default=500, show_default=True, help='Jumlah query')
+@click.option('--noise', default=0.03, show_default=True, help='Std noise per dimensi pada query')
+@click.option('--lists', default=None, type=int, help='Jumlah partisi (default VECTOR_INDEX_LISTS)')
+@click.option('--pca-dim', default=None, type=int, help='Dimensi PCA (default VECTOR_INDEX_PCA_DIM)')
+@click.option('--probes', default='1,2,4,8,16,32,64', show_default=True, help='Daftar n_probe yang diuji')
+@click.option('--seed', default=0, show_default=True)
+@with_appcontext
+def evaluate_index_command(synthetic, queries, noise, lists, pca_dim, probes, seed):
+    """Ukur recall@1 dan latency index ANN dibanding exact search untuk memilih parameter"""
+    import time
+    import numpy as np
+    from flask import current_app
+    from app.models.student import Student
+    from app.services.vector_index import IVFIndex
+
+    rng = np.random.default_rng(seed)
+    if synthetic:
+        matrix = rng.normal(0.0, 0.1, size=(synthetic, 128)).astype(np.float32)
+    else:
+        _, matrix = Student.load_encodings()
+    if len(matrix) == 0:
+        raise click.ClickException('Tidak ada encoding untuk dievaluasi')
+
+    ids = np.arange(len(matrix))
+    lists = current_app.config.get('VECTOR_INDEX_LISTS', 0) if lists is None else lists
+    pca_dim = current_app.config.get('VECTOR_INDEX_PCA_DIM', 32) if pca_dim is None else pca_dim
+
+    started = time.perf_counter()
+    index = IVFIndex(n_lists=lists, pca_dim=pca_dim, seed=seed)
+    index.build(ids, matrix)
+    sizes = index.list_sizes()
+    click.echo(f'Index: {len(index)} encoding, {len(sizes)} partisi (max {max(sizes)}), '
+               f'PCA {pca_dim or "-"}, build {(time.perf_counter() - started):.2f} s')
+
+    # Query = encoding yang diberi noise (foto lain dari orang yang sama)
+    sources = rng.integers(0, len(matrix), size=queries)
+    query_matrix = matrix[sources] + rng.normal(0.0, noise, size=(queries, 128)).astype(np.float32)
+
+    sq_norms = np.einsum('ij,ij->i', matrix, matrix)
+    truth = np.empty(queries, dtype=np.int64)
+    exact_times = []
+    for i, query in enumerate(query_matrix):
+        t0 = time.perf_counter()
+        truth[i] = int(np.argmin(sq_norms - 2.0 * matrix @ query))
+        exact_times.append(time.perf_counter() - t0)
+
+    click.echo(f'{"n_probe":>8} {"recall@1":>9} {"p50 ms":>8} {"p99 ms":>8}')
+    click.echo(f'{"exact":>8} {1.0:>9.3f} {_percentile_ms(exact_times, 50):>8.3f} '
+               f'{_percentile_ms(exact_times, 99):>8.3f}')
+
+    for n_probe in [int(p) for p in probes.split(',') if p.strip()]:
+        if n_probe > len(sizes):
+            continue
+        hits = 0
+        times = []
+        for i, query in enumerate(query_matrix):
+            t0 = time.perf_counter()
+            found, _ = index.search(query, 1, n_probe=n_probe)
+            times.append(time.perf_counter() - t0)
+            hits += int(len(found) > 0 and found[0] == truth[i])
+        click.echo(f'{n_probe:>8} {hits / queries:>9.3f} {_percentile_ms(times, 50):>8.3f} '
+                   f'{_percentile_ms(times, 99):>8.3f}')
+
+
+# Keterangan status foto di ringkasan enroll-photos
+_ENROLL_FAILURES = {
+    'no_face': 'tidak ada wajah terdeteksi',
+    'multiple_faces': 'lebih dari satu wajah',
+    'invalid_image': 'file bukan image yang valid',
+    'unmapped': 'tidak ada di mapping NIM',
+    'unknown_nim': 'NIM tidak terdaftar',
+    'error': 'error saat diproses',
+}
+
+
+@click.command('enroll-photos')
+@click.argument('source', type=click.Path(exists=True))
+@click.option('--mapping', type=click.Path(exists=True, dir_okay=False),
+              help='CSV filename,nim (default: NIM = nama file tanpa ekstensi)')
+@click.option('--workers', default=0, show_default=True, help='Jumlah worker process (0 = jumlah CPU)')
+@click.option('--batch-size', default=100, show_default=True, help='Jumlah foto per transaksi')
+@click.option('--checkpoint', default=None, help='File checkpoint (default <source>.enroll-checkpoint.jsonl)')
+@click.option('--overwrite', is_flag=True, help='Daftarkan ulang mahasiswa yang sudah punya face encoding')
+@click.option('--allow-multiple', is_flag=True, help='Pakai wajah terbesar jika foto berisi beberapa wajah')
+@click.option('--retry-failed', is_flag=True, help='Proses ulang foto yang gagal di run sebelumnya')
+@with_appcontext
+def enroll_photos_command(source, mapping, workers, batch_size, checkpoint, overwrite, allow_multiple, retry_failed):
+    """Daftarkan wajah mahasiswa massal dari direktori atau zip foto"""
+    import multiprocessing
+    import os
+    import time
+    from collections import Counter
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from flask import current_app
+    from app.models.student import Student
+    from app.services.bulk_enrollment import (
+        PhotoSource, Checkpoint, BulkEnrollmentService, load_mapping, resolve_nim, encode_photo_task
+    )
+    from app.services.face_recognition_service import FaceRecognitionService
+    from app.services.recognition_engine import _init_worker
+
+    nim_mapping = load_mapping(mapping) if mapping else None
+    checkpoint = Checkpoint(
+        checkpoint or f'{os.path.basename(os.path.normpath(source))}.enroll-checkpoint.jsonl'
+    )
+    photo_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'student_photos')
+    options = FaceRecognitionService._encode_options(1.0, profile='enroll')
+
+    enrolled = Student.face_encoding_blob.isnot(None) | Student.face_encoding_json.isnot(None)
+    students = {
+        nim: (row_id, has_encoding) for row_id, nim, has_encoding in
+        db.session.query(Student.id, Student.student_id, enrolled)
+    }
+
+    statuses = Counter()
+    pending_entries = []
+    todo = []
+
+    with PhotoSource(source) as photos:
+        names = photos.names()
+        for name in names:
+            if checkpoint.is_done(name, retry_failed):
+                statuses['resumed'] += 1
+                continue
+
+            nim = resolve_nim(name, nim_mapping)
+            entry = {'file': name, 'nim': nim}
+            if nim is None:
+                entry['status'] = 'unmapped'
+            elif nim not in students:
+                entry['status'] = 'unknown_nim'
+            elif students[nim][1] and not overwrite:
+                entry['status'] = 'skipped'
+            else:
+                todo.append((name, nim, students[nim][0]))
+                continue
+            pending_entries.append(entry)
+
+        workers = min(workers or os.cpu_count() or 1, max(1, len(todo)))
+        click.echo(f'{len(names)} foto: {statuses["resumed"]} sudah diproses (checkpoint), '
+                   f'{len(todo)} akan di-encode dengan {workers} worker')
+
+        started = time.perf_counter()
+        enrolled_ids = set()
+        ready = []
+        processed = 0
+
+        def report(entries):
+            for entry in entries:
+                statuses[entry['status']] += 1
+                if entry['status'] in _ENROLL_FAILURES:
+                    detail = f' ({entry["faces"]} wajah)' if entry.get('faces', 0) > 1 else ''
+                    click.echo(f'✗ {entry["file"]}: {_ENROLL_FAILURES[entry["status"]]}{detail}', err=True)
+
+        def flush():
+            nonlocal ready, pending_entries
+            entries = []
+            if ready:
+                try:
+                    entries = BulkEnrollmentService.save_batch(
+                        ready, photo_dir, enrolled_ids, FaceRecognitionService.encoding_model(options)
+                    )
+                except Exception as e:
+                    # Tidak dicatat di checkpoint supaya diproses ulang di run berikutnya
+                    click.echo(f'✗ Batch {len(ready)} foto gagal disimpan: {e}', err=True)
+                    statuses['error'] += len(ready)
+            entries.extend(pending_entries)
+            checkpoint.append(entries)
+            report(entries)
+            ready, pending_entries = [], []
+
+            elapsed = time.perf_counter() - started
+            click.echo(f'  ... {processed}/{len(todo)} foto ({processed / elapsed if elapsed else 0.0:.1f} foto/s), '
+                       f'{statuses["ok"]} terdaftar, '
+                       f'{sum(statuses[status] for status in _ENROLL_FAILURES)} gagal')
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(1,)
+        )
+        try:
+            queue = iter(todo)
+            in_flight = {}
+            while True:
+                # Jumlah foto di memory dibatasi, tidak semua di-submit sekaligus
+                while len(in_flight) < workers * 4:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    image_bytes = photos.read(item[0])
+                    future = executor.submit(encode_photo_task, image_bytes, options, allow_multiple)
+                    in_flight[future] = item + (image_bytes,)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, nim, student_id, image_bytes = in_flight.pop(future)
+                    processed += 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Error worker tidak dicatat di checkpoint supaya diproses ulang
+                        statuses['error'] += 1
+                        click.echo(f'✗ {name}: {_ENROLL_FAILURES["error"]} ({e})', err=True)
+                        continue
+
+                    if result['status'] == 'ok':
+                        ready.append({
+                            'file': name, 'nim': nim, 'student_id': student_id,
+                            'encoding': result['encoding'], 'image_bytes': image_bytes
+                        })
+                    else:
+                        pending_entries.append({
+                            'file': name, 'nim': nim, 'status': result['status'], 'faces': result.get('faces', 0)
+                        })
+
+                if len(ready) + len(pending_entries) >= batch_size:
+                    flush()
+
+            if ready or pending_entries or not todo:
+                flush()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    click.echo(f'✓ Enrollment selesai dalam {elapsed:.1f} s '
+               f'({processed / elapsed if elapsed else 0.0:.1f} foto/s): '
+               f'{statuses["ok"]} terdaftar, {statuses["gallery"]} ke gallery, '
+               f'{statuses["skipped"]} dilewati, {statuses["resumed"]} dari checkpoint')
+    for status, description in _ENROLL_FAILURES.items():
+        if statuses[status]:
+            click.echo(f'  {description}: {statuses[status]}')
+
+
+@click.command('reencode-encodings')
+@click.option('--class-id', 'class_ids', multiple=True, type=int, help='Hanya kelas ini (bisa diulang)')
+@click.option('--workers', default=1, show_default=True, help='Jumlah worker process (nice, prioritas rendah)')
+@click.option('--rate', default=2.0, show_default=True, help='Maksimum foto per detik (0 = tanpa batas)')
+@click.option('--chunk-size', default=50, show_default=True, help='Jumlah encoding per transaksi staging')
+@click.option('--allow-partial', is_flag=True, help='Swap kelas walaupun ada foto yang gagal di-encode ulang')
+@click.option('--dry-run', is_flag=True, help='Hanya tampilkan jumlah mahasiswa per kelas')
+@with_appcontext
+def reencode_encodings_command(class_ids, workers, rate, chunk_size, allow_partial, dry_run):
+    """Encode ulang foto mahasiswa dengan FACE_ENCODING_MODEL/JITTERS sekarang, swap per kelas"""
+    import multiprocessing
+    import os
+    import time
+    from collections import Counter
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from flask import current_app
+    from app.services.bulk_enrollment import encode_photo_task, init_background_worker, BACKGROUND_NICENESS
+    from app.services.face_recognition_service import FaceRecognitionService
+    from app.services.reencode import ReencodeService
+
+    options = FaceRecognitionService._encode_options(1.0, profile='enroll')
+    model = FaceRecognitionService.encoding_model(options)
+    classes = ReencodeService.pending_classes(model, class_ids)
+
+    if not classes:
+        click.echo(f'✓ Semua encoding sudah memakai {model}')
+        return
+
+    click.echo(f'{sum(count for _, count in classes)} mahasiswa di {len(classes)} kelas '
+               f'akan di-encode ulang ke {model}')
+    if dry_run:
+        for class_id, count in classes:
+            click.echo(f'  kelas {class_id}: {count} mahasiswa')
+        return
+
+    root_path = os.path.dirname(current_app.root_path)
+    interval = 1.0 / rate if rate > 0 else 0.0
+    totals = Counter()
+    started = time.perf_counter()
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_background_worker,
+        initargs=(BACKGROUND_NICENESS,)
+    )
+    try:
+        for class_id, count in classes:
+            failures = Counter()
+            staged = []
+            queue = iter(ReencodeService.pending_students(class_id, model))
+            in_flight = {}
+            next_submit = time.monotonic()
+
+            while True:
+                while len(in_flight) < workers * 2:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    student_id, nim, photo_path = item
+                    path = ReencodeService.resolve_photo(photo_path, root_path)
+                    if path is None:
+                        failures['missing_photo'] += 1
+                        click.echo(f'✗ {nim}: foto tidak ditemukan ({photo_path})', err=True)
+                        continue
+
+                    # Throttle supaya capture live tidak kekurangan CPU
+                    delay = next_submit - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_submit = max(next_submit, time.monotonic()) + interval
+
+                    with open(path, 'rb') as f:
+                        future = executor.submit(encode_photo_task, f.read(), options, True)
+                    in_flight[future] = (student_id, nim)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    student_id, nim = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'status': 'error', 'message': str(e)}
+
+                    if result['status'] == 'ok':
+                        staged.append((student_id, result['encoding']))
+                    else:
+                        failures[result['status']] += 1
+                        click.echo(f'✗ {nim}: {result["status"]}', err=True)
+
+                if len(staged) >= chunk_size:
+                    ReencodeService.stage(staged, model)
+                    totals['staged'] += len(staged)
+                    staged = []
+
+            ReencodeService.stage(staged, model)
+            totals['staged'] += len(staged)
+            failed = sum(failures.values())
+            totals['failed'] += failed
+
+            if failed and not allow_partial:
+                totals['held'] += 1
+                click.echo(f'  kelas {class_id}: {failed} foto gagal, swap ditunda (--allow-partial untuk tetap swap)')
+                continue
+
+            if ReencodeService.has_active_session(class_id):
+                # Matrix kelas tidak diganti di tengah sesi, jalankan ulang setelah sesi selesai
+                totals['deferred'] += 1
+                click.echo(f'  kelas {class_id}: sesi absensi aktif, swap ditunda')
+                continue
+
+            swapped = ReencodeService.swap_class(class_id, model)
+            totals['swapped'] += swapped
+            elapsed = time.perf_counter() - started
+            click.echo(f'✓ kelas {class_id}: {swapped} encoding di-swap '
+                       f'({totals["staged"] / elapsed if elapsed else 0.0:.1f} foto/s)')
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    click.echo(f'✓ Re-encode selesai: {totals["swapped"]} di-swap, {totals["failed"]} gagal')
+    if totals['held'] or totals['deferred']:
+        click.echo(f'  {totals["held"] + totals["deferred"]} kelas ditunda: hasil re-encode tersimpan, '
+                   f'jalankan ulang untuk swap')
+
+
+def _read_box_labels(path):
+    """
+    Label ground truth CSV: filename,x,y,width,height (satu baris per wajah, pixel foto asli)
+
+    Baris berisi filename saja menandai foto tanpa wajah.
+
+    Returns:
+        dict: basename -> list of (top, right, bottom, left)
+    """
+    import csv
+    import os
+
+    labels = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            row = [value.strip() for value in row]
+            if not row or not row[0]:
+                continue
+            boxes = labels.setdefault(os.path.basename(row[0]), [])
+            if len(row) < 5 or not row[1]:
+                continue
+            try:
+                x, y, width, height = (float(value) for value in row[1:5])
+            except ValueError:
+                # Header
+                labels.pop(os.path.basename(row[0]), None)
+                continue
+            boxes.append((int(round(y)), int(round(x + width)), int(round(y + height)), int(round(x))))
+    return labels
+
+
+def _display_size(image_bytes):
+    """Ukuran foto (width, height) setelah orientasi EXIF diterapkan"""
+    import io
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as probe:
+        width, height = probe.size
+        # 5-8: foto diputar 90 derajat (exif_transpose menukar width dan height)
+        if probe.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+    return width, height
+
+
+@click.command('benchmark-detectors')
+@click.argument('source', type=click.Path(exists=True))
+@click.option('--labels', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV filename,x,y,width,height per wajah (foto tanpa label dilewati)')
+@click.option('--backends', default='haar,yunet,hog,cnn', show_default=True, help='Backend yang diuji')
+@click.option('--iou', 'min_iou', default=0.5, show_default=True, help='IoU minimum deteksi dengan ground truth')
+@click.option('--max-side', default=480, show_default=True, help='Sisi terpanjang image saat detection')
+@click.option('--limit', default=500, show_default=True, help='Jumlah foto maksimum')
+@with_appcontext
+def benchmark_detectors_command(source, labels, backends, min_iou, max_side, limit):
+    """Bandingkan latency, precision dan recall backend face detector pada foto berlabel"""
+    import os
+    import time
+    import cv2
+    from app.services.bulk_enrollment import PhotoSource, _open_photo
+    from app.services.face_detectors import create_detector, DetectorUnavailable
+    from app.services.face_geometry import match_boxes, scale_box
+    from app.services.face_recognition_service import FaceRecognitionService
+
+    truth_boxes = _read_box_labels(labels)
+
+    images = []
+    with PhotoSource(source) as photos:
+        names = [name for name in photos.names() if os.path.basename(name) in truth_boxes]
+        for name in names[:limit]:
+            try:
+                image_bytes = photos.read(name)
+                width, height = _display_size(image_bytes)
+                image_array = _open_photo(image_bytes)
+            except (OSError, ValueError) as e:
+                click.echo(f'✗ {name}: {e}', err=True)
+                continue
+            scale = min(1.0, max_side / float(max(image_array.shape[:2])))
+            if scale < 1.0:
+                image_array = cv2.resize(image_array, (int(image_array.shape[1] * scale),
+                                                       int(image_array.shape[0] * scale)))
+            # Label dalam pixel foto asli, detection di image yang sudah diperkecil
+            scale_x = image_array.shape[1] / float(width)
+            scale_y = image_array.shape[0] / float(height)
+            boxes = [scale_box(box, scale_x, scale_y) for box in truth_boxes[os.path.basename(name)]]
+            images.append((image_array, boxes))
+
+    if not images:
+        raise click.ClickException('Tidak ada foto berlabel untuk benchmark')
+
+    truth_total = sum(len(boxes) for _, boxes in images)
+    _, detector_params = FaceRecognitionService._detector_options()
+    click.echo(f'{len(images)} foto, {truth_total} wajah berlabel (sisi terpanjang {max_side}px, IoU >= {min_iou})')
+    click.echo(f'{"backend":>8} {"p50 ms":>8} {"p95 ms":>8} {"TP":>6} {"FP":>6} {"FN":>6} '
+               f'{"precision":>9} {"recall":>7}')
+
+    for name in [b.strip() for b in backends.split(',') if b.strip()]:
+        try:
+            detector = create_detector(name, detector_params)
+            detector.detect(images[0][0])  # warm-up (load model)
+        except DetectorUnavailable as e:
+            click.echo(f'{name:>8} tidak tersedia: {e}')
+            continue
+
+        times = []
+        true_positives = false_positives = false_negatives = 0
+        for image_array, boxes in images:
+            t0 = time.perf_counter()
+            detections = detector.detect(image_array)
+            times.append(time.perf_counter() - t0)
+
+            matched = len(match_boxes(detections, boxes, min_iou))
+            true_positives += matched
+            false_positives += len(detections) - matched
+            false_negatives += len(boxes) - matched
+
+        predicted = true_positives + false_positives
+        precision = true_positives / predicted if predicted else 0.0
+        recall = true_positives / truth_total if truth_total else 0.0
+        click.echo(f'{name:>8} {_percentile_ms(times, 50):>8.2f} {_percentile_ms(times, 95):>8.2f} '
+                   f'{true_positives:>6} {false_positives:>6} {false_negatives:>6} '
+                   f'{precision:>9.3f} {recall:>7.3f}')
@@ -0,0 +1,42 @@
+from app import db
+from datetime import datetime
+import json
+
+
+class CaptureJob(db.Model):
+    """Capture job model - frame capture yang diproses async, hasilnya diambil dengan polling"""
+    __tablename__ = 'capture_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    session_id = db.Column(db.Integer, db.ForeignKey('attendance_sessions.id'), nullable=False, index=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    status = db.Column(db.String(16), default='queued', nullable=False)  # queued, done, failed
+    result_json = db.Column(db.Text)  # payload hasil capture (sama dengan response /capture)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<CaptureJob {self.id} {self.status}>'
+
+    def to_dict(self, expired=False):
+        """
+        Convert to dictionary
+
+        Args:
+            expired: job belum selesai melewati batas waktu (worker yang memprosesnya mati)
+        """
+        data = {
+            'job_id': self.id,
+            'session_id': self.session_id,
+            'status': 'expired' if expired else self.status,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+        if self.result_json:
+            data['result'] = json.loads(self.result_json)
+        if self.error:
+            data['error'] = self.error
+
+        return data
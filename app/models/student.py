@@ -14,7 +14,12 @@ class Student(db.Model):
     phone = db.Column(db.String(20))
     class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
     photo_path = db.Column(db.String(255))  # Path ke foto original
-    face_encoding_json = db.Column(db.Text)  # JSON string of 128-dimensional vector
+    face_encoding_json = db.Column(db.Text)  # Legacy: JSON string of 128-dimensional vector
+    face_encoding_blob = db.Column(db.LargeBinary)  # Packed float32 encoding (lihat encoding_codec)
+    face_gallery_blob = db.Column(db.LargeBinary)  # Template tambahan (K x 128 packed), selain encoding utama
+    encoding_model = db.Column(db.String(32))  # Tag model pembuat encoding (lihat encoding_model_tag)
+    face_encoding_next_blob = db.Column(db.LargeBinary)  # Hasil re-encode yang belum diaktifkan
+    encoding_model_next = db.Column(db.String(32))
     registration_date = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -23,24 +28,233 @@ class Student(db.Model):
     # Relationships
     attendance_records = db.relationship('AttendanceRecord', backref='student', lazy='dynamic', cascade='all, delete-orphan')
 
+    @property
+    def has_face_encoding(self):
+        """Apakah mahasiswa sudah punya face encoding (blob atau legacy JSON)"""
+        return bool(self.face_encoding_blob or self.face_encoding_json)
+
+    @property
+    def encoding_model_tag(self):
+        """Tag model encoding aktif (encoding lama tanpa tag dianggap LEGACY_ENCODING_MODEL)"""
+        if not self.has_face_encoding:
+            return None
+        from app.services.encoding_codec import LEGACY_ENCODING_MODEL
+        return self.encoding_model or LEGACY_ENCODING_MODEL
+
+    @property
+    def face_template_count(self):
+        """Jumlah template di gallery (encoding utama + tambahan)"""
+        if not self.has_face_encoding:
+            return 0
+        if not self.face_gallery_blob:
+            return 1
+        from app.services.encoding_codec import read_header, EncodingFormatError
+        try:
+            return 1 + read_header(self.face_gallery_blob)[1]
+        except EncodingFormatError:
+            return 1
+
     def get_face_encoding(self):
         """Get face encoding as numpy array"""
+        import numpy as np
+        if self.face_encoding_blob:
+            from app.services.encoding_codec import unpack_encoding, EncodingFormatError
+            try:
+                return unpack_encoding(self.face_encoding_blob)[0].astype(np.float64)
+            except EncodingFormatError:
+                return None
         if not self.face_encoding_json:
             return None
-        import numpy as np
         try:
             encoding_list = json.loads(self.face_encoding_json)
             return np.array(encoding_list, dtype=np.float64)
         except (json.JSONDecodeError, TypeError):
             return None
 
-    def set_face_encoding(self, encoding):
-        """Set face encoding from numpy array"""
+    def set_face_encoding(self, encoding, model=None):
+        """
+        Set face encoding dari numpy array (disimpan sebagai packed float32), gallery di-reset
+
+        Args:
+            encoding: 128-dim encoding
+            model: tag model pembuat encoding (encoding_model_tag)
+        """
+        from app.services.encoding_codec import pack_encoding
+        self.face_encoding_blob = pack_encoding(encoding)
+        self.face_encoding_json = None
+        self.face_gallery_blob = None
+        self.encoding_model = model
+
+        # Hasil re-encode yang belum diaktifkan sudah tidak berlaku
+        self.face_encoding_next_blob = None
+        self.encoding_model_next = None
+
+        # Matrix encoding kelas harus di-build ulang
+        from app.services.encoding_cache import encoding_cache
+        encoding_cache.discard_student_update(self)
+        encoding_cache.invalidate(self.class_id)
+
+    def get_face_gallery(self):
+        """
+        Semua template encoding mahasiswa
+
+        Returns:
+            numpy array K x 128 float32 (baris 0 = encoding utama), kosong jika belum terdaftar
+        """
+        import numpy as np
+        primary = self.decode_encoding(self.face_encoding_blob, self.face_encoding_json)
+        if primary is None:
+            return np.empty((0, 128), dtype=np.float32)
+        return np.vstack([primary.astype(np.float32), self.decode_gallery(self.face_gallery_blob)])
+
+    def set_face_gallery(self, templates):
+        """
+        Simpan template (baris 0 jadi encoding utama, sisanya di face_gallery_blob)
+
+        Matrix kelas yang di-cache diperbarui untuk mahasiswa ini saja setelah commit,
+        bukan di-build ulang (dipanggil setiap harvest check-in).
+        """
+        import numpy as np
+        from app.services.encoding_codec import pack_encoding
+
+        templates = np.asarray(templates, dtype=np.float32).reshape(-1, 128)
+        self.face_encoding_blob = pack_encoding(templates[0])
+        self.face_encoding_json = None
+        self.face_gallery_blob = pack_encoding(templates[1:]) if len(templates) > 1 else None
+
+        from app.services.encoding_cache import encoding_cache
+        encoding_cache.defer_student_update(self, templates)
+
+    @staticmethod
+    def decode_gallery(blob):
+        """Decode face_gallery_blob ke array K x 128 float32 (kosong jika tidak ada / tidak valid)"""
+        import numpy as np
+        from app.services.encoding_codec import unpack_encoding, EncodingFormatError
+
+        if blob:
+            try:
+                templates = unpack_encoding(blob)
+            except EncodingFormatError:
+                templates = None
+            if templates is not None and templates.shape[1] == 128:
+                return templates.astype(np.float32, copy=False)
+        return np.empty((0, 128), dtype=np.float32)
+
+    @staticmethod
+    def decode_encoding(blob, encoding_json):
+        """
+        Decode kolom encoding (blob atau legacy JSON) ke array 128 float32 tanpa ORM object
+
+        Returns:
+            numpy array (128,) atau None jika kosong / tidak valid
+        """
+        import numpy as np
+        from app.services.encoding_codec import read_header, HEADER_SIZE, EncodingFormatError
+
+        if blob:
+            try:
+                dtype, count, dim = read_header(blob)
+            except EncodingFormatError:
+                return None
+            if count != 1 or dim != 128:
+                return None
+            return np.frombuffer(blob, dtype=dtype, offset=HEADER_SIZE)
+
+        if not encoding_json:
+            return None
+
+        # Row lama yang belum dimigrasi
+        try:
+            payload = np.array(json.loads(encoding_json), dtype=np.float32)
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return None
+        return payload if payload.shape == (128,) else None
+
+    @classmethod
+    def load_encodings(cls, *criteria, columns=None):
+        """
+        Bulk load encoding mahasiswa aktif dengan satu query kolom
+
+        Args:
+            *criteria: filter tambahan (misalnya Student.class_id == 1)
+            columns: kolom yang dikembalikan per mahasiswa (default id, student_id, name)
+
+        Returns:
+            tuple: (list of tuple kolom, numpy array N x 128 float32)
+        """
+        import numpy as np
+
+        columns = columns or (cls.id, cls.student_id, cls.name)
+        rows = db.session.query(
+            *columns,
+            cls.face_encoding_blob,
+            cls.face_encoding_json
+        ).filter(
+            cls.is_active.is_(True),
+            db.or_(cls.face_encoding_blob.isnot(None), cls.face_encoding_json.isnot(None)),
+            *criteria
+        ).order_by(cls.id).all()
+
+        students = []
+        chunks = []
+        for row in rows:
+            payload = cls.decode_encoding(row[-2], row[-1])
+            if payload is None:
+                continue
+            students.append(tuple(row[:-2]))
+            chunks.append(payload)
+
+        matrix = np.empty((len(chunks), 128), dtype=np.float32)
+        for i, payload in enumerate(chunks):
+            matrix[i] = payload
+
+        return students, matrix
+
+    @classmethod
+    def load_class_gallery(cls, class_id):
+        """
+        Bulk load semua template (encoding utama + gallery) mahasiswa aktif di kelas
+
+        Args:
+            class_id: ID kelas
+
+        Returns:
+            tuple: (list of (id, student_id, name), numpy array T x 128 float32,
+                    numpy array T owner - index mahasiswa per baris, berurutan)
+        """
         import numpy as np
-        if isinstance(encoding, np.ndarray):
-            self.face_encoding_json = json.dumps(encoding.tolist())
-        else:
-            self.face_encoding_json = json.dumps(encoding)
+
+        rows, primary = cls.load_encodings(
+            cls.class_id == class_id,
+            columns=(cls.id, cls.student_id, cls.name, cls.face_gallery_blob)
+        )
+
+        chunks = []
+        owners = []
+        for i, row in enumerate(rows):
+            extra = cls.decode_gallery(row[3])
+            chunks.append(primary[i:i + 1])
+            chunks.append(extra)
+            owners.append(np.full(1 + len(extra), i, dtype=np.int64))
+
+        if not rows:
+            return [], primary, np.empty(0, dtype=np.int64)
+
+        students = [tuple(row[:3]) for row in rows]
+        return students, np.ascontiguousarray(np.vstack(chunks)), np.concatenate(owners)
+
+    @classmethod
+    def load_class_encodings(cls, class_id):
+        """
+        Bulk load encoding semua mahasiswa aktif di kelas dengan satu query kolom
+
+        Args:
+            class_id: ID kelas
+
+        Returns:
+            tuple: (list of (id, student_id, name), numpy array N x 128 float32)
+        """
+        return cls.load_encodings(cls.class_id == class_id)
 
     def __repr__(self):
         return f'<Student {self.student_id}: {self.name}>'
@@ -61,9 +275,8 @@ class Student(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
-        if include_encoding and self.face_encoding_json:
-            data['has_face_encoding'] = True
-        else:
-            data['has_face_encoding'] = bool(self.face_encoding_json)
+        data['has_face_encoding'] = self.has_face_encoding
+        data['face_template_count'] = self.face_template_count
+        data['encoding_model'] = self.encoding_model_tag
 
         return data
@@ -5,6 +5,7 @@ from . import student as student_bp_module
 from . import attendance as attendance_bp_module
 from . import face_api as face_api_bp_module
 from . import report as report_bp_module
+from . import metrics as metrics_bp_module
 
 # Export blueprints
 auth_bp = auth_bp_module.bp
@@ -13,5 +14,6 @@ student_bp = student_bp_module.bp
 attendance_bp = attendance_bp_module.bp
 face_api_bp = face_api_bp_module.bp
 report_bp = report_bp_module.bp
+metrics_bp = metrics_bp_module.bp
 
-__all__ = ['auth_bp', 'lecturer_bp', 'student_bp', 'attendance_bp', 'face_api_bp', 'report_bp']
+__all__ = ['auth_bp', 'lecturer_bp', 'student_bp', 'attendance_bp', 'face_api_bp', 'report_bp', 'metrics_bp']
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, g, url_for
 from flask_login import login_required, current_user
 from app import db
 from app.models.attendance_session import AttendanceSession
@@ -7,20 +7,57 @@ from app.models.student import Student
 from app.models.class_model import Class
 from app.services.face_recognition_service import FaceRecognitionService
 from app.services.attendance_service import AttendanceService
-import base64
-import io
-from PIL import Image
+from app.services.encoding_cache import encoding_cache
+from app.services.session_state import session_states
+from app.services.session_events import session_events
+from app.services.student_index import student_index
+from app.services.face_gallery import FaceGalleryService
+from app.services.recognition_engine import EngineBusyError
+from app.services.frame_decoder import (
+    read_request_frame, read_request_image, decode_frame, parse_face_hints, full_resolution_source,
+    FrameDecodeError
+)
+from app.services.frame_quality import FrameRejected
+from app.services.frame_cache import dhash
+from app.services.capture_stream import FrameStream, StreamClosed, stream_slots
+from app.services.capture_jobs import capture_jobs, MAX_JOB_IDS
+from app.services.capture_recorder import capture_recorder
+from app.services.metrics import metrics
+from app.services.flight_recorder import trace_annotate
+from app.services.timing import StageTimer, request_timer
+import numpy as np
+import functools
+import json
 import logging
+import uuid
+
+try:
+    from flask_sock import Sock
+except ImportError:  # flask-sock opsional: tanpa itu hanya capture lewat HTTP POST
+    Sock = None
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('attendance', __name__, url_prefix='/api/attendance')
 
+# Field hasil capture yang dicatat di trace flight recorder
+_TRACED_FIELDS = ('detected', 'face_count', 'matched', 'matched_count', 'recorded_count', 'duplicate',
+                  'cached', 'rejected', 'tracked')
+
+# Frame untuk sesi yang sudah ditutup tidak dicatat (/capture, job async, stream)
+_SESSION_CLOSED = 'Sesi absensi sudah ditutup'
+
+sock = Sock() if Sock is not None else None
+
 
 @bp.route('/sessions/start', methods=['POST'])
 @login_required
 def start_session():
-    """Start attendance session"""
+    """
+    Start attendance session
+    Expects: {'class_id': int, 'session_name': str, 'notes': str (optional),
+              'record': bool (optional, rekam frame capture untuk replay)}
+    """
     data = request.get_json()
 
     try:
@@ -41,9 +78,15 @@ def start_session():
             notes=notes
         )
 
+        # Rekam frame /capture sesi ini untuk load replay (CAPTURE_RECORDING_ENABLED)
+        recording = capture_recorder.record_all or _is_truthy(data.get('record'))
+        if recording:
+            recording = capture_recorder.start(session) is not None
+
         return jsonify({
             'message': 'Session dimulai',
-            'session': session.to_dict()
+            'session': session.to_dict(),
+            'recording': recording
         }), 201
 
     except Exception as e:
@@ -92,6 +135,455 @@ def get_session_status(session_id):
         return jsonify({'error': str(e)}), 500
 
 
+def _sse(event, data):
+    """Format satu event Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@bp.route('/sessions/<int:session_id>/events', methods=['GET'])
+@login_required
+def session_event_stream(session_id):
+    """
+    Live status sesi (Server-Sent Events)
+
+    Mengirim 'snapshot' (mahasiswa yang sudah hadir) sekali, lalu event
+    incremental 'present' (mahasiswa baru hadir) dan 'ended' (sesi ditutup).
+    'resync' berarti observer tertinggal; EventSource reconnect otomatis
+    dan mendapat snapshot baru.
+
+    Stream per worker dibatasi SESSION_EVENTS_MAX_STREAMS: jika penuh response
+    503 dan page beralih ke polling ?format=json (snapshot saja, tanpa stream).
+    """
+    session = AttendanceSession.query.get_or_404(session_id)
+
+    # Verify ownership
+    if session.class_record.lecturer_id != current_user.id and not current_user.is_admin():
+        return jsonify({'error': 'Akses ditolak'}), 403
+
+    if request.args.get('format') == 'json':
+        try:
+            return jsonify(AttendanceService.get_session_snapshot(session)), 200
+        except Exception as e:
+            logger.error(f"Error snapshot sesi: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+
+    # Subscribe sebelum snapshot supaya kehadiran di antaranya tidak terlewat
+    subscription = session_events.subscribe(session_id)
+    if subscription is None:
+        response = jsonify({
+            'error': 'Service Busy',
+            'message': 'Stream live status penuh, gunakan ?format=json',
+            'retry_after': 30
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    try:
+        snapshot = AttendanceService.get_session_snapshot(session)
+    except Exception as e:
+        session_events.unsubscribe(subscription)
+        logger.error(f"Error snapshot sesi: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    session_events.seed(session_id, [event['student']['id'] for event in snapshot['present']])
+    is_active = session.is_active
+    keepalive = current_app.config.get('SESSION_EVENTS_KEEPALIVE_SECONDS', 15)
+
+    # Koneksi database tidak ditahan selama stream terbuka
+    db.session.close()
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            yield _sse('snapshot', snapshot)
+            if not is_active:
+                yield _sse('ended', {'type': 'ended', 'session_id': session_id})
+                return
+
+            while True:
+                event = subscription.get(timeout=keepalive)
+                if subscription.overflowed:
+                    yield _sse('resync', {'type': 'resync', 'session_id': session_id})
+                    return
+                if event is None:
+                    # Comment SSE: menjaga koneksi melewati proxy idle timeout
+                    yield ': keepalive\n\n'
+                    continue
+
+                yield _sse(event['type'], event)
+                if event['type'] == 'ended':
+                    return
+        finally:
+            session_events.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(lambda: session_events.unsubscribe(subscription))
+    return response
+
+
+@bp.route('/sessions/events/stats', methods=['GET'])
+@login_required
+def session_event_stats():
+    """Jumlah observer live status di worker ini"""
+    return jsonify(session_events.stats()), 200
+
+
+def _int_field(data, name):
+    """Ambil field integer dari JSON/form/query string"""
+    try:
+        return int(data.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_truthy(value):
+    """Flag boolean dari JSON (bool) atau form/query string ('1', 'true')"""
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def _result(timer, payload):
+    """Payload capture dengan breakdown durasi per stage"""
+    payload['timings'] = timer.as_dict()
+    if 'frame_cache_hit' in g:
+        payload['cached'] = g.frame_cache_hit
+    return payload
+
+
+def _respond(timer, payload, status=200):
+    """Response capture dengan breakdown durasi per stage"""
+    return jsonify(_result(timer, payload)), status
+
+
+def _frame_lookup(state, frame, mode, timer):
+    """
+    Hitung perceptual hash frame dan cari hasil recognition frame yang hampir identik
+
+    Returns:
+        tuple: (hash atau None jika cache tidak aktif, hasil yang di-cache atau None)
+    """
+    if state.frame_cache is None:
+        return None, None
+
+    with timer.stage('hash'):
+        frame_hash = dhash(frame.image)
+    cached = state.frame_cache.lookup(frame_hash, mode)
+    g.frame_cache_hit = cached is not None
+    return frame_hash, cached
+
+
+def _frame_store(state, frame_hash, mode, result):
+    """Simpan hasil recognition frame untuk frame berikutnya yang mirip"""
+    if frame_hash is not None:
+        state.frame_cache.store(frame_hash, mode, result)
+
+
+def _rejected_payload(error, **payload):
+    """Response untuk frame yang ditolak quality gate (reason machine-readable)"""
+    payload.update({
+        'reason': error.reason,
+        'message': error.message,
+        'quality': {name: round(value, 3) for name, value in error.metrics.items()}
+    })
+    return payload
+
+
+def _student_payload(student):
+    """Data mahasiswa untuk response capture"""
+    return {
+        'id': student.id,
+        'student_id': student.student_id,
+        'name': student.name
+    }
+
+
+def _match_session(state, class_encodings, unknown_encodings):
+    """
+    Match wajah ke mahasiswa yang belum hadir dulu (matrix makin kecil saat kelas terisi),
+    wajah yang tidak cocok dicoba ke mahasiswa yang sudah hadir (hasilnya duplikat)
+
+    Returns:
+        list of (CachedStudent, confidence) atau (None, 0.0), satu per wajah
+    """
+    remaining, present = state.views(class_encodings)
+    unknown = np.asarray(unknown_encodings, dtype=np.float32).reshape(-1, 128)
+
+    matches = FaceRecognitionService.match_encodings(unknown, remaining)
+    missed = [i for i, (student, _) in enumerate(matches) if student is None]
+    if missed and len(present) > 0:
+        for i, match in zip(missed, FaceRecognitionService.match_encodings(unknown[missed], present)):
+            matches[i] = match
+
+    return matches
+
+
+def _stream_key(fields, user_id):
+    """Key tracker untuk frame /capture: client_id per user, None (tanpa tracker) jika tidak dikirim"""
+    client_id = fields.get('client_id')
+    if not client_id:
+        return None
+    return f'{user_id}:{str(client_id)[:64]}'
+
+
+def _match_tracked(state, tracker, tracked, min_confidence, timer):
+    """
+    Match hasil encode_tracked: track yang sudah dikenali memakai identitasnya,
+    sisanya di-match ke matrix kelas lalu identitasnya disimpan di track
+    """
+    matches = [
+        (track.student, track.confidence) if encoding is None and track.identified else (None, 0.0)
+        for track, encoding in tracked
+    ]
+    pending = [i for i, (_, encoding) in enumerate(tracked) if encoding is not None]
+    if not pending:
+        return matches
+
+    with timer.stage('cache'):
+        class_encodings = encoding_cache.get_class(state.class_id)
+
+    with timer.stage('match'):
+        pending_matches = _match_session(state, class_encodings, [tracked[i][1] for i in pending])
+
+    # Mahasiswa yang sudah dipegang track lain di frame ini tidak boleh diklaim dua kali
+    carried_ids = {student.id for student, _ in matches if student is not None}
+    for i, (student, confidence) in zip(pending, pending_matches):
+        if student is not None and student.id in carried_ids:
+            student, confidence = None, 0.0
+        matches[i] = (student, confidence)
+        accepted = student is not None and confidence >= min_confidence
+        tracker.identify(tracked[i][0], student if accepted else None, confidence)
+
+    return matches
+
+
+def _capture_multi_face(state, tracker, frame, timer):
+    """Recognize semua wajah di frame dan catat kehadirannya dalam satu transaksi"""
+    min_confidence = current_app.config.get('MIN_CONFIDENCE_SCORE', 0.4)
+    frame_hash, cached = _frame_lookup(state, frame, 'multi', timer)
+
+    if cached is not None:
+        # Frame hampir identik dengan frame sebelumnya: pakai lokasi dan hasil match-nya
+        face_locations, matches = cached
+        face_encodings = [None] * len(face_locations)
+    else:
+        face_hints = parse_face_hints(frame)
+
+        if tracker is not None:
+            tracked = FaceRecognitionService.encode_tracked(
+                frame.image, tracker, frame.resize_scale, timer=timer,
+                face_hints=face_hints, quality_gate=True, full_image=full_resolution_source(frame)
+            )
+            face_locations = [track.box for track, _ in tracked]
+            face_encodings = [encoding for _, encoding in tracked]
+        else:
+            face_locations, unknown_encodings = FaceRecognitionService.encode_faces(
+                frame.image, frame.resize_scale, timer=timer, face_hints=face_hints, quality_gate=True,
+                full_image=full_resolution_source(frame)
+            )
+            face_encodings = list(unknown_encodings)
+
+        if not face_locations:
+            matches = []
+        elif tracker is not None:
+            matches = _match_tracked(state, tracker, tracked, min_confidence, timer)
+        else:
+            with timer.stage('cache'):
+                class_encodings = encoding_cache.get_class(state.class_id)
+
+            with timer.stage('match'):
+                matches = _match_session(state, class_encodings, unknown_encodings)
+
+        _frame_store(state, frame_hash, 'multi', (face_locations, matches))
+
+    if not face_locations:
+        return _result(timer, {
+            'detected': False,
+            'face_count': 0,
+            'message': 'Tidak ada wajah terdeteksi'
+        })
+
+    accepted = [
+        (student.id, confidence)
+        for student, confidence in matches
+        if student is not None and confidence >= min_confidence
+    ]
+
+    with timer.stage('record'):
+        new_records, duplicate_ids = AttendanceService.record_attendance_bulk(state.session_id, accepted)
+
+    # Check-in baru ber-confidence tinggi memperkaya gallery mahasiswa
+    with timer.stage('harvest'):
+        for (student, confidence), encoding in zip(matches, face_encodings):
+            if student is not None and student.id in new_records:
+                FaceGalleryService.harvest(student.id, encoding, confidence)
+
+    faces = []
+    for (top, right, bottom, left), (student, confidence) in zip(face_locations, matches):
+        face = {
+            'location': {'top': top, 'right': right, 'bottom': bottom, 'left': left},
+            'matched': student is not None and confidence >= min_confidence
+        }
+        if student is not None:
+            face['student'] = _student_payload(student)
+            face['confidence'] = f"{confidence:.2f}"
+        if face['matched']:
+            face['duplicate'] = student.id in duplicate_ids
+            if student.id in new_records:
+                face['timestamp'] = new_records[student.id].timestamp.isoformat()
+        faces.append(face)
+
+    return _result(timer, {
+        'detected': True,
+        'face_count': len(faces),
+        'matched_count': sum(1 for face in faces if face['matched']),
+        'recorded_count': len(new_records),
+        'message': f'{len(new_records)} kehadiran baru tercatat',
+        'faces': faces
+    })
+
+
+def _capture_single_face(state, tracker, frame, timer):
+    """Recognize wajah pertama di frame dan catat kehadirannya"""
+    min_confidence = current_app.config.get('MIN_CONFIDENCE_SCORE', 0.4)
+    unknown_encoding = None
+    is_tracked = False
+
+    # Frame hampir identik dengan frame beberapa detik terakhir: pakai hasil recognition-nya
+    frame_hash, cached = _frame_lookup(state, frame, 'single', timer)
+
+    if cached is not None:
+        detected, matched_student, confidence = cached
+    else:
+        face_hints = parse_face_hints(frame)
+        track = None
+
+        # Extract face encoding dari frame (box dari face-api.js dipakai jika ada)
+        if tracker is not None:
+            tracked = FaceRecognitionService.encode_tracked(
+                frame.image, tracker, frame.resize_scale, timer=timer,
+                face_hints=face_hints, first_only=True, quality_gate=True,
+                full_image=full_resolution_source(frame)
+            )
+            track, unknown_encoding = tracked[0] if tracked else (None, None)
+        else:
+            unknown_encoding = FaceRecognitionService.encode_face(
+                frame.image, frame.resize_scale, timer=timer, face_hints=face_hints, quality_gate=True,
+                full_image=full_resolution_source(frame)
+            )
+
+        is_tracked = track is not None and track.identified and unknown_encoding is None
+        detected = is_tracked or unknown_encoding is not None
+
+        if is_tracked:
+            # Wajah yang sama dengan frame sebelumnya: identitas dibawa dari track
+            matched_student, confidence = track.student, track.confidence
+        elif not detected:
+            matched_student, confidence = None, 0.0
+        else:
+            # Matrix encoding kelas dari cache (tanpa query Student per frame)
+            with timer.stage('cache'):
+                class_encodings = encoding_cache.get_class(state.class_id)
+
+            if len(class_encodings) == 0:
+                return _result(timer, {
+                    'detected': False,
+                    'message': 'Tidak ada mahasiswa dengan face encoding di kelas'
+                })
+
+            # Compare faces (mahasiswa yang belum hadir dulu)
+            with timer.stage('match'):
+                (matched_student, confidence), = _match_session(state, class_encodings, unknown_encoding)
+
+            if track is not None:
+                accepted = matched_student is not None and confidence >= min_confidence
+                tracker.identify(track, matched_student if accepted else None, confidence)
+
+        _frame_store(state, frame_hash, 'single', (detected, matched_student, confidence))
+
+    if not detected:
+        return _result(timer, {
+            'detected': False,
+            'message': 'Tidak ada wajah terdeteksi'
+        })
+
+    if matched_student is None:
+        return _result(timer, {
+            'detected': True,
+            'matched': False,
+            'message': 'Wajah tidak dikenal'
+        })
+
+    # Check confidence threshold
+    if confidence < min_confidence:
+        return _result(timer, {
+            'detected': True,
+            'matched': False,
+            'message': f'Confidence {confidence:.2f} di bawah threshold',
+            'confidence': confidence
+        })
+
+    # Check if student already recorded attendance in this session (dari memory)
+    if state.is_present(matched_student.id):
+        return _result(timer, {
+            'detected': True,
+            'matched': True,
+            'message': f'{matched_student.name} sudah tercatat',
+            'student': _student_payload(matched_student),
+            'confidence': f"{confidence:.2f}",
+            'duplicate': True,
+            'tracked': is_tracked
+        })
+
+    # Record attendance
+    with timer.stage('record'):
+        record = AttendanceService.record_attendance(
+            student_id=matched_student.id,
+            session_id=state.session_id,
+            confidence_score=confidence,
+            is_manual=False
+        )
+
+    with timer.stage('harvest'):
+        FaceGalleryService.harvest(matched_student.id, unknown_encoding, confidence)
+
+    return _result(timer, {
+        'detected': True,
+        'matched': True,
+        'message': f'Kehadiran tercatat: {matched_student.name}',
+        'student': _student_payload(matched_student),
+        'confidence': f"{confidence:.2f}",
+        'timestamp': record.timestamp.isoformat(),
+        'tracked': is_tracked
+    })
+
+
+def capture_frame(state, frame, timer, multi_face=False, stream_key=None):
+    """
+    Recognize frame capture dan catat kehadiran di sesi (dipakai /capture dan stream WebSocket)
+
+    Args:
+        stream_key: stream/client asal frame; face tracker hanya dipakai jika ada
+
+    Returns:
+        dict: payload hasil capture (frame yang ditolak quality gate ditandai rejected)
+    """
+    tracker = state.tracker(stream_key)
+    try:
+        if multi_face:
+            payload = _capture_multi_face(state, tracker, frame, timer)
+        else:
+            payload = _capture_single_face(state, tracker, frame, timer)
+    except FrameRejected as e:
+        payload = _result(timer, _rejected_payload(e, detected=False, rejected=True))
+
+    metrics.observe_capture(timer, payload)
+    trace_annotate(**{key: payload[key] for key in _TRACED_FIELDS if key in payload})
+    return payload
+
+
 @bp.route('/capture', methods=['POST'])
 @login_required
 def capture_face():
@@ -99,15 +591,30 @@ def capture_face():
     Capture dan recognize face dari webcam frame
     Expects: {
         'session_id': int,
-        'image_data': base64 encoded image
+        'image_data': base64 encoded image,
+        'multi_face': bool (optional, recognize semua wajah di frame),
+        'face_boxes': [{'x', 'y', 'width', 'height'}] (optional, box dari face-api.js),
+        'frame_width': int, 'frame_height': int (optional, ukuran frame untuk face_boxes),
+        'client_id': str (optional, ID kamera/tab; frame dengan client_id sama memakai face tracker)
     }
+    atau body image/jpeg / image/webp / multipart dengan session_id di query string / form
+
+    Dengan 'async': true frame hanya diantrikan dan response 202 berisi job_id;
+    hasilnya diambil lewat /capture-jobs. Frame sesi yang direkam (CAPTURE_RECORDING_ENABLED)
+    ditulis ke archive untuk replay.
     """
+    timer = request_timer()
     try:
-        data = request.get_json()
-        session_id = data.get('session_id')
-        image_data = data.get('image_data')
+        try:
+            with timer.stage('decode'):
+                raw_bytes, data = read_request_image(request)
+        except FrameDecodeError as e:
+            logger.error(f"Error decode image: {str(e)}")
+            return jsonify({'error': 'Invalid image format'}), 400
+
+        session_id = _int_field(data, 'session_id')
 
-        if not session_id or not image_data:
+        if not session_id or not raw_bytes:
             return jsonify({'error': 'Missing required fields'}), 400
 
         # Get session
@@ -117,115 +624,229 @@ def capture_face():
         if session.class_record.lecturer_id != current_user.id and not current_user.is_admin():
             return jsonify({'error': 'Akses ditolak'}), 403
 
-        # Decode base64 image
-        try:
-            # Remove data URL header jika ada
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-        except Exception as e:
-            logger.error(f"Error decode image: {str(e)}")
-            return jsonify({'error': 'Invalid image format'}), 400
+        if not session.is_active:
+            return jsonify({'error': _SESSION_CLOSED}), 400
 
-        # Extract face encoding dari frame
-        unknown_encoding = FaceRecognitionService.encode_face(image)
+        try:
+            if _is_truthy(data.get('async')):
+                # Decode, recognition dan pencatatan kehadiran dijalankan di thread job
+                handler = functools.partial(_run_capture_job, stream_key=_stream_key(data, current_user.id))
+                job_id = capture_jobs.submit(handler, session.id, current_user.id, raw_bytes, data)
+                capture_recorder.record(session, raw_bytes, data, 202, None, timer.elapsed_ms())
+                return jsonify({
+                    'job_id': job_id,
+                    'status': 'queued',
+                    'status_url': url_for('attendance.capture_job_results', ids=job_id)
+                }), 202
+
+            try:
+                with timer.stage('decode'):
+                    frame = decode_frame(raw_bytes, data, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+            except FrameDecodeError as e:
+                logger.error(f"Error decode image: {str(e)}")
+                capture_recorder.record(session, raw_bytes, data, 400, None, timer.elapsed_ms())
+                return jsonify({'error': 'Invalid image format'}), 400
+
+            # State sesi: mahasiswa yang sudah hadir + tracker (wajah yang sudah dikenali
+            # di frame sebelumnya tidak di-encode ulang)
+            state = session_states.get(session.id, session)
+
+            payload = capture_frame(state, frame, timer, _is_truthy(data.get('multi_face')),
+                                    _stream_key(data, current_user.id))
+        except EngineBusyError:
+            capture_recorder.record(session, raw_bytes, data, 503, None, timer.elapsed_ms())
+            raise
+
+        capture_recorder.record(session, raw_bytes, data, 200, payload, timer.elapsed_ms())
+        return jsonify(payload), 200
+
+    except EngineBusyError:
+        raise
+    except Exception as e:
+        logger.error(f"Error capture face: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-        if unknown_encoding is None:
-            return jsonify({
-                'detected': False,
-                'message': 'Tidak ada wajah terdeteksi'
-            }), 200
 
-        # Get all active students di kelas
-        class_id = session.class_id
-        students = Student.query.filter_by(
-            class_id=class_id,
-            is_active=True
-        ).all()
+def _capture_bytes(state, data, fields, stream_key=None):
+    """Decode frame dari bytes lalu capture (stream WebSocket dan job async, di luar request)"""
+    timer = StageTimer()
+    try:
+        with timer.stage('decode'):
+            frame = decode_frame(data, fields, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+    except FrameDecodeError as e:
+        logger.error(f"Error decode image: {str(e)}")
+        return {'error': 'Invalid image format'}
 
-        # Filter students dengan face encoding
-        known_students = []
-        for student in students:
-            encoding = student.get_face_encoding()
-            if encoding is not None:
-                known_students.append((student, encoding))
+    return capture_frame(state, frame, timer, _is_truthy(fields.get('multi_face')), stream_key)
 
-        if not known_students:
-            return jsonify({
-                'detected': False,
-                'message': 'Tidak ada mahasiswa dengan face encoding di kelas'
-            }), 200
 
-        # Compare faces
-        matched_student, confidence = FaceRecognitionService.compare_faces(
-            unknown_encoding,
-            known_students
-        )
+def _run_capture_job(session_id, data, fields, stream_key=None):
+    """Handler job capture async (dijalankan di thread capture_jobs)"""
+    # Sesi bisa ditutup (juga oleh worker lain) selama job mengantri: cek ke database
+    session = AttendanceSession.query.get(session_id)
+    if session is None:
+        return {'error': 'Session tidak ditemukan'}
+    if not session.is_active:
+        return {'error': _SESSION_CLOSED}
+    return _capture_bytes(session_states.get(session.id, session), data, fields, stream_key)
 
-        if matched_student is None:
-            return jsonify({
-                'detected': True,
-                'matched': False,
-                'message': 'Wajah tidak dikenal'
-            }), 200
 
-        # Check confidence threshold
-        min_confidence = current_app.config.get('MIN_CONFIDENCE_SCORE', 0.4)
-        if confidence < min_confidence:
-            return jsonify({
-                'detected': True,
-                'matched': False,
-                'message': f'Confidence {confidence:.2f} di bawah threshold',
-                'confidence': confidence
-            }), 200
+@bp.route('/capture-jobs', methods=['GET', 'POST'])
+@login_required
+def capture_job_results():
+    """
+    Status/hasil beberapa job capture async sekaligus
+    Expects: ?ids=<job_id>,<job_id> atau JSON {'job_ids': [...]}
 
-        # Check if student already recorded attendance in this session
-        existing_record = AttendanceRecord.query.filter_by(
-            student_id=matched_student.id,
-            session_id=session_id
-        ).first()
+    Status: queued, done (result = response /capture), failed (error),
+    expired (tidak selesai sebelum batas waktu) atau not_found
+    """
+    data = request.get_json(silent=True) or {}
+    job_ids = data.get('job_ids')
+    if job_ids is None:
+        job_ids = [job_id for job_id in request.args.get('ids', '').split(',') if job_id]
 
-        if existing_record:
-            return jsonify({
-                'detected': True,
-                'matched': True,
-                'message': f'{matched_student.name} sudah tercatat',
-                'student': {
-                    'id': matched_student.id,
-                    'student_id': matched_student.student_id,
-                    'name': matched_student.name
-                },
-                'confidence': f"{confidence:.2f}",
-                'duplicate': True
-            }), 200
-
-        # Record attendance
-        record = AttendanceService.record_attendance(
-            student_id=matched_student.id,
-            session_id=session_id,
-            confidence_score=confidence,
-            is_manual=False
-        )
+    if not job_ids or not isinstance(job_ids, list):
+        return jsonify({'error': 'Missing required fields'}), 400
+    if len(job_ids) > MAX_JOB_IDS:
+        return jsonify({'error': f'Maksimal {MAX_JOB_IDS} job per request'}), 400
 
+    try:
+        jobs = capture_jobs.get_jobs([str(job_id) for job_id in job_ids], current_user)
         return jsonify({
-            'detected': True,
-            'matched': True,
-            'message': f'Kehadiran tercatat: {matched_student.name}',
-            'student': {
-                'id': matched_student.id,
-                'student_id': matched_student.student_id,
-                'name': matched_student.name
-            },
-            'confidence': f"{confidence:.2f}",
-            'timestamp': record.timestamp.isoformat()
+            'jobs': jobs,
+            'pending': sum(1 for job in jobs if job['status'] == 'queued')
         }), 200
 
     except Exception as e:
-        logger.error(f"Error capture face: {str(e)}")
+        logger.error(f"Error get capture jobs: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/capture-jobs/stats', methods=['GET'])
+@login_required
+def capture_job_stats():
+    """Counter job capture async di worker ini"""
+    return jsonify(capture_jobs.stats()), 200
+
+
+def _process_stream_frame(app, session_id, stream_key, data, fields):
+    """Proses satu frame binary dari stream capture (dijalankan di thread worker stream)"""
+    with app.app_context():
+        state = session_states.get_active(session_id)
+        if state is None:
+            raise StreamClosed(_SESSION_CLOSED)
+
+        try:
+            payload = _capture_bytes(state, data, fields, stream_key)
+        except EngineBusyError as e:
+            return {'type': 'dropped', 'reason': 'busy', 'retry_after': e.retry_after}
+
+        if 'error' in payload:
+            payload['type'] = 'error'
+        return payload
+
+
+def stream_capture(ws, session_id):
+    """
+    Stream capture per sesi lewat WebSocket (login dan cek akses sekali saat connect)
+
+    Client mengirim frame sebagai pesan binary (JPEG/WebP/PNG). Pesan teks JSON
+    opsional sebelum frame berisi field untuk frame berikutnya (face_boxes,
+    frame_width, frame_height, multi_face); multi_face juga bisa diset untuk
+    seluruh koneksi lewat query string. Server mengirim event JSON:
+
+    - {'type': 'ready', 'window': n, 'max_age_ms': ms} setelah connect
+    - {'type': 'result', 'seq': n, ...} hasil capture (isi sama dengan /capture)
+    - {'type': 'dropped', 'seq': n, 'reason': 'backlog' | 'stale' | 'busy'} frame dilewati
+    - {'type': 'error', ...} dan {'type': 'closed', ...} (sesi ditutup)
+
+    seq = nomor urut pesan binary pada koneksi (mulai 1). Client sebaiknya
+    menjaga frame in-flight (belum dapat result/dropped) maksimal `window`.
+
+    Stream terbuka per worker dibatasi CAPTURE_STREAM_MAX_STREAMS; jika penuh
+    koneksi ditutup dengan {'type': 'error', 'reason': 'busy', 'retry_after': s}
+    dan client memakai POST /capture.
+    """
+    def send(message):
+        ws.send(json.dumps(message))
+
+    if not current_user.is_authenticated:
+        send({'type': 'error', 'error': 'Silakan login terlebih dahulu'})
+        return
+
+    session = AttendanceSession.query.get(session_id)
+    if session is None:
+        send({'type': 'error', 'error': 'Session tidak ditemukan'})
+        return
+    if session.class_record.lecturer_id != current_user.id and not current_user.is_admin():
+        send({'type': 'error', 'error': 'Akses ditolak'})
+        return
+    if not session.is_active:
+        send({'type': 'closed', 'message': _SESSION_CLOSED})
+        return
+
+    # Koneksi database tidak ditahan selama stream terbuka (frame memakai app context sendiri)
+    db.session.close()
+
+    app = current_app._get_current_object()
+    if not stream_slots.acquire(app.config.get('CAPTURE_STREAM_MAX_STREAMS', 4)):
+        send({'type': 'error', 'reason': 'busy', 'retry_after': 30,
+              'error': 'Stream capture penuh, gunakan POST /capture'})
+        return
+
+    # Setiap koneksi adalah satu kamera: tracker sendiri, dibuang saat koneksi ditutup
+    stream_key = f'ws:{uuid.uuid4().hex}'
+    stream = FrameStream(
+        lambda data, fields: _process_stream_frame(app, session_id, stream_key, data, fields),
+        send,
+        window=app.config.get('CAPTURE_STREAM_WINDOW', 2),
+        max_age=app.config.get('CAPTURE_STREAM_MAX_AGE_SECONDS', 1.0)
+    )
+    defaults = request.args.to_dict()
+    fields = {}
+
+    try:
+        stream.start()
+        stream.emit({
+            'type': 'ready',
+            'session_id': session_id,
+            'window': stream.window,
+            'max_age_ms': int(stream.max_age * 1000)
+        })
+        logger.info(f"✓ Stream capture dibuka: sesi {session_id}")
+
+        while stream.is_open:
+            message = ws.receive(timeout=1)
+            if message is None:
+                continue
+
+            if isinstance(message, str):
+                try:
+                    fields = json.loads(message)
+                except ValueError:
+                    stream.emit({'type': 'error', 'error': 'Pesan teks harus JSON'})
+                    continue
+                if not isinstance(fields, dict):
+                    fields = {}
+                elif fields.get('type') == 'close':
+                    break
+                continue
+
+            stream.submit(message, dict(defaults, **fields))
+            fields = {}
+    finally:
+        stream.close()
+        stream.join(timeout=5)
+        stream_slots.release()
+        session_states.release_tracker(session_id, stream_key)
+        logger.info(f"✓ Stream capture ditutup: sesi {session_id} {stream.stats()}")
+
+
+if sock is not None:
+    sock.route('/sessions/<int:session_id>/stream', bp=bp)(stream_capture)
+
+
 @bp.route('/capture-single', methods=['POST'])
 @login_required
 def capture_single_face():
@@ -235,13 +856,21 @@ def capture_single_face():
         'session_id': int,
         'image_data': base64 encoded image
     }
+    atau body image/jpeg / image/webp / multipart dengan session_id di query string / form
     """
+    timer = request_timer()
     try:
-        data = request.get_json()
-        session_id = data.get('session_id')
-        image_data = data.get('image_data')
+        try:
+            with timer.stage('decode'):
+                frame = read_request_frame(request, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+        except FrameDecodeError as e:
+            logger.error(f"Error decode image: {str(e)}")
+            return jsonify({'error': 'Invalid image format'}), 400
+
+        data = frame.fields
+        session_id = _int_field(data, 'session_id')
 
-        if not session_id or not image_data:
+        if not session_id or frame.image is None:
             return jsonify({'error': 'Missing required fields'}), 400
 
         # Get session
@@ -251,61 +880,54 @@ def capture_single_face():
         if session.class_record.lecturer_id != current_user.id and not current_user.is_admin():
             return jsonify({'error': 'Akses ditolak'}), 403
 
-        # Decode base64 image
-        try:
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-        except Exception as e:
-            logger.error(f"Error decode image: {str(e)}")
-            return jsonify({'error': 'Invalid image format'}), 400
-
-        # Extract face encoding dari frame
-        unknown_encoding = FaceRecognitionService.encode_face(image)
-
-        if unknown_encoding is None:
-            return jsonify({
+        state = session_states.get(session.id, session)
+        frame_hash, cached = _frame_lookup(state, frame, 'single', timer)
+
+        if cached is not None:
+            detected, matched_student, confidence = cached
+        else:
+            # Extract face encoding dari frame (box dari face-api.js dipakai jika ada)
+            unknown_encoding = FaceRecognitionService.encode_face(
+                frame.image, frame.resize_scale, timer=timer,
+                face_hints=parse_face_hints(frame), quality_gate=True,
+                full_image=full_resolution_source(frame)
+            )
+            detected = unknown_encoding is not None
+            matched_student, confidence = None, 0.0
+
+            if detected:
+                # Matrix encoding kelas dari cache (tanpa query Student per frame)
+                with timer.stage('cache'):
+                    class_encodings = encoding_cache.get_class(session.class_id)
+
+                if len(class_encodings) == 0:
+                    return _respond(timer, {
+                        'status': 'no_comparison',
+                        'message': 'Tidak ada mahasiswa dengan face encoding di kelas'
+                    })
+
+                # Compare faces (mahasiswa yang belum hadir dulu)
+                with timer.stage('match'):
+                    (matched_student, confidence), = _match_session(state, class_encodings, unknown_encoding)
+
+            _frame_store(state, frame_hash, 'single', (detected, matched_student, confidence))
+
+        if not detected:
+            return _respond(timer, {
                 'status': 'no_face',
                 'message': 'Tidak ada wajah terdeteksi'
-            }), 200
-
-        # Get all active students di kelas
-        class_id = session.class_id
-        students = Student.query.filter_by(
-            class_id=class_id,
-            is_active=True
-        ).all()
-
-        # Filter students dengan face encoding
-        known_students = []
-        for student in students:
-            encoding = student.get_face_encoding()
-            if encoding is not None:
-                known_students.append((student, encoding))
-
-        if not known_students:
-            return jsonify({
-                'status': 'no_comparison',
-                'message': 'Tidak ada mahasiswa dengan face encoding di kelas'
-            }), 200
-
-        # Compare faces
-        matched_student, confidence = FaceRecognitionService.compare_faces(
-            unknown_encoding,
-            known_students
-        )
+            })
 
         if matched_student is None:
-            return jsonify({
+            return _respond(timer, {
                 'status': 'no_match',
                 'message': 'Wajah tidak dikenal'
-            }), 200
+            })
 
         # Check confidence threshold
         min_confidence = current_app.config.get('MIN_CONFIDENCE_SCORE', 0.4)
         if confidence < min_confidence:
-            return jsonify({
+            return _respond(timer, {
                 'status': 'low_confidence',
                 'message': f'Confidence {confidence:.2f} di bawah threshold',
                 'confidence': confidence,
@@ -314,15 +936,9 @@ def capture_single_face():
                     'student_id': matched_student.student_id,
                     'name': matched_student.name
                 }
-            }), 200
-
-        # Check if student already recorded attendance in this session
-        existing_record = AttendanceRecord.query.filter_by(
-            student_id=matched_student.id,
-            session_id=session_id
-        ).first()
+            })
 
-        return jsonify({
+        return _respond(timer, {
             'status': 'match',
             'message': f'Wajah dikenali: {matched_student.name}',
             'student': {
@@ -331,14 +947,116 @@ def capture_single_face():
                 'name': matched_student.name
             },
             'confidence': f"{confidence:.2f}",
-            'already_recorded': existing_record is not None
-        }), 200
+            'already_recorded': state.is_present(matched_student.id)
+        })
 
+    except FrameRejected as e:
+        return _respond(timer, _rejected_payload(e, status='rejected'))
+    except EngineBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error capture single face: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/identify', methods=['POST'])
+@login_required
+def identify_face():
+    """
+    Mode kiosk/gate: identifikasi wajah di antara semua mahasiswa (index ANN)
+    lalu catat kehadiran di sesi aktif kelas mahasiswa tersebut
+    Expects: body image/jpeg / image/webp / multipart, atau JSON {'image_data': base64}
+    """
+    if not current_user.is_admin():
+        return jsonify({'error': 'Akses ditolak'}), 403
+
+    timer = request_timer()
+    try:
+        try:
+            with timer.stage('decode'):
+                frame = read_request_frame(request, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+        except FrameDecodeError as e:
+            logger.error(f"Error decode image: {str(e)}")
+            return jsonify({'error': 'Invalid image format'}), 400
+
+        if frame.image is None:
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        unknown_encoding = FaceRecognitionService.encode_face(
+            frame.image, frame.resize_scale, timer=timer,
+            face_hints=parse_face_hints(frame), quality_gate=True,
+            full_image=full_resolution_source(frame)
+        )
+
+        if unknown_encoding is None:
+            return _respond(timer, {
+                'detected': False,
+                'message': 'Tidak ada wajah terdeteksi'
+            })
+
+        with timer.stage('search'):
+            candidates = student_index.search(unknown_encoding, k=1)
+
+        tolerance = current_app.config.get('FACE_RECOGNITION_TOLERANCE', 0.6)
+        min_confidence = current_app.config.get('MIN_CONFIDENCE_SCORE', 0.4)
+        if not candidates or candidates[0][1] > tolerance or 1.0 - candidates[0][1] < min_confidence:
+            return _respond(timer, {
+                'detected': True,
+                'matched': False,
+                'message': 'Wajah tidak dikenal'
+            })
+
+        matched_student, distance = candidates[0]
+        confidence = 1.0 - distance
+        payload = {
+            'detected': True,
+            'matched': True,
+            'student': _student_payload(matched_student),
+            'confidence': f"{confidence:.2f}"
+        }
+
+        # Routing ke sesi aktif kelas mahasiswa
+        session = AttendanceSession.query.filter_by(
+            class_id=matched_student.class_id,
+            is_active=True
+        ).first()
+
+        if session is None:
+            payload['message'] = f'Tidak ada sesi aktif untuk {matched_student.name}'
+            return _respond(timer, payload)
+
+        payload['session_id'] = session.id
+        state = session_states.get(session.id, session)
+
+        if state.is_present(matched_student.id):
+            payload['message'] = f'{matched_student.name} sudah tercatat'
+            payload['duplicate'] = True
+            return _respond(timer, payload)
+
+        with timer.stage('record'):
+            record = AttendanceService.record_attendance(
+                student_id=matched_student.id,
+                session_id=session.id,
+                confidence_score=confidence,
+                is_manual=False
+            )
+
+        with timer.stage('harvest'):
+            FaceGalleryService.harvest(matched_student.id, unknown_encoding, confidence)
+
+        payload['message'] = f'Kehadiran tercatat: {matched_student.name}'
+        payload['timestamp'] = record.timestamp.isoformat()
+        return _respond(timer, payload)
+
+    except FrameRejected as e:
+        return _respond(timer, _rejected_payload(e, detected=False, rejected=True))
+    except EngineBusyError:
+        raise
+    except Exception as e:
+        logger.error(f"Error identify face: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/record-attendance', methods=['POST'])
 @login_required
 def record_attendance():
@@ -374,12 +1092,7 @@ def record_attendance():
             return jsonify({'error': 'Student not in this class'}), 400
 
         # Check if already recorded attendance
-        existing_record = AttendanceRecord.query.filter_by(
-            student_id=student_id,
-            session_id=session_id
-        ).first()
-
-        if existing_record:
+        if session_states.get(session.id, session).is_present(student.id):
             return jsonify({
                 'message': f'{student.name} sudah tercatat hadir',
                 'student': student.to_dict(),
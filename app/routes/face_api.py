@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app
-import base64
-import io
-from PIL import Image
+from flask_login import login_required
+from app.services.recognition_engine import recognition_engine, EngineBusyError
+from app.services.frame_decoder import read_request_frame, parse_face_hints, full_resolution_source, FrameDecodeError
+from app.services.frame_quality import quality_stats
+from app.services.frame_cache import frame_cache_stats
+from app.services.image_cache import image_cache
+from app.services.timing import request_timer
 import numpy as np
 import logging
 
@@ -15,6 +19,7 @@ def detect_faces():
     """
     Detect faces dalam image (client-side support)
     Expects: {'image_data': base64 encoded image}
+    atau body image/jpeg / image/webp / multipart file 'image'
 
     Returns: {
         'detected': bool,
@@ -25,24 +30,18 @@ def detect_faces():
     try:
         from app.services.face_recognition_service import FaceRecognitionService
 
-        data = request.get_json()
-        image_data = data.get('image_data')
-
-        if not image_data:
-            return jsonify({'error': 'Missing image_data'}), 400
-
-        # Decode base64
+        # Decode image (base64 JSON, body image/jpeg|webp, atau multipart)
         try:
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-        except Exception as e:
+            frame = read_request_frame(request, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+        except FrameDecodeError as e:
             logger.error(f"Error decode image: {str(e)}")
             return jsonify({'error': 'Invalid image format'}), 400
 
-        # Detect faces
-        face_locations = FaceRecognitionService.detect_faces_in_frame(image)
+        if frame.image is None:
+            return jsonify({'error': 'Missing image_data'}), 400
+
+        # Detect faces (hasil di-cache per isi image, dipakai ulang oleh /encode)
+        face_locations, _ = FaceRecognitionService.analyze_image(frame.image, frame.resize_scale)
 
         return jsonify({
             'detected': len(face_locations) > 0,
@@ -53,6 +52,8 @@ def detect_faces():
             ]
         }), 200
 
+    except EngineBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error detect faces: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -62,6 +63,8 @@ def detect_faces():
 def encode_face():
     """
     Extract face encoding dari image
+    Expects: {'image_data': base64 encoded image, 'face_boxes': [...] (optional)}
+    atau body image/jpeg / image/webp / multipart file 'image'
 
     Returns: {
         'encoded': bool,
@@ -71,36 +74,46 @@ def encode_face():
     try:
         from app.services.face_recognition_service import FaceRecognitionService
 
-        data = request.get_json()
-        image_data = data.get('image_data')
-
-        if not image_data:
-            return jsonify({'error': 'Missing image_data'}), 400
-
-        # Decode base64
+        # Decode image (base64 JSON, body image/jpeg|webp, atau multipart)
         try:
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-        except Exception as e:
+            frame = read_request_frame(request, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+        except FrameDecodeError as e:
             logger.error(f"Error decode image: {str(e)}")
             return jsonify({'error': 'Invalid image format'}), 400
 
-        # Encode face
-        encoding = FaceRecognitionService.encode_face(image)
+        if frame.image is None:
+            return jsonify({'error': 'Missing image_data'}), 400
+
+        # Encode face: box dari client di-verifikasi langsung, tanpa box pakai cache
+        # (detect sebelumnya pada image yang sama tidak diulang)
+        timer = request_timer()
+        face_hints = parse_face_hints(frame)
+        if face_hints:
+            encoding = FaceRecognitionService.encode_face(
+                frame.image, frame.resize_scale, timer=timer, face_hints=face_hints,
+                full_image=full_resolution_source(frame)
+            )
+        else:
+            _, encoding = FaceRecognitionService.analyze_image(
+                frame.image, frame.resize_scale, timer=timer, encode=True,
+                full_image=full_resolution_source(frame)
+            )
 
         if encoding is None:
             return jsonify({
                 'encoded': False,
-                'message': 'Tidak ada wajah terdeteksi'
+                'message': 'Tidak ada wajah terdeteksi',
+                'timings': timer.as_dict()
             }), 200
 
         return jsonify({
             'encoded': True,
-            'encoding': encoding.tolist()
+            'encoding': encoding.tolist(),
+            'timings': timer.as_dict()
         }), 200
 
+    except EngineBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error encode face: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -151,3 +164,31 @@ def compare_faces():
     except Exception as e:
         logger.error(f"Error compare faces: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/engine/stats', methods=['GET'])
+@login_required
+def engine_stats():
+    """Counter recognition engine (queue depth, busy workers, rejected)"""
+    return jsonify(recognition_engine.stats()), 200
+
+
+@bp.route('/quality/stats', methods=['GET'])
+@login_required
+def quality_stats_view():
+    """Jumlah frame capture yang ditolak quality gate per reason"""
+    return jsonify(quality_stats.stats()), 200
+
+
+@bp.route('/frame-cache/stats', methods=['GET'])
+@login_required
+def frame_cache_stats_view():
+    """Hit rate cache hasil recognition untuk frame yang hampir identik"""
+    return jsonify(frame_cache_stats.stats()), 200
+
+
+@bp.route('/image-cache/stats', methods=['GET'])
+@login_required
+def image_cache_stats_view():
+    """Hit rate cache detect/encode per isi image"""
+    return jsonify(image_cache.stats()), 200
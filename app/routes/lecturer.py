@@ -6,6 +6,8 @@ from app.models.student import Student
 from app.models.attendance_session import AttendanceSession
 from app.models.attendance_record import AttendanceRecord
 from app.services.attendance_service import AttendanceService
+from app.services.recognition_engine import EngineBusyError
+from app.services.face_gallery import FaceGalleryService
 import csv
 import io
 import logging
@@ -236,13 +238,17 @@ def api_register_student_face(student_id):
         image_data = file.read()
 
         # Extract face encoding
-        encoding = FaceRecognitionService.encode_face(image_data)
+        encoding = FaceRecognitionService.encode_face(image_data, profile='enroll')
 
         if encoding is None:
             return jsonify({'error': 'Tidak ada wajah terdeteksi di foto'}), 400
 
+        gallery_result = FaceGalleryService.apply_upload(student, encoding, request.form)
+        if gallery_result is not None:
+            return jsonify(gallery_result), 200
+
         # Save face encoding
-        student.set_face_encoding(encoding)
+        student.set_face_encoding(encoding, FaceRecognitionService.encoding_model())
 
         # Save photo
         photo_path = f"uploads/student_photos/{student.student_id}_{student.id}.jpg"
@@ -257,6 +263,8 @@ def api_register_student_face(student_id):
         logger.info(f"Face terdaftar untuk mahasiswa: {student.student_id}")
         return jsonify({'message': 'Face registration berhasil'}), 200
 
+    except EngineBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error registrasi face: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -396,13 +404,17 @@ def api_upload_student_photo(student_id):
         image_data = file.read()
 
         # Extract face encoding
-        encoding = FaceRecognitionService.encode_face(image_data)
+        encoding = FaceRecognitionService.encode_face(image_data, profile='enroll')
 
         if encoding is None:
             return jsonify({'error': 'Tidak ada wajah terdeteksi di foto. Pastikan wajah jelas dan pencahayaan cukup'}), 400
 
+        gallery_result = FaceGalleryService.apply_upload(student, encoding, request.form)
+        if gallery_result is not None:
+            return jsonify(gallery_result), 200
+
         # Save face encoding
-        student.set_face_encoding(encoding)
+        student.set_face_encoding(encoding, FaceRecognitionService.encoding_model())
 
         # Save photo
         import os
@@ -422,6 +434,8 @@ def api_upload_student_photo(student_id):
             'student': student.to_dict()
         }), 200
 
+    except EngineBusyError:
+        raise
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error upload foto: {str(e)}")
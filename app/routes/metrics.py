@@ -0,0 +1,58 @@
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_login import current_user
+from app.services.metrics import metrics
+import hmac
+import logging
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('metrics', __name__)
+
+
+def _authorized():
+    """Bearer METRICS_TOKEN (untuk Prometheus) atau admin yang sudah login"""
+    token = current_app.config.get('METRICS_TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer '):
+        return hmac.compare_digest(header[len('Bearer '):].strip(), token)
+    # Stats per kelas dan timing service bukan untuk mahasiswa/dosen
+    return current_user.is_authenticated and current_user.is_admin()
+
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Metrics capture gabungan semua worker dalam Prometheus text format
+
+    frames/s, wajah per frame, match rate, histogram + p50/p95/p99 per stage
+    dan per method service, hit rate encoding cache per kelas.
+    ?format=json untuk ringkasan yang mudah dibaca.
+    """
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics tidak aktif'}), 404
+    if not _authorized():
+        return jsonify({'error': 'Akses ditolak'}), 401
+
+    merged = metrics.collect()
+
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'counters': merged['counters'],
+            'frames_per_second': merged['frames_per_second'],
+            'stages': {name: _summary(histogram) for name, histogram in merged['stages'].items()},
+            'calls': {name: _summary(histogram) for name, histogram in merged['calls'].items()},
+            'cache': {class_id: {'hits': hits, 'misses': misses}
+                      for class_id, (hits, misses) in merged['cache'].items()},
+            'workers': merged['workers']
+        }), 200
+
+    return Response(metrics.render(merged), mimetype='text/plain; version=0.0.4')
+
+
+def _summary(histogram):
+    return {
+        'count': histogram.count,
+        'mean_ms': round(histogram.total / histogram.count * 1000.0, 2) if histogram.count else None,
+        **{f'p{int(q * 100)}_ms': round(histogram.quantile(q) * 1000.0, 2) if histogram.count else None
+           for q in (0.5, 0.95, 0.99)}
+    }
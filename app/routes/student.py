@@ -4,6 +4,8 @@ from app import db
 from app.models.student import Student
 from app.models.class_model import Class
 from app.services.face_recognition_service import FaceRecognitionService
+from app.services.recognition_engine import EngineBusyError
+from app.services.face_gallery import FaceGalleryService
 import logging
 import uuid
 
@@ -45,13 +47,17 @@ def api_upload_photo():
         image_data = file.read()
 
         # Extract face encoding
-        encoding = FaceRecognitionService.encode_face(image_data)
+        encoding = FaceRecognitionService.encode_face(image_data, profile='enroll')
 
         if encoding is None:
             return jsonify({'error': 'Tidak ada wajah terdeteksi di foto'}), 400
 
+        gallery_result = FaceGalleryService.apply_upload(student, encoding, request.form)
+        if gallery_result is not None:
+            return jsonify(gallery_result), 200
+
         # Save face encoding
-        student.set_face_encoding(encoding)
+        student.set_face_encoding(encoding, FaceRecognitionService.encoding_model())
 
         # Save photo
         photo_path = f"uploads/student_photos/{student.student_id}_{student.id}.jpg"
@@ -71,6 +77,8 @@ def api_upload_photo():
             'student': student.to_dict()
         }), 200
 
+    except EngineBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error upload photo: {str(e)}")
         return jsonify({'error': str(e)}), 500
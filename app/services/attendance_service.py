@@ -2,6 +2,10 @@ from app import db
 from app.models.attendance_record import AttendanceRecord
 from app.models.attendance_session import AttendanceSession
 from app.models.student import Student
+from app.services.session_state import session_states
+from app.services.session_events import session_events, present_event
+from app.services.metrics import metrics
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 import logging
 
@@ -12,6 +16,7 @@ class AttendanceService:
     """Service untuk attendance operations"""
 
     @staticmethod
+    @metrics.instrument('attendance.start_session')
     def start_session(class_id, session_name, created_by_id, notes=None):
         """
         Mulai sesi absensi baru
@@ -34,6 +39,7 @@ class AttendanceService:
         if active_session:
             logger.warning(f"Ada session aktif, tutup terlebih dahulu: {active_session.id}")
             active_session.end_session()
+            session_states.drop(active_session.id)
 
         # Create new session
         session = AttendanceSession(
@@ -46,11 +52,16 @@ class AttendanceService:
 
         db.session.add(session)
         db.session.commit()
+        session_states.start(session)
+
+        if active_session:
+            session_events.publish_ended(active_session.id, active_session.end_time)
 
         logger.info(f"✓ Sesi absensi dimulai: {session.id}")
         return session
 
     @staticmethod
+    @metrics.instrument('attendance.end_session')
     def end_session(session_id):
         """
         Akhiri sesi absensi
@@ -68,11 +79,14 @@ class AttendanceService:
 
         session.end_session()
         db.session.commit()
+        session_states.drop(session_id)
+        session_events.publish_ended(session_id, session.end_time)
 
         logger.info(f"✓ Sesi absensi ditutup: {session_id}")
         return session
 
     @staticmethod
+    @metrics.instrument('attendance.record_attendance')
     def record_attendance(student_id, session_id, confidence_score, is_manual=False, notes=None):
         """
         Catat kehadiran mahasiswa
@@ -87,15 +101,14 @@ class AttendanceService:
         Returns:
             AttendanceRecord object atau None
         """
-        # Check duplikat attendance dalam sesi yang sama
-        existing = AttendanceRecord.query.filter_by(
-            student_id=student_id,
-            session_id=session_id
-        ).first()
+        state = session_states.get(session_id)
 
-        if existing:
-            logger.warning(f"Mahasiswa {student_id} sudah tercatat di sesi {session_id}")
-            return existing
+        # Check duplikat dari memory, query hanya untuk mengambil record yang sudah ada
+        if state is not None and state.is_present(student_id):
+            existing = AttendanceService._find_record(student_id, session_id)
+            if existing:
+                logger.warning(f"Mahasiswa {student_id} sudah tercatat di sesi {session_id}")
+                return existing
 
         # Create attendance record
         record = AttendanceRecord(
@@ -107,12 +120,108 @@ class AttendanceService:
         )
 
         db.session.add(record)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # unique_attendance_per_session: sudah dicatat (misalnya oleh worker lain)
+            db.session.rollback()
+            existing = AttendanceService._find_record(student_id, session_id)
+            if existing is None:
+                raise
+            logger.warning(f"Mahasiswa {student_id} sudah tercatat di sesi {session_id}")
+            if state is not None:
+                state.mark_present(student_id)
+            return existing
+
+        if state is not None:
+            state.mark_present(student_id)
+        session_events.publish_present(session_id, [record])
 
         logger.info(f"✓ Kehadiran tercatat: Student {student_id} at Session {session_id}")
         return record
 
     @staticmethod
+    def _find_record(student_id, session_id):
+        """Record kehadiran mahasiswa di sesi, None jika belum ada"""
+        return AttendanceRecord.query.filter_by(
+            student_id=student_id,
+            session_id=session_id
+        ).first()
+
+    @staticmethod
+    @metrics.instrument('attendance.record_attendance_bulk')
+    def record_attendance_bulk(session_id, matches):
+        """
+        Catat kehadiran beberapa mahasiswa sekaligus dalam satu transaksi
+
+        Args:
+            session_id: ID sesi
+            matches: list of tuples (student_id, confidence_score)
+
+        Returns:
+            tuple: (dict student_id -> AttendanceRecord baru, set student_id duplikat)
+        """
+        if not matches:
+            return ({}, set())
+
+        state = session_states.get(session_id)
+
+        if state is not None:
+            # Duplikat dijawab dari memory
+            existing_ids = {student_id for student_id, _ in matches if state.is_present(student_id)}
+        else:
+            existing_ids = AttendanceService._existing_ids(session_id, matches)
+
+        new_records = AttendanceService._new_records(session_id, matches, existing_ids)
+
+        if new_records:
+            db.session.add_all(new_records.values())
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Sebagian sudah dicatat worker lain - ulangi dengan cek duplikat dari database
+                db.session.rollback()
+                existing_ids = AttendanceService._existing_ids(session_id, matches)
+                new_records = AttendanceService._new_records(session_id, matches, existing_ids)
+                db.session.add_all(new_records.values())
+                db.session.commit()
+
+            if new_records:
+                session_events.publish_present(session_id, list(new_records.values()))
+                logger.info(f"✓ {len(new_records)} kehadiran tercatat di Session {session_id}")
+
+        if state is not None:
+            state.mark_present(*new_records.keys(), *existing_ids)
+
+        return (new_records, existing_ids)
+
+    @staticmethod
+    def _existing_ids(session_id, matches):
+        """Satu query untuk cek duplikat semua mahasiswa"""
+        student_ids = [student_id for student_id, _ in matches]
+        return {
+            row.student_id for row in db.session.query(AttendanceRecord.student_id).filter(
+                AttendanceRecord.session_id == session_id,
+                AttendanceRecord.student_id.in_(student_ids)
+            )
+        }
+
+    @staticmethod
+    def _new_records(session_id, matches, existing_ids):
+        new_records = {}
+        for student_id, confidence_score in matches:
+            if student_id in existing_ids or student_id in new_records:
+                continue
+            new_records[student_id] = AttendanceRecord(
+                student_id=student_id,
+                session_id=session_id,
+                confidence_score=confidence_score,
+                is_manual=False
+            )
+        return new_records
+
+    @staticmethod
+    @metrics.instrument('attendance.get_session_attendance')
     def get_session_attendance(session_id):
         """
         Ambil data kehadiran untuk satu sesi
@@ -171,6 +280,42 @@ class AttendanceService:
 
         return report
 
+    @staticmethod
+    @metrics.instrument('attendance.get_session_snapshot')
+    def get_session_snapshot(session):
+        """
+        Status awal sesi untuk observer live (event stream)
+
+        Hanya mahasiswa yang sudah hadir (satu query join) dan jumlah mahasiswa
+        kelas, tidak seperti get_session_attendance yang memuat seluruh kelas.
+
+        Args:
+            session: AttendanceSession
+
+        Returns:
+            dict: session, total_students, present_count, present (list event 'present')
+        """
+        rows = db.session.query(AttendanceRecord, Student.student_id, Student.name).join(
+            Student, Student.id == AttendanceRecord.student_id
+        ).filter(AttendanceRecord.session_id == session.id).order_by(AttendanceRecord.id).all()
+
+        total_students = db.session.query(db.func.count(Student.id)).filter(
+            Student.class_id == session.class_id,
+            Student.is_active.is_(True)
+        ).scalar()
+
+        present = [
+            present_event(record, {'id': record.student_id, 'student_id': nim, 'name': name})
+            for record, nim, name in rows
+        ]
+
+        return {
+            'session': session.to_dict(),
+            'total_students': total_students,
+            'present_count': len(present),
+            'present': present
+        }
+
     @staticmethod
     def get_class_attendance_history(class_id, limit=10):
         """
@@ -240,6 +385,7 @@ class AttendanceService:
         }
 
     @staticmethod
+    @metrics.instrument('attendance.manual_entry')
     def manual_entry(student_id, session_id, notes=None):
         """
         Manual attendance entry (fallback)
@@ -0,0 +1,260 @@
+from PIL import Image, ImageOps
+from app.services.frame_decoder import open_image, FrameDecodeError
+import numpy as np
+import csv
+import io
+import json
+import os
+import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Foto kamera (4000px+) di-decode maksimal segini sebelum encoding
+ENROLL_MAX_SIDE = 1280
+
+# Sisi terpanjang image saat detection (wajah foto pendaftaran besar)
+ENROLL_DETECT_SIDE = 480
+
+# Status foto yang sudah selesai dan tidak diproses ulang saat resume
+DONE_STATUSES = ('ok', 'gallery', 'skipped')
+
+# Prioritas CPU worker job background (di bawah web worker dan recognition engine)
+BACKGROUND_NICENESS = 10
+
+
+class PhotoSource:
+    """Daftar foto dari direktori (rekursif) atau file zip"""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+
+    def names(self):
+        """Path relatif foto, urut supaya urutan proses stabil antar run"""
+        if self._zip is not None:
+            names = [
+                info.filename for info in self._zip.infolist()
+                if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+            ]
+        else:
+            names = [
+                os.path.relpath(os.path.join(root, filename), self.path)
+                for root, _, filenames in os.walk(self.path)
+                for filename in filenames
+            ]
+        return sorted(name for name in names if name.lower().endswith(PHOTO_EXTENSIONS))
+
+    def read(self, name):
+        if self._zip is not None:
+            return self._zip.read(name)
+        with open(os.path.join(self.path, name), 'rb') as f:
+            return f.read()
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def photo_key(name):
+    """Nama file tanpa direktori dan ekstensi (default NIM)"""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def load_mapping(path):
+    """
+    Baca mapping foto -> NIM dari CSV
+
+    Kolom: filename,nim (header opsional). filename boleh path relatif
+    atau nama file saja.
+
+    Returns:
+        dict: filename/nama file -> NIM
+    """
+    mapping = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[0].strip():
+                continue
+            filename, nim = row[0].strip(), row[1].strip()
+            if filename.lower() in ('filename', 'file', 'foto') and nim.lower() == 'nim':
+                continue
+            mapping[filename] = nim
+            mapping.setdefault(os.path.basename(filename), nim)
+    return mapping
+
+
+def resolve_nim(name, mapping):
+    """NIM untuk foto: dari mapping jika ada, selain itu nama file"""
+    if mapping is None:
+        return photo_key(name)
+    return mapping.get(name) or mapping.get(os.path.basename(name))
+
+
+class Checkpoint:
+    """File JSONL berisi hasil per foto, supaya enrollment bisa dilanjutkan"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Baris terakhir bisa terpotong jika proses dihentikan
+                        continue
+                    self.entries[entry['file']] = entry
+
+    def is_done(self, name, retry_failed=False):
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        return entry['status'] in DONE_STATUSES or not retry_failed
+
+    def append(self, entries):
+        """Catat hasil foto (dipanggil setelah batch ter-commit)"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+                self.entries[entry['file']] = entry
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def init_background_worker(niceness):
+    """Initializer worker job background: turunkan prioritas CPU lalu warm-up model"""
+    from app.services.recognition_engine import _init_worker
+
+    try:
+        os.nice(niceness)
+    except (AttributeError, OSError):
+        pass
+    _init_worker(1)
+
+
+def _open_photo(image_bytes):
+    with Image.open(io.BytesIO(image_bytes)) as probe:
+        size = probe.size
+
+    scale = min(1.0, ENROLL_MAX_SIDE / float(max(size)))
+    image, remaining_scale, _ = open_image(image_bytes, scale)
+    if remaining_scale < 0.99:
+        image = image.resize(
+            (max(1, int(image.width * remaining_scale)), max(1, int(image.height * remaining_scale))),
+            Image.BILINEAR
+        )
+
+    # Foto HP sering disimpan miring dengan tag orientasi EXIF
+    return np.asarray(ImageOps.exif_transpose(image).convert('RGB'))
+
+
+def encode_photo_task(image_bytes, options, allow_multiple=False):
+    """
+    Task worker: decode foto pendaftaran, detect dan encode satu wajah
+
+    Returns:
+        dict: status ('ok', 'no_face', 'multiple_faces', 'invalid_image'),
+              encoding (list 128 float jika ok), faces (jumlah wajah)
+    """
+    from app.services.face_recognition_service import FaceRecognitionService
+    from app.services.timing import StageTimer
+
+    try:
+        image_array = _open_photo(image_bytes)
+    except (FrameDecodeError, OSError, ValueError, Image.DecompressionBombError) as e:
+        return {'status': 'invalid_image', 'message': str(e), 'faces': 0}
+
+    options = dict(options, resize_scale=min(1.0, ENROLL_DETECT_SIDE / float(max(image_array.shape[:2]))))
+    timer = StageTimer()
+    face_locations = FaceRecognitionService._find_faces(image_array, options, timer)['locations']
+
+    if not face_locations:
+        return {'status': 'no_face', 'faces': 0}
+    if len(face_locations) > 1 and not allow_multiple:
+        return {'status': 'multiple_faces', 'faces': len(face_locations)}
+
+    largest = FaceRecognitionService._largest_first(face_locations)[:1]
+    encodings = FaceRecognitionService._encode_locations(image_array, largest, options, timer)
+    if not encodings:
+        return {'status': 'no_face', 'faces': len(face_locations)}
+
+    return {
+        'status': 'ok',
+        'faces': len(face_locations),
+        'encoding': np.asarray(encodings[0], dtype=np.float32).tolist()
+    }
+
+
+class BulkEnrollmentService:
+    """Simpan hasil enrollment massal ke database per batch"""
+
+    @staticmethod
+    def save_batch(results, photo_dir, enrolled_ids, model=None):
+        """
+        Simpan encoding dan foto satu batch dalam satu transaksi
+
+        Foto pertama mahasiswa di run ini menjadi encoding utama, foto berikutnya
+        untuk NIM yang sama ditambahkan ke gallery.
+
+        Args:
+            results: list of dict file, nim, student_id (primary key), encoding, image_bytes
+            photo_dir: direktori penyimpanan foto mahasiswa
+            enrolled_ids: set primary key mahasiswa yang sudah di-enroll di run ini (di-update)
+            model: tag model pembuat encoding
+
+        Returns:
+            list of checkpoint entry per foto
+        """
+        from datetime import datetime
+        from app import db
+        from app.models.student import Student
+        from app.services.face_gallery import FaceGalleryService
+
+        students = {
+            student.id: student for student in
+            Student.query.filter(Student.id.in_({result['student_id'] for result in results}))
+        }
+
+        os.makedirs(photo_dir, exist_ok=True)
+        entries = []
+        newly_enrolled = set()
+        try:
+            for result in results:
+                student = students.get(result['student_id'])
+                entry = {'file': result['file'], 'nim': result['nim']}
+                if student is None:
+                    entry['status'] = 'unknown_nim'
+                elif student.id in enrolled_ids or student.id in newly_enrolled:
+                    added = FaceGalleryService.add_template(student, result['encoding'])
+                    entry['status'] = 'gallery' if added else 'skipped'
+                else:
+                    student.set_face_encoding(result['encoding'], model)
+
+                    extension = os.path.splitext(result['file'])[1].lower() or '.jpg'
+                    photo_path = os.path.join(photo_dir, f'{student.student_id}_{student.id}{extension}')
+                    with open(photo_path, 'wb') as f:
+                        f.write(result['image_bytes'])
+
+                    student.photo_path = photo_path
+                    student.registration_date = datetime.utcnow()
+                    newly_enrolled.add(student.id)
+                    entry['status'] = 'ok'
+                entries.append(entry)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        enrolled_ids.update(newly_enrolled)
+        return entries
@@ -0,0 +1,209 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app import db
+from app.models.capture_job import CaptureJob
+from app.services.recognition_engine import EngineBusyError
+import json
+import threading
+import time
+import uuid
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Batas job per request status
+MAX_JOB_IDS = 100
+
+# Job lama dihapus setiap N job baru
+_PRUNE_INTERVAL = 100
+
+# Engine recognition penuh: job menunggu lalu dicoba ulang
+_BUSY_RETRIES = 3
+
+
+class CaptureJobQueue:
+    """
+    Antrian job capture async per process (thread pool lokal, tanpa broker)
+
+    Frame disimpan di memory worker yang menerimanya dan diproses oleh thread
+    pool; status dan hasil ditulis ke tabel capture_jobs sehingga bisa diambil
+    dari worker gunicorn mana pun. Antrian terbatas: jika penuh, submit
+    menolak dengan EngineBusyError (503 + Retry-After) seperti recognition engine.
+    """
+
+    def __init__(self):
+        self.workers = 2
+        self.queue_size = 16
+        self.retry_after = 1
+        self.ttl_seconds = 600
+        self._app = None
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def init_app(self, app):
+        self.workers = app.config.get('CAPTURE_JOB_WORKERS', 2)
+        self.queue_size = app.config.get('CAPTURE_JOB_QUEUE_SIZE', 16)
+        self.retry_after = app.config.get('RECOGNITION_RETRY_AFTER_SECONDS', 1)
+        self.ttl_seconds = app.config.get('CAPTURE_JOB_TTL_SECONDS', 600)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._app = app
+        app.extensions['capture_jobs'] = self
+
+    def _ensure_executor(self):
+        # Thread pool dibuat per process (setelah fork gunicorn)
+        if self._executor is not None and self._executor_pid == os.getpid():
+            return self._executor
+
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='capture-job')
+                self._executor_pid = os.getpid()
+                logger.info(f"✓ Capture job worker dimulai: {self.workers} thread, antrian {self.queue_size}")
+
+        return self._executor
+
+    def _ensure_table(self):
+        # Database lama (dibuat sebelum tabel capture_jobs ada)
+        if not self._table_ready:
+            CaptureJob.__table__.create(bind=db.engine, checkfirst=True)
+            self._table_ready = True
+
+    def submit(self, handler, session_id, user_id, raw_bytes, fields):
+        """
+        Simpan job lalu jadwalkan prosesnya di thread pool
+
+        Args:
+            handler: callable(session_id, raw_bytes, fields) -> dict payload,
+                     dijalankan di dalam app context; payload berisi 'error' = gagal
+            session_id: ID sesi
+            user_id: user yang mengirim frame (hanya dia/admin yang boleh melihat hasil)
+            raw_bytes: bytes image (belum di-decode)
+            fields: field request lain
+
+        Returns:
+            str: job id
+
+        Raises:
+            EngineBusyError: jika antrian job penuh
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise EngineBusyError(self.retry_after)
+
+        try:
+            self._ensure_table()
+            job = CaptureJob(id=uuid.uuid4().hex, session_id=session_id, created_by=user_id, status='queued')
+            db.session.add(job)
+            db.session.commit()
+            self._ensure_executor().submit(self._run, handler, job.id, session_id, raw_bytes, fields)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._submitted += 1
+            prune = self._submitted % _PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+
+        return job.id
+
+    def _run(self, handler, job_id, session_id, raw_bytes, fields):
+        try:
+            with self._app.app_context():
+                try:
+                    payload = self._call(handler, session_id, raw_bytes, fields)
+                    error = payload.get('error')
+                except Exception as e:
+                    logger.error(f"Error capture job {job_id}: {str(e)}")
+                    payload, error = None, str(e)
+
+                db.session.query(CaptureJob).filter_by(id=job_id).update({
+                    'status': 'failed' if error else 'done',
+                    'result_json': json.dumps(payload) if payload is not None else None,
+                    'error': error,
+                    'finished_at': datetime.utcnow()
+                })
+                db.session.commit()
+
+            with self._lock:
+                if error:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+        except Exception as e:
+            logger.error(f"✗ Gagal menyimpan hasil capture job {job_id}: {str(e)}")
+        finally:
+            self._slots.release()
+
+    def _call(self, handler, session_id, raw_bytes, fields):
+        for attempt in range(_BUSY_RETRIES):
+            try:
+                return handler(session_id, raw_bytes, fields)
+            except EngineBusyError as e:
+                if attempt == _BUSY_RETRIES - 1:
+                    raise
+                time.sleep(e.retry_after)
+
+    def get_jobs(self, job_ids, user):
+        """
+        Ambil status/hasil beberapa job sekaligus (satu query)
+
+        Job yang belum selesai setelah ttl_seconds dilaporkan 'expired'
+        (worker yang memprosesnya restart, frame hilang).
+
+        Returns:
+            list of dict, urut sesuai job_ids; job tidak ditemukan diberi status 'not_found'
+        """
+        self._ensure_table()
+        query = CaptureJob.query.filter(CaptureJob.id.in_(job_ids))
+        if not user.is_admin():
+            query = query.filter(CaptureJob.created_by == user.id)
+        jobs = {job.id: job for job in query}
+
+        deadline = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        results = []
+        for job_id in job_ids:
+            job = jobs.get(job_id)
+            if job is None:
+                results.append({'job_id': job_id, 'status': 'not_found'})
+            else:
+                results.append(job.to_dict(expired=job.status == 'queued' and job.created_at < deadline))
+        return results
+
+    def prune(self):
+        """Hapus job yang lebih tua dari ttl_seconds"""
+        deadline = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        try:
+            deleted = CaptureJob.query.filter(CaptureJob.created_at < deadline).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Gagal menghapus capture job lama: {e}")
+            return
+        if deleted:
+            logger.info(f"✓ {deleted} capture job lama dihapus")
+
+    def stats(self):
+        """Counter job di process ini"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_capacity': self.queue_size,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected
+            }
+
+
+capture_jobs = CaptureJobQueue()
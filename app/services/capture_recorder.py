@@ -0,0 +1,183 @@
+from datetime import datetime
+import struct
+import json
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Setiap record: kind (4 byte), panjang meta JSON, panjang blob (big endian) + meta + blob
+_RECORD_HEADER = struct.Struct('>4sII')
+KIND_HEADER = b'HEAD'
+KIND_FRAME = b'FRAM'
+ARCHIVE_VERSION = 1
+
+# Field request yang tidak ikut disimpan (image sudah jadi blob, session diganti saat replay)
+_SKIPPED_FIELDS = ('image_data', 'session_id')
+
+# Config yang mempengaruhi hasil recognition (disimpan di header untuk replay)
+_CONFIG_KEYS = (
+    'FRAME_RESIZE_SCALE', 'FRAME_ENCODE_FULL_RESOLUTION', 'FACE_DETECTOR_CAPTURE', 'FACE_ENCODE_MODE',
+    'FACE_HINT_VALIDATION', 'FACE_RECOGNITION_TOLERANCE', 'MIN_CONFIDENCE_SCORE', 'TRACKER_ENABLED',
+    'FRAME_CACHE_ENABLED'
+)
+
+
+def _pack(kind, meta, blob=b''):
+    meta_bytes = json.dumps(meta, separators=(',', ':'), default=str).encode('utf-8')
+    return _RECORD_HEADER.pack(kind, len(meta_bytes), len(blob)) + meta_bytes + blob
+
+
+def read_archive(path):
+    """
+    Baca archive capture
+
+    Yields:
+        tuple: (kind, meta dict, blob bytes); record terakhir yang terpotong
+        (worker mati saat menulis) dilewati
+    """
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            kind, meta_length, blob_length = _RECORD_HEADER.unpack(header)
+            meta_bytes = f.read(meta_length)
+            blob = f.read(blob_length)
+            if len(meta_bytes) < meta_length or len(blob) < blob_length:
+                logger.warning(f"Record terakhir archive {path} terpotong, dilewati")
+                return
+            yield kind, json.loads(meta_bytes), blob
+
+
+def matched_ids(payload):
+    """ID mahasiswa yang dikenali di response /capture (multi_face atau single)"""
+    if not payload:
+        return []
+    if 'faces' in payload:
+        return sorted(face['student']['id'] for face in payload['faces']
+                      if face.get('matched') and face.get('student'))
+    if payload.get('matched') and payload.get('student'):
+        return [payload['student']['id']]
+    return []
+
+
+class CaptureRecorder:
+    """
+    Rekaman frame /api/attendance/capture per sesi untuk load replay (opt-in)
+
+    Satu file archive per sesi di CAPTURE_RECORDING_DIR: record header (sesi,
+    kelas, config recognition) lalu satu record per frame berisi bytes image
+    apa adanya (tanpa re-encode), field request, waktu datang dan ringkasan
+    hasil (status, latency, mahasiswa yang dikenali). Sesi direkam jika dimulai
+    dengan 'record': true, atau semua sesi dengan CAPTURE_RECORDING_ALL.
+
+    Record ditulis dengan satu os.write ke file O_APPEND sehingga beberapa
+    worker gunicorn bisa menulis ke archive yang sama; keberadaan file archive
+    adalah penanda sesi yang direkam.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.record_all = False
+        self.directory = None
+        self.max_bytes = 0
+        self._config = {}
+        self._full = set()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CAPTURE_RECORDING_ENABLED', False)
+        self.record_all = app.config.get('CAPTURE_RECORDING_ALL', False)
+        self.directory = app.config.get('CAPTURE_RECORDING_DIR', 'recordings')
+        self.max_bytes = int(app.config.get('CAPTURE_RECORDING_MAX_MB', 500) * 1024 * 1024)
+        self._config = {key: app.config.get(key) for key in _CONFIG_KEYS if key in app.config}
+        app.extensions['capture_recorder'] = self
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            logger.info(f"✓ Rekaman capture aktif: {os.path.abspath(self.directory)}"
+                        f"{' (semua sesi)' if self.record_all else ''}")
+
+    def archive_path(self, session_id):
+        return os.path.join(self.directory, f'session-{session_id}.capture')
+
+    def is_recording(self, session_id):
+        return self.enabled and os.path.exists(self.archive_path(session_id))
+
+    def start(self, session):
+        """
+        Mulai rekaman sesi (tulis record header)
+
+        Returns:
+            str: path archive, None jika rekaman tidak aktif
+        """
+        if not self.enabled:
+            return None
+
+        path = self.archive_path(session.id)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o640)
+        except FileExistsError:
+            return path
+
+        try:
+            os.write(fd, _pack(KIND_HEADER, {
+                'version': ARCHIVE_VERSION,
+                'session_id': session.id,
+                'class_id': session.class_id,
+                'session_name': session.session_name,
+                'created_at': datetime.utcnow().isoformat(),
+                'config': self._config
+            }))
+        finally:
+            os.close(fd)
+
+        logger.info(f"✓ Rekaman capture sesi {session.id} dimulai: {path}")
+        return path
+
+    def record(self, session, raw_bytes, fields, status, payload, elapsed_ms):
+        """
+        Simpan satu frame /capture beserta ringkasan hasilnya
+
+        Args:
+            session: AttendanceSession
+            raw_bytes: bytes image seperti yang diterima
+            fields: field request lain (multi_face, face_boxes, ...)
+            status: HTTP status response
+            payload: response capture (None untuk job async / error)
+            elapsed_ms: durasi request sampai hasil
+        """
+        if not self.enabled or session.id in self._full:
+            return
+
+        if self.record_all:
+            self.start(session)
+        elif not os.path.exists(self.archive_path(session.id)):
+            return
+
+        meta = {
+            't': round(time.time() - elapsed_ms / 1000.0, 4),
+            'fields': {key: value for key, value in fields.items() if key not in _SKIPPED_FIELDS},
+            'status': status,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'face_count': payload.get('face_count') if payload else None,
+            'matched_ids': matched_ids(payload) if payload else None
+        }
+
+        try:
+            fd = os.open(self.archive_path(session.id), os.O_WRONLY | os.O_APPEND)
+            try:
+                if os.fstat(fd).st_size >= self.max_bytes:
+                    self._full.add(session.id)
+                    logger.warning(f"Archive sesi {session.id} mencapai CAPTURE_RECORDING_MAX_MB, "
+                                   f"rekaman dihentikan")
+                    return
+                os.write(fd, _pack(KIND_FRAME, meta, raw_bytes))
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.error(f"✗ Gagal merekam frame sesi {session.id}: {str(e)}")
+
+
+capture_recorder = CaptureRecorder()
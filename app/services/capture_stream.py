@@ -0,0 +1,172 @@
+from collections import deque
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StreamClosed(Exception):
+    """Stream capture harus ditutup (sesi sudah berakhir)"""
+
+
+class StreamSlots:
+    """
+    Jumlah stream capture terbuka di process ini
+
+    Setiap stream menahan satu thread gunicorn (loop receive) dan satu thread
+    FrameStream selama koneksi terbuka, jadi dibatasi per worker supaya thread
+    tetap tersisa untuk request HTTP.
+    """
+
+    def __init__(self):
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit):
+        """
+        Returns:
+            bool: False jika sudah ada `limit` stream terbuka
+        """
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+stream_slots = StreamSlots()
+
+
+class FrameStream:
+    """
+    Antrian frame satu koneksi stream capture (WebSocket)
+
+    Thread penerima memanggil submit() untuk setiap frame, satu thread worker
+    memproses frame berurutan dan mengirim hasilnya lewat send(). Paling banyak
+    `window` frame menunggu diproses: jika server tertinggal, frame terlama
+    dibuang (reason 'backlog') dan frame yang sudah menunggu lebih dari
+    max_age detik dilewati (reason 'stale'), sehingga latency tetap terbatas.
+    """
+
+    def __init__(self, process, send, window=2, max_age=1.0):
+        """
+        Args:
+            process: callable(data, fields) -> dict payload hasil frame
+            send: callable(dict) untuk mengirim event ke client
+            window: jumlah maksimal frame yang menunggu diproses
+            max_age: umur maksimal frame (detik) sejak diterima sampai mulai diproses
+        """
+        self.process = process
+        self.send = send
+        self.window = max(1, window)
+        self.max_age = max_age
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='capture-stream', daemon=True)
+
+    @property
+    def is_open(self):
+        return not self._closed
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, data, fields=None):
+        """
+        Masukkan frame ke antrian
+
+        Returns:
+            int: nomor urut frame (seq) pada koneksi ini
+        """
+        with self._cond:
+            self.received += 1
+            seq = self.received
+            stale = []
+            while len(self._pending) >= self.window:
+                stale.append(self._pending.popleft())
+            self._pending.append((seq, time.monotonic(), data, fields or {}))
+            self._cond.notify()
+
+        for stale_seq, _, _, _ in stale:
+            self._drop(stale_seq, 'backlog')
+        return seq
+
+    def emit(self, message):
+        """Kirim event ke client (aman dipanggil dari thread penerima dan worker)"""
+        with self._send_lock:
+            if self._closed and message.get('type') not in ('closed', 'error'):
+                return
+            try:
+                self.send(message)
+            except Exception as e:
+                # Koneksi sudah putus: hentikan worker
+                logger.info(f"Stream capture terputus: {e}")
+                self.close()
+
+    def _drop(self, seq, reason, **extra):
+        self.dropped += 1
+        self.emit(dict(extra, type='dropped', seq=seq, reason=reason))
+
+    def _next(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            return self._pending.popleft()
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+
+            seq, received_at, data, fields = item
+            if time.monotonic() - received_at > self.max_age:
+                self._drop(seq, 'stale')
+                continue
+
+            try:
+                payload = self.process(data, fields)
+            except StreamClosed as e:
+                self.emit({'type': 'closed', 'seq': seq, 'message': str(e)})
+                self.close()
+                return
+            except Exception as e:
+                logger.error(f"Error stream capture frame {seq}: {str(e)}")
+                payload = {'type': 'error', 'error': str(e)}
+
+            self.processed += 1
+            payload.setdefault('type', 'result')
+            payload['seq'] = seq
+            payload['latency_ms'] = round((time.monotonic() - received_at) * 1000.0, 2)
+            self.emit(payload)
+
+    def close(self):
+        """Hentikan worker, frame yang masih menunggu dibuang"""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def join(self, timeout=None):
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped
+        }
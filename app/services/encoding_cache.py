@@ -0,0 +1,390 @@
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.services.flight_recorder import trace_annotate
+import numpy as np
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Data minimal mahasiswa yang dibutuhkan route capture (tanpa ORM object)
+CachedStudent = namedtuple('CachedStudent', ['id', 'student_id', 'name'])
+
+# Perkiraan overhead per mahasiswa (namedtuple + string) untuk memory budget
+_PER_STUDENT_OVERHEAD_BYTES = 200
+
+# Atribut Student yang mempengaruhi isi cache
+_WATCHED_ATTRIBUTES = ('face_encoding_blob', 'face_encoding_json', 'face_gallery_blob',
+                       'is_active', 'class_id')
+
+# Atribut template: perubahannya bisa diterapkan langsung ke matrix kelas (update_student)
+_TEMPLATE_ATTRIBUTES = frozenset(('face_encoding_blob', 'face_encoding_json', 'face_gallery_blob'))
+
+# Lebih dari ini per kelas dalam satu commit (enrollment massal): kelas di-invalidate saja
+_MAX_IN_PLACE_UPDATES = 8
+
+
+class ClassEncodings:
+    """
+    Matrix template encoding (T x 128, float32) untuk satu kelas beserta student id paralel
+
+    Satu mahasiswa bisa punya beberapa baris (gallery). owners berisi index
+    mahasiswa per baris (berurutan); distance per mahasiswa adalah minimum
+    dari semua template-nya. owners None berarti satu baris per mahasiswa.
+    """
+
+    __slots__ = ('class_id', 'student_ids', 'matrix', 'sq_norms', 'students', 'owners', 'starts', 'built_at')
+
+    def __init__(self, class_id, student_ids, matrix, students, sq_norms=None, owners=None):
+        self.class_id = class_id
+        self.student_ids = student_ids
+        self.matrix = matrix
+        # ||b||^2 per baris, dipakai untuk distance M x N
+        self.sq_norms = np.einsum('ij,ij->i', matrix, matrix) if sq_norms is None else sq_norms
+        self.students = students
+        self.owners = owners
+        # Baris pertama setiap mahasiswa, untuk reduksi min per mahasiswa
+        self.starts = None
+        if owners is not None and len(owners):
+            self.starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.students)
+
+    @property
+    def template_count(self):
+        return len(self.matrix)
+
+    @property
+    def nbytes(self):
+        """Perkiraan memory yang dipakai entry ini"""
+        owner_bytes = self.owners.nbytes if self.owners is not None else 0
+        return (self.matrix.nbytes + self.student_ids.nbytes + self.sq_norms.nbytes + owner_bytes +
+                len(self.students) * _PER_STUDENT_OVERHEAD_BYTES)
+
+    def distances(self, unknown_encodings):
+        """
+        Distance euclidean setiap wajah ke setiap mahasiswa dalam satu operasi matrix
+
+        Args:
+            unknown_encodings: array M x 128
+
+        Returns:
+            array M x N (N = jumlah mahasiswa, minimum atas template mahasiswa)
+        """
+        unknown = np.asarray(unknown_encodings, dtype=np.float32).reshape(-1, 128)
+        if len(self.students) == 0:
+            return np.empty((len(unknown), 0), dtype=np.float32)
+
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab
+        sq_distances = (np.einsum('ij,ij->i', unknown, unknown)[:, None]
+                        + self.sq_norms[None, :]
+                        - 2.0 * unknown @ self.matrix.T)
+        distances = np.sqrt(np.maximum(sq_distances, 0.0))
+
+        if self.starts is not None:
+            distances = np.minimum.reduceat(distances, self.starts, axis=1)
+        return distances
+
+    def subset(self, mask):
+        """
+        View sebagian mahasiswa (misalnya yang belum hadir) tanpa menghitung ulang norm
+
+        Args:
+            mask: boolean array sepanjang jumlah mahasiswa
+
+        Returns:
+            ClassEncodings baru berisi mahasiswa yang mask-nya True
+        """
+        mask = np.asarray(mask, dtype=bool)
+        students = [student for student, keep in zip(self.students, mask) if keep]
+
+        if self.owners is None:
+            return ClassEncodings(self.class_id, self.student_ids[mask], self.matrix[mask],
+                                  students, self.sq_norms[mask])
+
+        row_mask = mask[self.owners]
+        owners = (np.cumsum(mask) - 1)[self.owners[row_mask]]
+        return ClassEncodings(self.class_id, self.student_ids[mask], self.matrix[row_mask],
+                              students, self.sq_norms[row_mask], owners)
+
+    def replace_student(self, student_pk, templates, reduction='min'):
+        """
+        Salinan entry dengan template satu mahasiswa diganti (tanpa query database)
+
+        Args:
+            student_pk: Student.id
+            templates: array K x 128 (baris 0 = encoding utama)
+            reduction: lihat build
+
+        Returns:
+            ClassEncodings baru, atau None jika mahasiswa tidak ada di entry ini
+        """
+        index = np.flatnonzero(self.student_ids == student_pk)
+        if len(index) == 0:
+            return None
+        index = int(index[0])
+
+        templates = np.asarray(templates, dtype=np.float32).reshape(-1, 128)
+        if reduction == 'centroid':
+            templates = templates.mean(axis=0, keepdims=True)
+
+        owners = self.owners if self.owners is not None else np.arange(len(self.students), dtype=np.int64)
+        start, end = np.searchsorted(owners, index, 'left'), np.searchsorted(owners, index, 'right')
+        matrix = np.concatenate([self.matrix[:start], templates, self.matrix[end:]])
+        sq_norms = np.concatenate([self.sq_norms[:start], np.einsum('ij,ij->i', templates, templates),
+                                   self.sq_norms[end:]])
+        owners = np.concatenate([owners[:start], np.full(len(templates), index, dtype=np.int64), owners[end:]])
+
+        entry = ClassEncodings(self.class_id, self.student_ids, matrix, self.students, sq_norms,
+                               owners if len(matrix) != len(self.students) else None)
+        # Umur TTL tetap dihitung dari build terakhir
+        entry.built_at = self.built_at
+        return entry
+
+    @classmethod
+    def build(cls, class_id, reduction='min'):
+        """
+        Load template encoding semua mahasiswa aktif di kelas dari database
+
+        Args:
+            class_id: ID kelas
+            reduction: 'min' (distance ke template terdekat) atau 'centroid' (rata-rata template)
+
+        Returns:
+            ClassEncodings object
+        """
+        from app.models.student import Student
+
+        rows, matrix, owners = Student.load_class_gallery(class_id)
+        students = [CachedStudent(*row) for row in rows]
+        student_ids = np.array([s.id for s in students], dtype=np.int64)
+
+        if len(matrix) == len(students):
+            # Tidak ada gallery tambahan, satu baris per mahasiswa
+            return cls(class_id, student_ids, matrix, students)
+
+        if reduction == 'centroid':
+            counts = np.bincount(owners, minlength=len(students)).astype(np.float32)
+            centroids = np.zeros((len(students), matrix.shape[1]), dtype=np.float32)
+            np.add.at(centroids, owners, matrix)
+            return cls(class_id, student_ids, centroids / counts[:, None], students)
+
+        return cls(class_id, student_ids, matrix, students, owners=owners)
+
+
+class EncodingCache:
+    """LRU cache per kelas untuk matrix face encoding (dipakai di hot path capture)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=60, reduction='min'):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.reduction = reduction
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._class_lookups = {}
+        # Naik setiap invalidate (per kelas) / clear (epoch): build yang dimulai
+        # sebelumnya tidak disimpan ke cache
+        self._generations = {}
+        self._epoch = 0
+
+    def init_app(self, app):
+        """Baca budget dan TTL dari config aplikasi"""
+        self.max_bytes = int(app.config.get('ENCODING_CACHE_MAX_MB', 64) * 1024 * 1024)
+        self.ttl_seconds = app.config.get('ENCODING_CACHE_TTL_SECONDS', 60)
+        self.reduction = app.config.get('FACE_GALLERY_MATCH', 'min')
+        app.extensions['encoding_cache'] = self
+
+    def get_class(self, class_id):
+        """
+        Ambil matrix encoding untuk satu kelas (build sekali, lalu dari memory)
+
+        Args:
+            class_id: ID kelas
+
+        Returns:
+            ClassEncodings object
+        """
+        with self._lock:
+            entry = self._entries.get(class_id)
+            lookups = self._class_lookups.setdefault(class_id, [0, 0])
+            if entry is not None and not self._is_expired(entry):
+                self._entries.move_to_end(class_id)
+                self._hits += 1
+                lookups[0] += 1
+                trace_annotate(encoding_cache='hit', class_id=class_id)
+                return entry
+            self._misses += 1
+            lookups[1] += 1
+            generation = self._generation(class_id)
+        trace_annotate(encoding_cache='miss', class_id=class_id)
+
+        # Build di luar lock supaya kelas lain tidak ikut menunggu query
+        entry = ClassEncodings.build(class_id, self.reduction)
+
+        with self._lock:
+            if self._generation(class_id) != generation:
+                # Mahasiswa kelas berubah selama build: hasil dipakai request ini saja
+                logger.debug(f"Encoding cache kelas {class_id} di-invalidate selama build, tidak disimpan")
+                return entry
+            self._entries[class_id] = entry
+            self._entries.move_to_end(class_id)
+            self._evict()
+
+        logger.info(f"✓ Encoding cache dibangun untuk kelas {class_id}: {len(entry)} mahasiswa")
+        return entry
+
+    def invalidate(self, class_id):
+        """Hapus entry satu kelas dari cache (termasuk build yang sedang berjalan)"""
+        with self._lock:
+            self._generations[class_id] = self._generations.get(class_id, 0) + 1
+            if self._entries.pop(class_id, None) is not None:
+                logger.debug(f"Encoding cache kelas {class_id} di-invalidate")
+
+    def update_student(self, class_id, student_pk, templates):
+        """
+        Ganti template satu mahasiswa di matrix kelas yang di-cache (gallery harvest)
+
+        Check-in tidak memaksa seluruh kelas di-load ulang dari database. Build
+        yang sedang berjalan tetap tidak disimpan karena belum melihat template baru.
+        """
+        with self._lock:
+            self._generations[class_id] = self._generations.get(class_id, 0) + 1
+            entry = self._entries.get(class_id)
+            if entry is None:
+                return
+            updated = entry.replace_student(student_pk, templates, self.reduction)
+            if updated is None:
+                self._entries.pop(class_id, None)
+                return
+            self._entries[class_id] = updated
+            self._evict()
+
+    def defer_student_update(self, student, templates):
+        """
+        Terapkan template mahasiswa ke cache setelah transaksi-nya commit (update_student)
+
+        Perubahan kolom template mahasiswa ini tidak meng-invalidate kelasnya.
+        Object di luar session langsung di-invalidate.
+        """
+        session = object_session(student)
+        if session is None or student.id is None:
+            self.invalidate(student.class_id)
+            return
+        session.info.setdefault('encoding_cache_updates', {})[student.id] = (student.class_id, templates)
+
+    def discard_student_update(self, student):
+        """Batalkan defer_student_update (template diganti lagi dengan cara lain di transaksi yang sama)"""
+        session = object_session(student)
+        if session is not None:
+            session.info.get('encoding_cache_updates', {}).pop(student.id, None)
+
+    def clear(self):
+        """Kosongkan seluruh cache"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Statistik cache untuk monitoring"""
+        with self._lock:
+            return {
+                'classes': len(self._entries),
+                'bytes': sum(entry.nbytes for entry in self._entries.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
+
+    def class_stats(self):
+        """Hit dan miss per kelas: dict class_id -> [hits, misses]"""
+        with self._lock:
+            return {class_id: list(counts) for class_id, counts in self._class_lookups.items()}
+
+    def _generation(self, class_id):
+        return self._epoch, self._generations.get(class_id, 0)
+
+    def _is_expired(self, entry):
+        if not self.ttl_seconds:
+            return False
+        return time.monotonic() - entry.built_at > self.ttl_seconds
+
+    def _evict(self):
+        """Buang entry paling lama tidak dipakai sampai di bawah budget"""
+        total = sum(entry.nbytes for entry in self._entries.values())
+        # Entry terbaru selalu dipertahankan walaupun sendirian melebihi budget
+        while total > self.max_bytes and len(self._entries) > 1:
+            class_id, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            self._evictions += 1
+            logger.info(f"Encoding cache kelas {class_id} di-evict (LRU)")
+
+
+encoding_cache = EncodingCache()
+
+
+def _dirty_class_ids(session):
+    return session.info.setdefault('encoding_cache_dirty_classes', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dirty_classes(session, flush_context):
+    """Catat kelas yang encoding/status mahasiswanya berubah di transaksi ini"""
+    from app.models.student import Student
+
+    dirty = _dirty_class_ids(session)
+    updates = session.info.get('encoding_cache_updates', {})
+
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Student):
+            dirty.add(obj.class_id)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Student):
+            continue
+        state = inspect(obj)
+        for attr in _WATCHED_ATTRIBUTES:
+            history = state.attrs[attr].history
+            if history.has_changes():
+                if attr in _TEMPLATE_ATTRIBUTES and obj.id in updates:
+                    # Diterapkan langsung ke matrix kelas setelah commit
+                    continue
+                dirty.add(obj.class_id)
+                # Jika pindah kelas, kelas lama juga harus di-refresh
+                if attr == 'class_id':
+                    dirty.update(history.deleted)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_dirty_classes(session):
+    dirty = session.info.pop('encoding_cache_dirty_classes', None) or set()
+    updates = session.info.pop('encoding_cache_updates', None) or {}
+
+    by_class = {}
+    for student_pk, (class_id, templates) in updates.items():
+        by_class.setdefault(class_id, []).append((student_pk, templates))
+    for class_id, students in by_class.items():
+        if class_id in dirty:
+            continue
+        if len(students) > _MAX_IN_PLACE_UPDATES:
+            dirty.add(class_id)
+            continue
+        for student_pk, templates in students:
+            encoding_cache.update_student(class_id, student_pk, templates)
+
+    for class_id in dirty:
+        if class_id is not None:
+            encoding_cache.invalidate(class_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_dirty_classes(session, previous_transaction):
+    session.info.pop('encoding_cache_dirty_classes', None)
+    session.info.pop('encoding_cache_updates', None)
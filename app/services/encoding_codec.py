@@ -0,0 +1,86 @@
+import numpy as np
+import struct
+
+# Header: magic, versi format, kode dtype, jumlah baris, dimensi
+ENCODING_MAGIC = b'FENC'
+ENCODING_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sBBHH')
+HEADER_SIZE = _HEADER.size
+
+_DTYPE_CODES = {
+    1: np.dtype('<f4'),
+    2: np.dtype('<f8'),
+}
+_CODE_BY_DTYPE = {dtype: code for code, dtype in _DTYPE_CODES.items()}
+
+
+# Tag untuk encoding yang dibuat sebelum model dicatat (model='small', 1 jitter)
+LEGACY_ENCODING_MODEL = 'dlib-small-j1'
+
+
+def encoding_model_tag(model='small', jitters=1):
+    """Tag model + parameter pembuat encoding (encoding beda tag tidak dicampur dalam satu kelas)"""
+    return f'dlib-{model}-j{int(jitters)}'
+
+
+class EncodingFormatError(ValueError):
+    """Blob encoding tidak valid atau versi tidak dikenal"""
+
+
+def pack_encoding(encoding, dtype=np.float32):
+    """
+    Pack face encoding (1 atau beberapa baris) ke bytes dengan header
+
+    Args:
+        encoding: array (128,) atau (rows, 128)
+        dtype: dtype penyimpanan (default float32)
+
+    Returns:
+        bytes
+    """
+    array = np.asarray(encoding, dtype=np.dtype(dtype).newbyteorder('<'))
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    if array.ndim != 2:
+        raise EncodingFormatError(f"Encoding harus 1D atau 2D, bukan {array.ndim}D")
+
+    rows, dim = array.shape
+    header = _HEADER.pack(ENCODING_MAGIC, ENCODING_FORMAT_VERSION,
+                          _CODE_BY_DTYPE[array.dtype], rows, dim)
+    return header + np.ascontiguousarray(array).tobytes()
+
+
+def read_header(blob):
+    """
+    Parse header blob encoding
+
+    Returns:
+        tuple: (dtype, rows, dim)
+    """
+    if blob is None or len(blob) < HEADER_SIZE:
+        raise EncodingFormatError("Blob encoding terlalu pendek")
+
+    magic, version, dtype_code, rows, dim = _HEADER.unpack_from(blob)
+    if magic != ENCODING_MAGIC:
+        raise EncodingFormatError("Magic header encoding tidak dikenal")
+    if version != ENCODING_FORMAT_VERSION:
+        raise EncodingFormatError(f"Versi format encoding tidak didukung: {version}")
+    if dtype_code not in _DTYPE_CODES:
+        raise EncodingFormatError(f"Kode dtype tidak dikenal: {dtype_code}")
+
+    dtype = _DTYPE_CODES[dtype_code]
+    if len(blob) != HEADER_SIZE + rows * dim * dtype.itemsize:
+        raise EncodingFormatError("Panjang blob tidak sesuai header")
+
+    return dtype, rows, dim
+
+
+def unpack_encoding(blob):
+    """
+    Unpack blob encoding ke numpy array (rows, dim) tanpa copy
+
+    Returns:
+        numpy array read-only
+    """
+    dtype, rows, dim = read_header(blob)
+    return np.frombuffer(blob, dtype=dtype, offset=HEADER_SIZE).reshape(rows, dim)
@@ -0,0 +1,172 @@
+import threading
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nama backend yang dikenal (urut dari yang paling cepat di CPU)
+DETECTOR_NAMES = ('haar', 'yunet', 'hog', 'cnn')
+
+DEFAULT_DETECTOR = 'hog'
+
+
+class DetectorUnavailable(RuntimeError):
+    """Backend detector tidak bisa dipakai (model tidak ada / OpenCV terlalu lama)"""
+
+
+class FaceDetector:
+    """
+    Interface backend face detection
+
+    detect() menerima numpy array RGB dan mengembalikan list
+    (top, right, bottom, left) seperti face_recognition.face_locations.
+    """
+
+    name = None
+
+    def detect(self, image_array):
+        raise NotImplementedError
+
+
+class HogDetector(FaceDetector):
+    """dlib HOG (default, akurasi sedang, ~20-50 ms di frame 320px)"""
+
+    name = 'hog'
+    model = 'hog'
+
+    def __init__(self, upsample=1, **_):
+        self.upsample = upsample
+
+    def detect(self, image_array):
+        import face_recognition
+        return face_recognition.face_locations(
+            image_array, number_of_times_to_upsample=self.upsample, model=self.model
+        )
+
+
+class CnnDetector(HogDetector):
+    """dlib CNN (MMOD) - paling akurat, lambat tanpa GPU; cocok untuk enrollment"""
+
+    name = 'cnn'
+    model = 'cnn'
+
+
+class HaarDetector(FaceDetector):
+    """OpenCV Haar cascade - paling cepat, lebih banyak false positive/negative"""
+
+    name = 'haar'
+
+    def __init__(self, scale_factor=1.1, min_neighbors=5, min_size=24, **_):
+        import cv2
+
+        if not hasattr(cv2, 'CascadeClassifier') or not hasattr(cv2, 'data'):
+            raise DetectorUnavailable('Build OpenCV ini tidak punya modul objdetect/data cascade')
+        path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self._cascade = cv2.CascadeClassifier(path)
+        if self._cascade.empty():
+            raise DetectorUnavailable(f'Haar cascade tidak ditemukan: {path}')
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self._lock = threading.Lock()
+
+    def detect(self, image_array):
+        import cv2
+
+        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+        with self._lock:
+            boxes = self._cascade.detectMultiScale(
+                gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                minSize=(self.min_size, self.min_size)
+            )
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in boxes]
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV DNN YuNet - cepat dan lebih akurat dari HOG untuk wajah kecil/miring"""
+
+    name = 'yunet'
+
+    def __init__(self, model_path=None, min_score=0.8, **_):
+        import cv2
+
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            raise DetectorUnavailable('OpenCV >= 4.5.4 diperlukan untuk YuNet')
+        if not model_path:
+            raise DetectorUnavailable('FACE_DETECTOR_YUNET_MODEL belum diset (file .onnx)')
+        try:
+            self._detector = cv2.FaceDetectorYN.create(model_path, '', (320, 320), min_score)
+        except cv2.error as e:
+            raise DetectorUnavailable(f'Model YuNet tidak bisa dimuat: {e}') from e
+        self._lock = threading.Lock()
+
+    def detect(self, image_array):
+        import cv2
+
+        height, width = image_array.shape[:2]
+        bgr = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+        with self._lock:
+            self._detector.setInputSize((width, height))
+            _, faces = self._detector.detect(bgr)
+
+        if faces is None:
+            return []
+
+        locations = []
+        for x, y, w, h in faces[:, :4]:
+            left, top = max(0, int(x)), max(0, int(y))
+            right, bottom = min(width, int(x + w)), min(height, int(y + h))
+            if right > left and bottom > top:
+                locations.append((top, right, bottom, left))
+        return locations
+
+
+_BACKENDS = {cls.name: cls for cls in (HogDetector, CnnDetector, HaarDetector, YuNetDetector)}
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def create_detector(name, params=None):
+    """
+    Buat backend detector baru
+
+    Raises:
+        DetectorUnavailable: nama tidak dikenal atau model tidak tersedia
+    """
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        raise DetectorUnavailable(f"Detector '{name}' tidak dikenal (pilihan: {', '.join(DETECTOR_NAMES)})")
+    return backend(**(params or {}))
+
+
+def get_detector(name=None, params=None):
+    """
+    Detector per process (di-cache per nama + parameter, aman dipanggil di worker process)
+
+    Backend yang tidak tersedia diganti HOG dengan warning sekali, supaya
+    capture tetap jalan walaupun konfigurasi salah.
+    """
+    name = name or DEFAULT_DETECTOR
+    key = (name, tuple(sorted((params or {}).items())))
+
+    detector = _detectors.get(key)
+    if detector is not None:
+        return detector
+
+    with _detectors_lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            try:
+                detector = create_detector(name, params)
+            except DetectorUnavailable as e:
+                logger.warning(f"✗ Detector {name} tidak tersedia, memakai {DEFAULT_DETECTOR}: {e}")
+                detector = create_detector(DEFAULT_DETECTOR, params)
+            _detectors[key] = detector
+
+    return detector
+
+
+def detect_faces(image_array, name=None, params=None):
+    """Detect wajah dengan backend yang dipilih"""
+    return get_detector(name, params).detect(np.ascontiguousarray(image_array))
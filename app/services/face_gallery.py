@@ -0,0 +1,157 @@
+from flask import current_app
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _pairwise_distances(templates):
+    """Matrix distance euclidean K x K antar template"""
+    sq_norms = np.einsum('ij,ij->i', templates, templates)
+    sq_distances = sq_norms[:, None] + sq_norms[None, :] - 2.0 * templates @ templates.T
+    return np.sqrt(np.maximum(sq_distances, 0.0))
+
+
+class FaceGalleryService:
+    """Service untuk gallery beberapa template encoding per mahasiswa"""
+
+    @staticmethod
+    def merge(gallery, candidate, max_size, min_distance=0.0):
+        """
+        Tambahkan template ke gallery dengan batas ukuran
+
+        Template pertama (foto pendaftaran) selalu dipertahankan. Jika gallery
+        penuh, template yang paling redundan (distance terkecil ke template lain)
+        dibuang - bisa juga kandidat itu sendiri sehingga gallery tidak berubah.
+
+        Args:
+            gallery: array K x 128 (baris 0 = template utama)
+            candidate: 128-dim encoding baru
+            max_size: jumlah template maksimum
+            min_distance: kandidat yang lebih dekat dari ini ke template yang ada dianggap duplikat
+
+        Returns:
+            array baru K' x 128 float32, atau None jika kandidat tidak ditambahkan
+        """
+        candidate = np.asarray(candidate, dtype=np.float32).reshape(1, 128)
+        gallery = np.asarray(gallery, dtype=np.float32).reshape(-1, 128)
+
+        if len(gallery) == 0:
+            return candidate
+
+        nearest = float(np.sqrt(np.min(np.einsum('ij,ij->i', gallery - candidate, gallery - candidate))))
+        if nearest < min_distance:
+            return None
+
+        merged = np.vstack([gallery, candidate])
+        if len(merged) <= max(1, max_size):
+            return merged
+
+        if max_size <= 1:
+            return None
+
+        distances = _pairwise_distances(merged)
+        np.fill_diagonal(distances, np.inf)
+        redundancy = distances.min(axis=1)
+        # Template utama tidak pernah di-evict
+        redundancy[0] = np.inf
+
+        evict = int(np.argmin(redundancy))
+        if evict == len(merged) - 1:
+            return None
+        return np.delete(merged, evict, axis=0)
+
+    @staticmethod
+    def add_template(student, encoding, min_distance=0.0):
+        """
+        Tambahkan encoding ke gallery mahasiswa (belum di-commit)
+
+        Args:
+            student: Student object
+            encoding: 128-dim encoding
+            min_distance: batas duplikat (lihat merge)
+
+        Returns:
+            bool: True jika gallery berubah
+        """
+        max_size = current_app.config.get('FACE_GALLERY_SIZE', 5)
+        merged = FaceGalleryService.merge(student.get_face_gallery(), encoding, max_size, min_distance)
+        if merged is None:
+            return False
+
+        student.set_face_gallery(merged)
+        return True
+
+    @staticmethod
+    def add_requested(form):
+        """Upload dengan add_to_gallery=1 menambah template, bukan mengganti encoding utama"""
+        return form.get('add_to_gallery', '').lower() in ('1', 'true', 'yes', 'on')
+
+    @staticmethod
+    def apply_upload(student, encoding, form):
+        """
+        Tambahkan foto upload ke gallery jika diminta (add_to_gallery) dan
+        mahasiswa sudah punya encoding utama; di-commit
+
+        Args:
+            student: Student object
+            encoding: 128-dim encoding foto upload
+            form: form request upload
+
+        Returns:
+            dict: payload response, None jika upload harus mengganti encoding utama
+        """
+        from app import db
+
+        if not FaceGalleryService.add_requested(form) or not student.has_face_encoding:
+            return None
+
+        added = FaceGalleryService.add_template(student, encoding)
+        db.session.commit()
+        return {
+            'message': 'Template ditambahkan ke gallery' if added else 'Template sudah terwakili di gallery',
+            'added': added,
+            'student': student.to_dict()
+        }
+
+    @staticmethod
+    def harvest(student_id, encoding, confidence):
+        """
+        Tambahkan encoding dari capture ber-confidence tinggi ke gallery mahasiswa
+
+        Dipanggil sekali per check-in baru (bukan per frame), sehingga gallery
+        bertambah dengan variasi pencahayaan/pose dari kondisi kelas sebenarnya.
+
+        Args:
+            student_id: ID mahasiswa (primary key)
+            encoding: 128-dim encoding dari frame
+            confidence: confidence match
+
+        Returns:
+            bool: True jika template ditambahkan
+        """
+        from app import db
+        from app.models.student import Student
+
+        if encoding is None or current_app.config.get('FACE_GALLERY_SIZE', 5) <= 1:
+            return False
+        if confidence < current_app.config.get('FACE_GALLERY_HARVEST_CONFIDENCE', 0.55):
+            return False
+
+        try:
+            student = Student.query.get(student_id)
+            if student is None or not student.has_face_encoding:
+                return False
+
+            min_distance = current_app.config.get('FACE_GALLERY_MIN_DISTANCE', 0.15)
+            if not FaceGalleryService.add_template(student, encoding, min_distance):
+                return False
+
+            db.session.commit()
+            logger.info(f"✓ Template baru di gallery {student.student_id} (confidence: {confidence:.2f})")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"✗ Error saat harvest template: {str(e)}")
+            return False
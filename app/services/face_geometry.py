@@ -0,0 +1,73 @@
+# Helper geometri untuk box wajah dalam format face_recognition: (top, right, bottom, left)
+
+
+def box_area(box):
+    """Luas box (0 jika tidak valid)"""
+    top, right, bottom, left = box
+    return max(0, bottom - top) * max(0, right - left)
+
+
+def box_iou(a, b):
+    """Intersection-over-union dua box"""
+    top = max(a[0], b[0])
+    right = min(a[1], b[1])
+    bottom = min(a[2], b[2])
+    left = max(a[3], b[3])
+
+    intersection = box_area((top, right, bottom, left))
+    if intersection == 0:
+        return 0.0
+
+    return intersection / float(box_area(a) + box_area(b) - intersection)
+
+
+def match_boxes(predicted, truth, min_iou=0.5):
+    """
+    Pasangkan box deteksi dengan box ground truth (greedy, IoU terbesar dulu)
+
+    Setiap box hanya dipakai sekali; pasangan dengan IoU < min_iou tidak dihitung.
+
+    Returns:
+        list of (index predicted, index truth)
+    """
+    pairs = sorted(
+        ((box_iou(p, t), i, j) for i, p in enumerate(predicted) for j, t in enumerate(truth)),
+        reverse=True
+    )
+    used_predicted, used_truth, matches = set(), set(), []
+    for iou, i, j in pairs:
+        if iou < min_iou:
+            break
+        if i in used_predicted or j in used_truth:
+            continue
+        used_predicted.add(i)
+        used_truth.add(j)
+        matches.append((i, j))
+    return matches
+
+
+def box_center(box):
+    """Titik tengah box (x, y)"""
+    top, right, bottom, left = box
+    return ((left + right) / 2.0, (top + bottom) / 2.0)
+
+
+def scale_box(box, scale_x, scale_y=None):
+    """Scale box (scale_y sama dengan scale_x jika tidak diberikan)"""
+    if scale_y is None:
+        scale_y = scale_x
+    top, right, bottom, left = box
+    return (int(round(top * scale_y)), int(round(right * scale_x)),
+            int(round(bottom * scale_y)), int(round(left * scale_x)))
+
+
+def clip_box(box, width, height):
+    """Batasi box ke dalam ukuran image, None jika box kosong setelah di-clip"""
+    top, right, bottom, left = box
+    top = max(0, min(height, top))
+    bottom = max(0, min(height, bottom))
+    left = max(0, min(width, left))
+    right = max(0, min(width, right))
+    if bottom <= top or right <= left:
+        return None
+    return (top, right, bottom, left)
@@ -1,46 +1,71 @@
-import face_recognition
 import numpy as np
-import cv2
 import io
 from PIL import Image
 import logging
 from flask import current_app
+from app.services.timing import StageTimer
+from app.services.metrics import metrics
+from app.services.flight_recorder import trace_span, trace_annotate
+from app.services.face_geometry import box_iou, scale_box
+from app.services.frame_quality import FrameRejected, check_frame, filter_small_faces, quality_stats
+from app.services.image_cache import image_cache, ImageEntry
+from app.services.encoding_codec import encoding_model_tag
+from app.services.face_detectors import detect_faces
+from app.services.recognition_engine import (
+    recognition_engine, EngineBusyError, locate_faces_task, encode_faces_task,
+    find_faces_task, encode_locations_task, encode_full_resolution_task
+)
 
 logger = logging.getLogger(__name__)
 
+# face_recognition (model dlib) dan cv2 di-import di dalam method: process yang tidak
+# melakukan recognition (report/admin) tidak memuat keduanya, lihat model_preload
+
+# Lebar wajah (px) di crop saat validasi box dari client
+HINT_VERIFY_FACE_WIDTH = 100
+
+# Ukuran face chip dlib: wajah selebar ini di image cukup untuk encoding setara resolusi penuh
+FACE_CHIP_SIZE = 150
+
 
 class FaceRecognitionService:
     """Service untuk face recognition operations"""
 
     @staticmethod
-    def encode_face(image_data):
-        """
-        Extract face encoding dari image data
+    def _load_rgb_array(image_data):
+        """Load bytes/PIL Image/file path ke numpy array RGB"""
+        import cv2
 
-        Args:
-            image_data: bytes atau PIL Image atau file path
+        if isinstance(image_data, bytes):
+            image = Image.open(io.BytesIO(image_data))
+        elif isinstance(image_data, str):
+            image = Image.open(image_data)
+        else:
+            image = image_data
 
-        Returns:
-            numpy array (128-dimensional) atau None jika tidak ada wajah
+        # Convert PIL to numpy array
+        image_array = np.array(image)
+
+        # Convert RGBA to RGB jika perlu
+        if len(image_array.shape) == 3 and image_array.shape[2] == 4:
+            image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB)
+
+        return image_array
+
+    @staticmethod
+    def _locate_faces(image_array, resize_scale, timer=None, detector=None, detector_params=None):
         """
-        try:
-            # Load image
-            if isinstance(image_data, bytes):
-                image = Image.open(io.BytesIO(image_data))
-            elif isinstance(image_data, str):
-                image = Image.open(image_data)
-            else:
-                image = image_data
+        Detect wajah di image yang di-resize, return lokasi di koordinat original
 
-            # Convert PIL to numpy array
-            image_array = np.array(image)
+        Args:
+            detector: nama backend (hog, cnn, haar, yunet), default hog
+            detector_params: parameter backend (upsample, model_path, min_score)
+        """
+        import cv2
 
-            # Convert RGBA to RGB jika perlu
-            if len(image_array.shape) == 3 and image_array.shape[2] == 4:
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB)
+        timer = timer or StageTimer()
 
-            # Resize untuk performance (0.25x dari config)
-            resize_scale = current_app.config.get('FRAME_RESIZE_SCALE', 0.25)
+        with timer.stage('resize'):
             if resize_scale != 1.0:
                 height = int(image_array.shape[0] * resize_scale)
                 width = int(image_array.shape[1] * resize_scale)
@@ -48,44 +73,627 @@ class FaceRecognitionService:
             else:
                 small_image = image_array
 
-            # Detect faces
-            face_locations = face_recognition.face_locations(small_image)
+        with timer.stage('detect'):
+            face_locations = detect_faces(small_image, detector, detector_params)
 
-            if not face_locations:
-                logger.warning("Tidak ada wajah terdeteksi di image")
-                return None
+        # Scale kembali ke size original
+        if resize_scale != 1.0:
+            face_locations = [
+                (int(top / resize_scale),
+                 int(right / resize_scale),
+                 int(bottom / resize_scale),
+                 int(left / resize_scale))
+                for top, right, bottom, left in face_locations
+            ]
 
-            # Extract encoding dari wajah pertama (terbesar)
-            # Scale kembali ke size original
-            if resize_scale != 1.0:
-                scaled_locations = [
-                    (int(top / resize_scale),
-                     int(right / resize_scale),
-                     int(bottom / resize_scale),
-                     int(left / resize_scale))
-                    for top, right, bottom, left in face_locations
-                ]
-            else:
-                scaled_locations = face_locations
+        return face_locations
+
+    @staticmethod
+    def _largest_first(face_locations):
+        """Urutkan lokasi wajah dari box terbesar"""
+        return sorted(
+            face_locations,
+            key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]),
+            reverse=True
+        )
+
+    @staticmethod
+    def _crop_around(image_array, location, padding):
+        """
+        Crop region ber-padding di sekitar satu wajah
+
+        Returns:
+            tuple: (crop array, lokasi wajah dalam koordinat crop)
+        """
+        top, right, bottom, left = location
+        pad_y = int((bottom - top) * padding)
+        pad_x = int((right - left) * padding)
+
+        height, width = image_array.shape[:2]
+        y0 = max(0, top - pad_y)
+        y1 = min(height, bottom + pad_y)
+        x0 = max(0, left - pad_x)
+        x1 = min(width, right + pad_x)
+
+        crop = np.ascontiguousarray(image_array[y0:y1, x0:x1])
+        return crop, (top - y0, right - x0, bottom - y0, left - x0)
+
+    @staticmethod
+    def _encode_locations(image_array, face_locations, options, timer):
+        """Hitung encoding untuk lokasi wajah yang sudah diketahui"""
+        import face_recognition
+
+        model = options.get('model', 'small')
+        jitters = options.get('jitters', 1)
+
+        if options.get('mode') != 'crop':
+            with timer.stage('encode'):
+                return face_recognition.face_encodings(
+                    image_array, face_locations, num_jitters=jitters, model=model
+                )
+
+        # Landmark + encoding hanya di crop sekitar wajah, bukan seluruh frame
+        face_encodings = []
+        for location in face_locations:
+            with timer.stage('crop'):
+                crop, crop_location = FaceRecognitionService._crop_around(
+                    image_array, location, options.get('padding', 0.5)
+                )
+            with timer.stage('encode'):
+                face_encodings.extend(
+                    face_recognition.face_encodings(crop, [crop_location], num_jitters=jitters, model=model)
+                )
+        return face_encodings
+
+    @staticmethod
+    def _verify_hints(image_array, hints, options, timer):
+        """
+        Validasi box dari client dengan detection murah di crop sekitar box
+
+        Crop di-downscale sehingga lebar wajah sekitar HINT_VERIFY_FACE_WIDTH px
+        lalu HOG dijalankan tanpa upsample, jauh lebih murah dari detection
+        di seluruh frame.
+
+        Returns:
+            list of face_locations yang terverifikasi (koordinat image_array)
+        """
+        import cv2
+        import face_recognition
+
+        if options.get('hint_validation') == 'none':
+            return list(hints)
+
+        verified = []
+        for hint in hints:
+            with timer.stage('verify'):
+                crop, crop_hint = FaceRecognitionService._crop_around(image_array, hint, 0.25)
+                top, right, bottom, left = hint
+                y0, x0 = top - crop_hint[0], left - crop_hint[3]
+
+                face_width = max(1, right - left)
+                scale = min(1.0, HINT_VERIFY_FACE_WIDTH / float(face_width))
+                if scale < 1.0:
+                    crop = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)),
+                                             max(1, int(crop.shape[0] * scale))))
+
+                candidates = face_recognition.face_locations(crop, number_of_times_to_upsample=0)
+
+            best, best_iou = None, 0.0
+            for candidate in candidates:
+                # Kembalikan ke koordinat image_array
+                candidate = scale_box(candidate, 1.0 / scale)
+                candidate = (candidate[0] + y0, candidate[1] + x0, candidate[2] + y0, candidate[3] + x0)
+                iou = box_iou(candidate, hint)
+                if iou > best_iou:
+                    best, best_iou = candidate, iou
+
+            if best is not None and best_iou >= options.get('hint_min_iou', 0.3):
+                verified.append(best)
+
+        return verified
+
+    @staticmethod
+    def _find_faces(image_array, options, timer=None):
+        """
+        Cari lokasi wajah di numpy array (tanpa app context, aman untuk worker process)
+
+        Jika options['hints'] berisi box dari client, box divalidasi di crop dan
+        detection full-frame hanya dijalankan sebagai fallback.
+
+        Returns:
+            dict: locations, stages (durasi ms), source ('hint' atau 'detector')
+        """
+        timer = timer or StageTimer()
+        face_locations = []
+        source = 'detector'
+
+        if options.get('hints'):
+            face_locations = FaceRecognitionService._verify_hints(
+                image_array, options['hints'], options, timer
+            )
+            if face_locations:
+                source = 'hint'
+
+        if not face_locations:
+            face_locations = FaceRecognitionService._locate_faces(
+                image_array, options['resize_scale'], timer,
+                options.get('detector'), options.get('detector_params')
+            )
+
+        result = {'locations': face_locations, 'stages': timer.stages, 'source': source}
 
-            face_encodings = face_recognition.face_encodings(
-                image_array,
-                scaled_locations,
-                model='small'
+        # Wajah terlalu kecil tidak akan lolos tolerance, encoding di-skip
+        quality = options.get('quality')
+        if quality and face_locations:
+            result['locations'] = filter_small_faces(
+                face_locations, image_array.shape[0], quality.get('min_face_ratio', 0.08)
             )
+            if not result['locations']:
+                result['rejected'] = 'face_too_small'
+
+        return result
+
+    @staticmethod
+    def _encode_regions(full_image, face_locations, options, timer=None):
+        """
+        Encode wajah dari bytes image asli, hanya region wajah (tanpa app context, aman untuk worker process)
+
+        JPEG di-decode dengan draft mode di skala terkecil yang masih membuat
+        wajah terkecil selebar FACE_CHIP_SIZE px, lalu landmark + encoding
+        dijalankan di crop sekitar setiap wajah.
+
+        Args:
+            full_image: bytes image asli
+            face_locations: box wajah dalam koordinat image asli
+
+        Returns:
+            dict: encodings (urutan sama dengan face_locations), stages (durasi ms)
+        """
+        from app.services.frame_decoder import open_image
+
+        timer = timer or StageTimer()
+        smallest = min(max(1, right - left) for _, right, _, left in face_locations)
+        with timer.stage('load'):
+            image, _, original_size = open_image(full_image, min(1.0, FACE_CHIP_SIZE / float(smallest)))
+            image_array = np.asarray(image)
+
+        decoded_scale = image.size[0] / float(original_size[0])
+        locations = [scale_box(location, decoded_scale) for location in face_locations]
+
+        encodings = FaceRecognitionService._encode_locations(
+            image_array, locations, dict(options, mode='crop'), timer
+        )
+        return {'encodings': encodings, 'stages': timer.stages}
+
+    @staticmethod
+    def _encode_full_resolution(full_image, image_array, face_locations, options, timer):
+        """
+        Encode wajah di image resolusi penuh
+
+        Detection berjalan di image hasil reduced decoding (image_array), encoding
+        di image asli supaya encoding capture sebanding dengan encoding foto
+        pendaftaran. Process web hanya membaca header image asli untuk scale box;
+        bytes dan box dikirim ke worker yang men-decode region wajah saja.
+
+        Args:
+            full_image: bytes image asli (lihat frame_decoder.full_resolution_source)
+            image_array: numpy array tempat face_locations dideteksi
+
+        Returns:
+            list of encoding, urutan sama dengan face_locations
+        """
+        with Image.open(io.BytesIO(full_image)) as header:
+            full_width, full_height = header.size
+        scale_x = full_width / float(image_array.shape[1])
+        scale_y = full_height / float(image_array.shape[0])
+        locations = [scale_box(location, scale_x, scale_y) for location in face_locations]
+
+        result = FaceRecognitionService._run(encode_full_resolution_task, bytes(full_image), locations, options)
+        timer.merge(result['stages'])
+        return result['encodings']
+
+    @staticmethod
+    def _detect_and_encode(image_array, options, first_only, full_image, timer):
+        """
+        Detect + encode (satu task engine), atau detect lalu encode di resolusi penuh jika full_image ada
+
+        Returns:
+            tuple: (face_locations, list of encoding)
+        """
+        if full_image is None or not options.get('full_resolution'):
+            result = FaceRecognitionService._run(encode_faces_task, image_array, options, first_only)
+            timer.merge(result['stages'])
+            FaceRecognitionService._finish_quality(options, result)
+            return result['locations'], result['encodings']
+
+        found = FaceRecognitionService._run(find_faces_task, image_array, options)
+        timer.merge(found['stages'])
+        FaceRecognitionService._finish_quality(options, found)
+
+        face_locations = found['locations']
+        if first_only:
+            face_locations = FaceRecognitionService._largest_first(face_locations)[:1]
+        if not face_locations:
+            return [], []
+        return face_locations, FaceRecognitionService._encode_full_resolution(
+            full_image, image_array, face_locations, options, timer
+        )
+
+    @staticmethod
+    def _encode_array(image_array, options, first_only=False):
+        """
+        Detect + encode wajah di numpy array (tanpa app context, aman untuk worker process)
+
+        Args:
+            image_array: numpy array RGB
+            options: dict dari _encode_options
+            first_only: hanya encode wajah terbesar
+
+        Returns:
+            dict: locations, encodings, stages (durasi ms), source ('hint' atau 'detector')
+        """
+        timer = StageTimer()
+        found = FaceRecognitionService._find_faces(image_array, options, timer)
+        face_locations = found['locations']
+
+        result = {'locations': [], 'encodings': [], 'stages': timer.stages, 'source': found['source']}
+        if 'rejected' in found:
+            result['rejected'] = found['rejected']
+        if not face_locations:
+            return result
+
+        # Hanya wajah terbesar yang di-encode jika yang lain tidak dipakai
+        if first_only:
+            face_locations = FaceRecognitionService._largest_first(face_locations)[:1]
+
+        result['locations'] = face_locations
+        result['encodings'] = FaceRecognitionService._encode_locations(
+            image_array, face_locations, options, timer
+        )
+        return result
+
+    @staticmethod
+    def _quality_options():
+        """Threshold quality gate dari config, None jika gate dimatikan"""
+        config = current_app.config
+        if not config.get('FRAME_QUALITY_ENABLED', True):
+            return None
+        return {
+            'min_blur': config.get('FRAME_MIN_BLUR', 20.0),
+            'min_brightness': config.get('FRAME_MIN_BRIGHTNESS', 40.0),
+            'max_brightness': config.get('FRAME_MAX_BRIGHTNESS', 220.0),
+            'max_clipped': config.get('FRAME_MAX_CLIPPED', 0.6),
+            'min_face_ratio': config.get('FACE_MIN_SIZE_RATIO', 0.08)
+        }
+
+    @staticmethod
+    def _detector_options(profile='capture'):
+        """Backend detector dari config: capture (cepat) atau enroll (akurat)"""
+        config = current_app.config
+        if profile == 'enroll':
+            name = config.get('FACE_DETECTOR_ENROLL') or config.get('FACE_DETECTOR_CAPTURE', 'hog')
+        else:
+            name = config.get('FACE_DETECTOR_CAPTURE', 'hog')
+        return name, {
+            'upsample': config.get('FACE_DETECTOR_UPSAMPLE', 1),
+            'model_path': config.get('FACE_DETECTOR_YUNET_MODEL', ''),
+            'min_score': config.get('FACE_DETECTOR_MIN_SCORE', 0.8)
+        }
+
+    @staticmethod
+    def _encode_options(resize_scale=None, face_hints=None, quality_gate=False, profile='capture'):
+        """Parameter encode dari config (dict biasa supaya bisa dikirim ke worker process)"""
+        if resize_scale is None:
+            resize_scale = current_app.config.get('FRAME_RESIZE_SCALE', 0.25)
+        detector, detector_params = FaceRecognitionService._detector_options(profile)
+        return {
+            'resize_scale': resize_scale,
+            'detector': detector,
+            'detector_params': detector_params,
+            'mode': current_app.config.get('FACE_ENCODE_MODE', 'crop'),
+            'padding': current_app.config.get('FACE_CROP_PADDING', 0.5),
+            'model': current_app.config.get('FACE_ENCODING_MODEL', 'small'),
+            'jitters': current_app.config.get('FACE_ENCODING_JITTERS', 1),
+            'hints': face_hints,
+            'hint_validation': current_app.config.get('FACE_HINT_VALIDATION', 'verify'),
+            'hint_min_iou': current_app.config.get('FACE_HINT_MIN_IOU', 0.3),
+            'quality': FaceRecognitionService._quality_options() if quality_gate else None,
+            'full_resolution': current_app.config.get('FRAME_ENCODE_FULL_RESOLUTION', False)
+        }
+
+    @staticmethod
+    def encoding_model(options=None):
+        """Tag model encoding yang dipakai sekarang (disimpan bersama encoding mahasiswa)"""
+        if options is None:
+            options = FaceRecognitionService._encode_options()
+        return encoding_model_tag(options.get('model', 'small'), options.get('jitters', 1))
+
+    @staticmethod
+    def _check_quality(image_array, options, timer):
+        """
+        Quality gate murah (blur/exposure) sebelum frame dikirim ke detector
+
+        Raises:
+            FrameRejected: jika frame tidak layak diproses
+        """
+        if not options.get('quality'):
+            return
+
+        with timer.stage('quality'):
+            reason, metrics = check_frame(image_array, options['quality'])
+
+        if reason is not None:
+            quality_stats.record(reason)
+            logger.info(f"Frame ditolak quality gate: {reason}")
+            raise FrameRejected(reason, metrics)
+
+    @staticmethod
+    def _finish_quality(options, result):
+        """Catat hasil quality gate setelah detection (ukuran wajah)"""
+        if not options.get('quality'):
+            return
+
+        reason = result.get('rejected')
+        quality_stats.record(reason)
+        if reason is not None:
+            logger.info(f"Frame ditolak quality gate: {reason}")
+            raise FrameRejected(reason)
+
+    @staticmethod
+    def _run(task, *args):
+        """Jalankan task di recognition engine jika aktif, atau langsung di thread ini"""
+        if recognition_engine.enabled:
+            with trace_span('engine', task=task.__name__):
+                result = recognition_engine.run(task, *args)
+                if isinstance(result, dict) and 'stages' in result:
+                    trace_annotate(stages=result['stages'])
+                return result
+        return task(*args)
+
+    @staticmethod
+    @metrics.instrument('face.encode_face')
+    def encode_face(image_data, resize_scale=None, timer=None, face_hints=None, quality_gate=False,
+                    profile='capture', full_image=None):
+        """
+        Extract face encoding dari image data
+
+        Args:
+            image_data: bytes atau PIL Image atau file path
+            resize_scale: scale untuk detection (dari config jika None)
+            timer: StageTimer opsional untuk breakdown durasi per stage
+            face_hints: box wajah dari client (koordinat image), detection di-skip jika valid
+            quality_gate: tolak frame buram/gelap/wajah kecil sebelum encoding
+            profile: 'capture' (FACE_DETECTOR_CAPTURE) atau 'enroll' (FACE_DETECTOR_ENROLL)
+            full_image: bytes image asli jika image_data hasil reduced decoding (encoding di resolusi penuh)
+
+        Returns:
+            numpy array (128-dimensional) atau None jika tidak ada wajah
+
+        Raises:
+            FrameRejected: jika quality_gate aktif dan frame ditolak
+        """
+        timer = timer or StageTimer()
+        try:
+            with timer.stage('load'):
+                image_array = FaceRecognitionService._load_rgb_array(image_data)
+
+            # Resize untuk performance (0.25x dari config)
+            options = FaceRecognitionService._encode_options(resize_scale, face_hints, quality_gate, profile)
+            FaceRecognitionService._check_quality(image_array, options, timer)
+
+            face_locations, face_encodings = FaceRecognitionService._detect_and_encode(
+                image_array, options, True, full_image, timer
+            )
+
+            if not face_locations:
+                logger.warning("Tidak ada wajah terdeteksi di image")
+                return None
 
             if face_encodings:
-                logger.info(f"✓ Berhasil extract {len(face_encodings)} face encoding(s)")
-                return face_encodings[0]  # Return encoding pertama (terbesar)
+                logger.info(f"✓ Berhasil extract face encoding ({len(face_locations)} wajah terbesar)")
+                return face_encodings[0]  # Return encoding wajah terbesar
 
             logger.warning("Tidak ada face encoding yang bisa dihasilkan")
             return None
 
+        except (EngineBusyError, FrameRejected):
+            raise
         except Exception as e:
             logger.error(f"✗ Error saat encode_face: {str(e)}")
             return None
 
     @staticmethod
+    @metrics.instrument('face.encode_faces')
+    def encode_faces(image_data, resize_scale=None, timer=None, face_hints=None, quality_gate=False,
+                     full_image=None):
+        """
+        Extract face encoding untuk semua wajah di image
+
+        Args:
+            image_data: bytes atau PIL Image atau file path
+            resize_scale: scale untuk detection (dari config jika None)
+            timer: StageTimer opsional untuk breakdown durasi per stage
+            face_hints: box wajah dari client (koordinat image), detection di-skip jika valid
+            quality_gate: tolak frame buram/gelap/wajah kecil sebelum encoding
+            full_image: bytes image asli jika image_data hasil reduced decoding (encoding di resolusi penuh)
+
+        Returns:
+            tuple: (list of face_locations, numpy array M x 128) - kosong jika tidak ada wajah
+
+        Raises:
+            FrameRejected: jika quality_gate aktif dan frame ditolak
+        """
+        timer = timer or StageTimer()
+        try:
+            with timer.stage('load'):
+                image_array = FaceRecognitionService._load_rgb_array(image_data)
+
+            options = FaceRecognitionService._encode_options(resize_scale, face_hints, quality_gate)
+            FaceRecognitionService._check_quality(image_array, options, timer)
+
+            face_locations, face_encodings = FaceRecognitionService._detect_and_encode(
+                image_array, options, False, full_image, timer
+            )
+
+            if not face_locations:
+                logger.warning("Tidak ada wajah terdeteksi di image")
+                return ([], np.empty((0, 128), dtype=np.float32))
+
+            logger.info(f"✓ Berhasil extract {len(face_encodings)} face encoding(s)")
+            return (face_locations, np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128))
+
+        except (EngineBusyError, FrameRejected):
+            raise
+        except Exception as e:
+            logger.error(f"✗ Error saat encode_faces: {str(e)}")
+            return ([], np.empty((0, 128), dtype=np.float32))
+
+    @staticmethod
+    @metrics.instrument('face.encode_tracked')
+    def encode_tracked(image_data, tracker, resize_scale=None, timer=None, face_hints=None,
+                       first_only=False, quality_gate=False, full_image=None):
+        """
+        Detect wajah, asosiasikan dengan track sesi, lalu encode hanya yang perlu
+
+        Track yang sudah dikenali tidak di-encode ulang sampai waktunya
+        re-verifikasi (TRACKER_REVERIFY_FRAMES).
+
+        Args:
+            image_data: bytes atau PIL Image atau file path
+            tracker: FaceTracker sesi
+            resize_scale: scale untuk detection (dari config jika None)
+            timer: StageTimer opsional untuk breakdown durasi per stage
+            face_hints: box wajah dari client (koordinat image), detection di-skip jika valid
+            first_only: hanya wajah terbesar yang dikembalikan
+            quality_gate: tolak frame buram/gelap/wajah kecil sebelum encoding
+            full_image: bytes image asli jika image_data hasil reduced decoding (encoding di resolusi penuh)
+
+        Returns:
+            list of (Track, encoding atau None), wajah terbesar dulu - encoding None
+            berarti identitas dibawa dari track (atau encode gagal untuk track baru)
+
+        Raises:
+            FrameRejected: jika quality_gate aktif dan frame ditolak
+        """
+        timer = timer or StageTimer()
+        try:
+            with timer.stage('load'):
+                image_array = FaceRecognitionService._load_rgb_array(image_data)
+
+            options = FaceRecognitionService._encode_options(resize_scale, face_hints, quality_gate)
+            FaceRecognitionService._check_quality(image_array, options, timer)
+
+            found = FaceRecognitionService._run(find_faces_task, image_array, options)
+            timer.merge(found['stages'])
+            FaceRecognitionService._finish_quality(options, found)
+
+            if not found['locations']:
+                logger.warning("Tidak ada wajah terdeteksi di image")
+                return []
+
+            # Semua wajah di-update ke tracker supaya track lain tidak hilang
+            face_locations = FaceRecognitionService._largest_first(found['locations'])
+            with timer.stage('track'):
+                tracks = tracker.update(face_locations)
+
+            tracked = list(zip(tracks, face_locations))
+            if first_only:
+                tracked = tracked[:1]
+
+            pending = [(track, location) for track, location in tracked if tracker.needs_encoding(track)]
+            encodings = {}
+            if pending:
+                pending_locations = [location for _, location in pending]
+                if full_image is not None and options.get('full_resolution'):
+                    pending_encodings = FaceRecognitionService._encode_full_resolution(
+                        full_image, image_array, pending_locations, options, timer
+                    )
+                else:
+                    result = FaceRecognitionService._run(
+                        encode_locations_task, image_array, pending_locations, options
+                    )
+                    timer.merge(result['stages'])
+                    pending_encodings = result['encodings']
+                for (track, _), encoding in zip(pending, pending_encodings):
+                    encodings[track.id] = encoding
+
+            logger.info(f"✓ {len(tracked)} wajah di-track, {len(encodings)} di-encode")
+            return [(track, encodings.get(track.id)) for track, _ in tracked]
+
+        except (EngineBusyError, FrameRejected):
+            raise
+        except Exception as e:
+            logger.error(f"✗ Error saat encode_tracked: {str(e)}")
+            return []
+
+    @staticmethod
+    @metrics.instrument('face.analyze_image')
+    def analyze_image(image_data, resize_scale=None, timer=None, encode=False, full_image=None):
+        """
+        Detect wajah (dan encode wajah terbesar) memakai cache content-addressed
+
+        Image yang sama (pixel + parameter) tidak di-detect ulang, dan encode
+        setelah detect pada image yang sama hanya menghitung encoding-nya.
+
+        Args:
+            image_data: bytes atau PIL Image atau file path
+            resize_scale: scale untuk detection (dari config jika None)
+            timer: StageTimer opsional untuk breakdown durasi per stage
+            encode: hitung juga encoding wajah terbesar
+            full_image: bytes image asli jika image_data hasil reduced decoding (encoding di resolusi penuh)
+
+        Returns:
+            tuple: (list of face_locations, encoding wajah terbesar atau None)
+        """
+        timer = timer or StageTimer()
+        try:
+            with timer.stage('load'):
+                image_array = FaceRecognitionService._load_rgb_array(image_data)
+
+            options = FaceRecognitionService._encode_options(resize_scale)
+            with timer.stage('hash'):
+                key = image_cache.key(image_array, options)
+            entry = image_cache.get(key)
+            changed = entry is None
+
+            if entry is None:
+                found = FaceRecognitionService._run(find_faces_task, image_array, options)
+                timer.merge(found['stages'])
+                entry = ImageEntry(found['locations'])
+
+            encoding = None
+            if encode and entry.locations:
+                largest = FaceRecognitionService._largest_first(entry.locations)[0]
+                index = entry.locations.index(largest)
+                encoding = entry.encoding(index)
+
+                if encoding is None:
+                    if full_image is not None and options.get('full_resolution'):
+                        encodings = FaceRecognitionService._encode_full_resolution(
+                            full_image, image_array, [largest], options, timer
+                        )
+                    else:
+                        result = FaceRecognitionService._run(encode_locations_task, image_array, [largest], options)
+                        timer.merge(result['stages'])
+                        encodings = result['encodings']
+                    if encodings:
+                        entry.set_encoding(index, encodings[0])
+                        encoding = entry.encoding(index)
+                        changed = True
+
+            if changed:
+                image_cache.put(key, entry)
+
+            return entry.locations, encoding
+
+        except EngineBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"✗ Error saat analyze_image: {str(e)}")
+            return [], None
+
+    @staticmethod
+    @metrics.instrument('face.compare_faces')
     def compare_faces(unknown_encoding, known_students):
         """
         Compare unknown face dengan list known students
@@ -97,6 +705,8 @@ class FaceRecognitionService:
         Returns:
             tuple: (matched_student, confidence_score) atau (None, 0.0)
         """
+        import face_recognition
+
         if unknown_encoding is None or not known_students:
             return (None, 0.0)
 
@@ -127,60 +737,129 @@ class FaceRecognitionService:
             logger.error(f"✗ Error saat compare_faces: {str(e)}")
             return (None, 0.0)
 
+    @staticmethod
+    @metrics.instrument('face.match_encoding')
+    def match_encoding(unknown_encoding, class_encodings):
+        """
+        Compare unknown face dengan matrix encoding satu kelas (vectorized)
+
+        Args:
+            unknown_encoding: 128-dim array dari webcam
+            class_encodings: ClassEncodings dari encoding_cache
+
+        Returns:
+            tuple: (CachedStudent, confidence_score) atau (None, 0.0)
+        """
+        if unknown_encoding is None or class_encodings is None or len(class_encodings) == 0:
+            return (None, 0.0)
+
+        try:
+            tolerance = current_app.config.get('FACE_RECOGNITION_TOLERANCE', 0.6)
+
+            # Euclidean distance ke semua mahasiswa sekaligus (minimum atas template gallery)
+            distances = class_encodings.distances(unknown_encoding)[0]
+
+            best_match_index = int(distances.argmin())
+            best_distance = float(distances[best_match_index])
+            confidence = 1.0 - best_distance
+
+            if best_distance <= tolerance:
+                matched_student = class_encodings.students[best_match_index]
+                logger.info(f"✓ Face matched dengan {matched_student.name} (confidence: {confidence:.2f})")
+                return (matched_student, confidence)
+
+            logger.warning(f"Tidak ada match atau confidence < threshold (min distance: {best_distance:.2f})")
+            return (None, 0.0)
+
+        except Exception as e:
+            logger.error(f"✗ Error saat match_encoding: {str(e)}")
+            return (None, 0.0)
+
+    @staticmethod
+    @metrics.instrument('face.match_encodings')
+    def match_encodings(unknown_encodings, class_encodings):
+        """
+        Match beberapa wajah sekaligus ke matrix kelas dengan assignment one-to-one
+
+        Distance M x N dihitung dalam satu operasi matrix, lalu pasangan
+        (wajah, mahasiswa) diambil secara greedy dari distance terkecil
+        sehingga dua wajah tidak bisa mengklaim mahasiswa yang sama.
+
+        Args:
+            unknown_encodings: array M x 128 dari frame
+            class_encodings: ClassEncodings dari encoding_cache
+
+        Returns:
+            list of (CachedStudent, confidence) atau (None, 0.0), satu per wajah
+        """
+        unknown = np.asarray(unknown_encodings, dtype=np.float32).reshape(-1, 128)
+        results = [(None, 0.0)] * len(unknown)
+
+        if len(unknown) == 0 or class_encodings is None or len(class_encodings) == 0:
+            return results
+
+        tolerance = current_app.config.get('FACE_RECOGNITION_TOLERANCE', 0.6)
+
+        # M x N, template gallery sudah direduksi per mahasiswa
+        distances = class_encodings.distances(unknown)
+
+        face_idx, student_idx = np.nonzero(distances <= tolerance)
+        order = np.argsort(distances[face_idx, student_idx], kind='stable')
+
+        assigned_faces = set()
+        assigned_students = set()
+        for k in order:
+            face, student = int(face_idx[k]), int(student_idx[k])
+            if face in assigned_faces or student in assigned_students:
+                continue
+            assigned_faces.add(face)
+            assigned_students.add(student)
+            results[face] = (class_encodings.students[student], 1.0 - float(distances[face, student]))
+
+        logger.info(f"✓ {len(assigned_faces)}/{len(unknown)} wajah matched")
+        return results
+
     @staticmethod
     def detect_faces_in_frame(frame_data, resize_scale=None):
         """
         Detect faces dalam webcam frame (client-side helper)
 
         Args:
-            frame_data: image data (bytes atau numpy array)
+            frame_data: image data (bytes, PIL Image atau numpy array BGR)
             resize_scale: scale untuk resize (dari config jika None)
 
         Returns:
             list of face_locations atau []
         """
+        import cv2
+
         if resize_scale is None:
             resize_scale = current_app.config.get('FRAME_RESIZE_SCALE', 0.25)
 
         try:
             # Load image
-            if isinstance(frame_data, bytes):
-                image = Image.open(io.BytesIO(frame_data))
-                image_array = np.array(image)
-            else:
+            if isinstance(frame_data, np.ndarray):
                 image_array = frame_data
 
-            # Ensure RGB
-            if len(image_array.shape) == 3:
-                if image_array.shape[2] == 4:  # RGBA
-                    image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB)
-                elif image_array.shape[2] == 3:
-                    # BGR ke RGB
-                    image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-
-            # Resize untuk performance
-            if resize_scale != 1.0:
-                height = int(image_array.shape[0] * resize_scale)
-                width = int(image_array.shape[1] * resize_scale)
-                small_image = cv2.resize(image_array, (width, height))
+                # Ensure RGB
+                if len(image_array.shape) == 3:
+                    if image_array.shape[2] == 4:  # RGBA
+                        image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB)
+                    elif image_array.shape[2] == 3:
+                        # BGR ke RGB
+                        image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
             else:
-                small_image = image_array
-
-            # Detect faces
-            face_locations = face_recognition.face_locations(small_image)
+                # bytes / PIL Image sudah RGB
+                image_array = FaceRecognitionService._load_rgb_array(frame_data)
 
-            # Scale back if resized
-            if resize_scale != 1.0:
-                face_locations = [
-                    (int(top / resize_scale),
-                     int(right / resize_scale),
-                     int(bottom / resize_scale),
-                     int(left / resize_scale))
-                    for top, right, bottom, left in face_locations
-                ]
-
-            return face_locations
+            # Detect faces (resize untuk performance, lokasi di-scale kembali)
+            detector, detector_params = FaceRecognitionService._detector_options()
+            return FaceRecognitionService._run(
+                locate_faces_task, image_array, resize_scale, detector, detector_params
+            )
 
+        except EngineBusyError:
+            raise
         except Exception as e:
             logger.error(f"✗ Error saat detect_faces_in_frame: {str(e)}")
             return []
@@ -198,6 +877,9 @@ class FaceRecognitionService:
         Returns:
             list of 128-dim arrays
         """
+        import cv2
+        import face_recognition
+
         if resize_scale is None:
             resize_scale = current_app.config.get('FRAME_RESIZE_SCALE', 0.25)
 
@@ -242,7 +924,8 @@ class FaceRecognitionService:
                 face_encodings = face_recognition.face_encodings(
                     image_array,
                     face_locations,
-                    model='small'
+                    num_jitters=current_app.config.get('FACE_ENCODING_JITTERS', 1),
+                    model=current_app.config.get('FACE_ENCODING_MODEL', 'small')
                 )
                 return face_encodings
 
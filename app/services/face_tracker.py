@@ -0,0 +1,124 @@
+from app.services.face_geometry import box_iou, box_center
+import itertools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Track:
+    """Satu wajah yang diikuti antar frame berurutan"""
+
+    __slots__ = ('id', 'box', 'student', 'confidence', 'last_seen', 'frames_since_verify')
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box
+        self.student = None
+        self.confidence = 0.0
+        self.last_seen = now
+        self.frames_since_verify = 0
+
+    @property
+    def identified(self):
+        return self.student is not None
+
+
+class FaceTracker:
+    """
+    Asosiasi box wajah antar frame (IoU, fallback jarak centroid) untuk satu sesi
+
+    Track yang sudah dikenali membawa identitasnya ke frame berikutnya sehingga
+    wajah yang sama tidak di-encode ulang setiap frame. Encoding hanya dilakukan
+    untuk track baru, track yang belum dikenali, atau saat re-verifikasi periodik.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age_seconds=2.0, reverify_frames=10):
+        self.iou_threshold = iou_threshold
+        self.max_age_seconds = max_age_seconds
+        self.reverify_frames = reverify_frames
+        self._tracks = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def update(self, boxes, now=None):
+        """
+        Asosiasikan box di frame ini dengan track yang ada
+
+        Args:
+            boxes: list of (top, right, bottom, left)
+            now: timestamp (time.monotonic jika None)
+
+        Returns:
+            list of Track, satu per box (urutan sama dengan boxes)
+        """
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            # Buang track yang sudah lama tidak terlihat
+            self._tracks = [t for t in self._tracks if now - t.last_seen <= self.max_age_seconds]
+
+            assigned = [None] * len(boxes)
+            free_tracks = set(range(len(self._tracks)))
+
+            # Greedy: pasangan dengan IoU terbesar dulu
+            pairs = []
+            for i, box in enumerate(boxes):
+                for j, track in enumerate(self._tracks):
+                    iou = box_iou(box, track.box)
+                    if iou >= self.iou_threshold:
+                        pairs.append((iou, i, j))
+            for _, i, j in sorted(pairs, reverse=True):
+                if assigned[i] is None and j in free_tracks:
+                    assigned[i] = self._tracks[j]
+                    free_tracks.discard(j)
+
+            # Fallback centroid untuk gerakan cepat (IoU kecil tapi posisi dekat)
+            for i, box in enumerate(boxes):
+                if assigned[i] is not None:
+                    continue
+                j = self._nearest_track(box, free_tracks)
+                if j is not None:
+                    assigned[i] = self._tracks[j]
+                    free_tracks.discard(j)
+
+            for i, box in enumerate(boxes):
+                track = assigned[i]
+                if track is None:
+                    track = Track(next(self._ids), box, now)
+                    self._tracks.append(track)
+                    assigned[i] = track
+                else:
+                    track.box = box
+                    track.last_seen = now
+                    track.frames_since_verify += 1
+
+            return assigned
+
+    def _nearest_track(self, box, candidates):
+        cx, cy = box_center(box)
+        max_distance = 0.5 * (box[1] - box[3])
+        best, best_distance = None, max_distance
+        for j in candidates:
+            tx, ty = box_center(self._tracks[j].box)
+            distance = ((cx - tx) ** 2 + (cy - ty) ** 2) ** 0.5
+            if distance <= best_distance:
+                best, best_distance = j, distance
+        return best
+
+    def needs_encoding(self, track):
+        """Track perlu di-encode jika belum dikenali atau sudah waktunya re-verifikasi"""
+        return not track.identified or track.frames_since_verify >= self.reverify_frames
+
+    def identify(self, track, student, confidence):
+        """Set identitas track dari hasil matching (None jika tidak dikenali)"""
+        with self._lock:
+            if track.identified and student is not None and track.student.id != student.id:
+                logger.info(f"Track {track.id} berganti identitas: {track.student.id} -> {student.id}")
+            track.student = student
+            track.confidence = confidence if student is not None else 0.0
+            track.frames_since_verify = 0
+
+    def __len__(self):
+        return len(self._tracks)
@@ -0,0 +1,352 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+import threading
+import time
+import json
+import uuid
+import sys
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Trace request yang sedang berjalan di thread/context ini (None = recorder mati / di luar request)
+_current_trace = ContextVar('flight_recorder_trace', default=None)
+
+# Panjang maksimum SQL statement yang disimpan
+_MAX_STATEMENT_CHARS = 500
+
+
+class Span:
+    """Satu node span tree: offset mulai dan durasi (ms) relatif terhadap awal request"""
+
+    __slots__ = ('name', 'start_ms', 'duration_ms', 'attrs', 'children')
+
+    def __init__(self, name, start_ms, attrs=None):
+        self.name = name
+        self.start_ms = start_ms
+        self.duration_ms = None
+        self.attrs = attrs or {}
+        self.children = []
+
+    def as_dict(self):
+        data = {'name': self.name, 'start_ms': round(self.start_ms, 3),
+                'duration_ms': round(self.duration_ms, 3) if self.duration_ms is not None else None}
+        if self.attrs:
+            data['attrs'] = self.attrs
+        if self.children:
+            data['children'] = [child.as_dict() for child in self.children]
+        return data
+
+
+class Trace:
+    """Span tree satu request (stage, SQL, atribut) + stack sample opsional"""
+
+    def __init__(self, name, max_spans):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.root = Span(name, 0.0)
+        self.stack = [self.root]
+        self.max_spans = max_spans
+        self.span_count = 0
+        self.dropped_spans = 0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.samples = None
+
+    def offset_ms(self):
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def open(self, name, attrs=None):
+        """Span anak dari span aktif, None jika batas span tercapai"""
+        if self.span_count >= self.max_spans:
+            self.dropped_spans += 1
+            return None
+        self.span_count += 1
+        span = Span(name, self.offset_ms(), attrs)
+        self.stack[-1].children.append(span)
+        return span
+
+    def add(self, name, duration_ms, attrs=None):
+        """Span yang sudah selesai (durasi diketahui), berakhir sekarang"""
+        span = self.open(name, attrs)
+        if span is not None:
+            span.start_ms = max(0.0, span.start_ms - duration_ms)
+            span.duration_ms = duration_ms
+        return span
+
+
+@contextmanager
+def trace_span(name, **attrs):
+    """Span di trace request saat ini (no-op jika tidak ada trace)"""
+    trace = _current_trace.get()
+    span = trace.open(name, attrs) if trace is not None else None
+    if span is None:
+        yield
+        return
+
+    trace.stack.append(span)
+    try:
+        yield
+    finally:
+        span.duration_ms = trace.offset_ms() - span.start_ms
+        trace.stack.pop()
+
+
+def trace_annotate(**attrs):
+    """Tambah atribut (ukuran image, jumlah wajah, cache hit) ke span aktif"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.stack[-1].attrs.update(attrs)
+
+
+class StackSampler:
+    """
+    Sampling profiler: satu thread mengambil stack thread request yang sedang di-trace
+    setiap interval, hasilnya folded stack (format flamegraph.pl / speedscope)
+    """
+
+    def __init__(self, interval_seconds=0.005):
+        self.interval_seconds = interval_seconds
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def start(self, trace):
+        trace.samples = {}
+        with self._lock:
+            self._targets[threading.get_ident()] = trace
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='flight-recorder-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        with self._lock:
+            self._targets.pop(threading.get_ident(), None)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval_seconds)
+            with self._lock:
+                targets = list(self._targets.items())
+                if not targets:
+                    self._wake.clear()
+            if not targets:
+                # Tidak ada request yang di-profile: tidur sampai start() berikutnya
+                self._wake.wait()
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, trace in targets:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                stack = _folded(frame)
+                trace.samples[stack] = trace.samples.get(stack, 0) + 1
+
+
+def _folded(frame):
+    """Stack frame -> 'root;...;leaf' (nama fungsi + file:line awal fungsi)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+                     .replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class FlightRecorder:
+    """
+    Flight recorder request lambat (opt-in, FLIGHT_RECORDER_ENABLED)
+
+    Setiap request punya span tree: stage StageTimer, SQL statement beserta
+    durasinya, dan atribut (ukuran image, jumlah wajah, cache hit). Hanya
+    request yang melewati FLIGHT_RECORDER_THRESHOLD_MS atau membawa header
+    debug (user login) yang ditulis ke file JSONL yang di-rotate; sisanya
+    dibuang di akhir request. Dengan FLIGHT_RECORDER_PROFILE stack request
+    juga di-sample dan request yang disimpan mendapat file .folded.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold_ms = 1000.0
+        self.debug_header = 'X-Debug-Trace'
+        self.max_spans = 500
+        self.profile = False
+        self.profile_dir = None
+        self.profile_max_files = 200
+        self.sampler = None
+        self._writer = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get('FLIGHT_RECORDER_ENABLED', False)
+        self.threshold_ms = app.config.get('FLIGHT_RECORDER_THRESHOLD_MS', 1000.0)
+        self.debug_header = app.config.get('FLIGHT_RECORDER_DEBUG_HEADER', 'X-Debug-Trace')
+        self.max_spans = app.config.get('FLIGHT_RECORDER_MAX_SPANS', 500)
+        self.profile = app.config.get('FLIGHT_RECORDER_PROFILE', False)
+        self.profile_dir = app.config.get('FLIGHT_RECORDER_PROFILE_DIR', 'logs/profiles')
+        self.profile_max_files = app.config.get('FLIGHT_RECORDER_PROFILE_MAX_FILES', 200)
+        app.extensions['flight_recorder'] = self
+
+        if not self.enabled:
+            return
+
+        self._writer = self._create_writer(
+            app.config.get('FLIGHT_RECORDER_FILE', 'logs/slow_requests.jsonl'),
+            app.config.get('FLIGHT_RECORDER_MAX_MB', 10),
+            app.config.get('FLIGHT_RECORDER_BACKUPS', 5)
+        )
+        if self.profile:
+            self.sampler = StackSampler(app.config.get('FLIGHT_RECORDER_PROFILE_INTERVAL_MS', 5) / 1000.0)
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+        _listen_sql()
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        logger.info(f"✓ Flight recorder aktif: request > {self.threshold_ms:.0f} ms disimpan")
+
+    @staticmethod
+    def _create_writer(path, max_mb, backups):
+        writer = logging.getLogger('flight_recorder')
+        writer.setLevel(logging.INFO)
+        writer.propagate = False
+
+        path = os.path.abspath(path)
+        if not any(getattr(handler, 'baseFilename', None) == path for handler in writer.handlers):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=int(max_mb * 1024 * 1024), backupCount=backups,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            writer.addHandler(handler)
+        return writer
+
+    def _start_request(self):
+        from flask import request, g
+
+        if request.endpoint == 'static':
+            return
+        trace = Trace(f'{request.method} {request.path}', self.max_spans)
+        g.flight_trace_token = _current_trace.set(trace)
+        g.flight_trace = trace
+        if self.sampler is not None:
+            self.sampler.start(trace)
+
+    def _finish_request(self, response):
+        from flask import request, g
+        from flask_login import current_user
+
+        trace = g.pop('flight_trace', None)
+        if trace is None:
+            return response
+        self._detach(g)
+
+        trace.root.duration_ms = trace.offset_ms()
+        if trace.root.duration_ms >= self.threshold_ms:
+            reason = 'slow'
+        elif request.headers.get(self.debug_header) and current_user.is_authenticated:
+            reason = 'debug'
+        else:
+            return response
+
+        try:
+            self._write(trace, reason, request, response, current_user)
+            response.headers['X-Trace-Id'] = trace.trace_id
+        except Exception as e:
+            logger.error(f"✗ Gagal menyimpan trace {trace.trace_id}: {str(e)}")
+        return response
+
+    def _teardown_request(self, exc=None):
+        from flask import g
+
+        # Request yang gagal sebelum after_request: trace dibuang
+        if g.pop('flight_trace', None) is not None:
+            self._detach(g)
+
+    def _detach(self, g):
+        if self.sampler is not None:
+            self.sampler.stop()
+        token = g.pop('flight_trace_token', None)
+        if token is not None:
+            _current_trace.reset(token)
+
+    def _write(self, trace, reason, request, response, user):
+        profile_path = None
+        if trace.samples:
+            profile_path = self._write_profile(trace)
+
+        self._writer.info(json.dumps({
+            'trace_id': trace.trace_id,
+            'timestamp': trace.started_at.isoformat(),
+            'reason': reason,
+            'pid': os.getpid(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'user_id': user.get_id() if user.is_authenticated else None,
+            'duration_ms': round(trace.root.duration_ms, 3),
+            'sql_count': trace.sql_count,
+            'sql_ms': round(trace.sql_ms, 3),
+            'dropped_spans': trace.dropped_spans,
+            'profile': profile_path,
+            'spans': trace.root.as_dict()
+        }, default=str))
+
+    def _write_profile(self, trace):
+        path = os.path.join(self.profile_dir, f'{trace.started_at:%Y%m%d-%H%M%S}-{trace.trace_id}.folded')
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(trace.samples.items()):
+                f.write(f'{stack} {count}\n')
+
+        # Batasi jumlah file profile (yang paling lama dihapus)
+        names = sorted(name for name in os.listdir(self.profile_dir) if name.endswith('.folded'))
+        for name in names[:max(0, len(names) - self.profile_max_files)]:
+            try:
+                os.remove(os.path.join(self.profile_dir, name))
+            except OSError:
+                pass
+        return path
+
+
+_sql_listening = False
+
+
+def _listen_sql():
+    """Durasi setiap SQL statement dicatat sebagai span (semua engine SQLAlchemy)"""
+    global _sql_listening
+    if _sql_listening:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_trace.get() is not None:
+            conn.info.setdefault('flight_recorder_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        started = conn.info.get('flight_recorder_started')
+        if trace is None or not started:
+            return
+        duration_ms = (time.perf_counter() - started.pop()) * 1000.0
+        trace.sql_count += 1
+        trace.sql_ms += duration_ms
+        trace.add('sql', duration_ms, {'statement': statement[:_MAX_STATEMENT_CHARS], 'rows': cursor.rowcount})
+
+    _sql_listening = True
+
+
+flight_recorder = FlightRecorder()
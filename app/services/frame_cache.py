@@ -0,0 +1,127 @@
+from PIL import Image
+import numpy as np
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# dHash 16 x 16 = 256 bit (64 bit terlalu kasar: wajah berbeda di posisi sama bisa mirip)
+FRAME_HASH_SIZE = 16
+
+
+def dhash(image, hash_size=FRAME_HASH_SIZE):
+    """
+    Difference hash dari thumbnail grayscale (hash_size + 1) x hash_size
+
+    Setiap bit = apakah pixel lebih terang dari tetangga kanannya, sehingga
+    noise kamera dan perubahan kompresi JPEG hanya membalik sedikit bit.
+
+    Args:
+        image: PIL Image atau numpy array RGB
+        hash_size: jumlah baris (hash berisi hash_size^2 bit)
+
+    Returns:
+        int: hash sebagai integer
+    """
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+
+    thumb = image.convert('L').resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    """Jumlah bit yang berbeda antara dua hash"""
+    return bin(a ^ b).count('1')
+
+
+class FrameResultCache:
+    """
+    Cache hasil recognition per sesi, di-key dengan perceptual hash frame
+
+    Webcam yang mengarah ke scene diam mengirim frame yang hampir identik setiap
+    interval capture. Frame dengan hash dalam max_distance bit dari frame yang
+    dilihat kurang dari ttl_seconds lalu memakai hasil frame tersebut tanpa
+    detection/encoding.
+    """
+
+    def __init__(self, ttl_seconds=3.0, max_distance=8, max_entries=8):
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def lookup(self, frame_hash, mode, now=None):
+        """
+        Cari hasil untuk frame yang mirip
+
+        Args:
+            frame_hash: hasil dhash
+            mode: jenis hasil ('single', 'multi', ...) - hasil beda mode tidak tertukar
+            now: waktu monotonic (default sekarang)
+
+        Returns:
+            hasil yang disimpan, atau None jika miss
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries = [entry for entry in self._entries if now - entry[1] <= self.ttl_seconds]
+
+            best = None
+            for entry in self._entries:
+                if entry[2] != mode:
+                    continue
+                distance = hamming_distance(frame_hash, entry[0])
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, entry)
+
+        frame_cache_stats.record(best is not None)
+        return best[1][3] if best is not None else None
+
+    def store(self, frame_hash, mode, result, now=None):
+        """Simpan hasil recognition frame (entry terlama dibuang jika penuh)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries.append((frame_hash, now, mode, result))
+            if len(self._entries) > self.max_entries:
+                del self._entries[:len(self._entries) - self.max_entries]
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FrameCacheStats:
+    """Counter hit/miss frame cache (in-process, semua sesi)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'lookups': total,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0
+            }
+
+
+frame_cache_stats = FrameCacheStats()
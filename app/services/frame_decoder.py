@@ -0,0 +1,200 @@
+from collections import namedtuple
+from PIL import Image
+from app.services.face_geometry import scale_box, clip_box
+from app.services.flight_recorder import trace_annotate
+import base64
+import binascii
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Content-Type body mentah yang diterima sebagai frame
+RAW_IMAGE_MIMETYPES = ('image/jpeg', 'image/jpg', 'image/webp', 'image/png')
+
+# Nama field file pada multipart upload
+MULTIPART_IMAGE_FIELDS = ('image', 'frame', 'photo')
+
+# image: PIL Image (RGB), resize_scale: sisa scale yang masih harus diterapkan,
+# raw_bytes: bytes image asli (sebelum decode),
+# original_size: (width, height) image sebelum reduced decoding,
+# fields: field request lain (session_id, dll)
+DecodedFrame = namedtuple('DecodedFrame', ['image', 'resize_scale', 'raw_bytes', 'original_size', 'fields'])
+
+
+class FrameDecodeError(ValueError):
+    """Image di request tidak bisa di-decode"""
+
+
+def open_image(source, resize_scale=1.0):
+    """
+    Decode image, memakai reduced-resolution JPEG decoding jika resize_scale < 1
+
+    Untuk JPEG, PIL draft mode membuat libjpeg langsung men-decode di skala
+    1/2, 1/4 atau 1/8 sehingga image ukuran penuh tidak pernah dibuat.
+
+    Args:
+        source: bytes atau file-like object
+        resize_scale: target scale terhadap ukuran asli
+
+    Returns:
+        tuple: (PIL Image RGB, sisa resize_scale setelah decode, ukuran asli (width, height))
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    try:
+        image = Image.open(source)
+        original_size = image.size
+
+        if image.format == 'JPEG' and resize_scale < 1.0:
+            target = (max(1, int(image.size[0] * resize_scale)),
+                      max(1, int(image.size[1] * resize_scale)))
+            image.draft('RGB', target)
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        else:
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise FrameDecodeError(str(e)) from e
+
+    decoded_scale = image.size[0] / original_size[0]
+    return image, resize_scale / decoded_scale, original_size
+
+
+def full_resolution_source(frame):
+    """
+    Bytes image asli untuk encoding wajah di resolusi penuh (seperti foto pendaftaran)
+
+    Returns:
+        bytes jika frame.image hasil reduced decoding, None jika frame.image sudah resolusi penuh
+    """
+    if frame.image is None or frame.raw_bytes is None or frame.image.size == tuple(frame.original_size):
+        return None
+    return frame.raw_bytes
+
+
+def _decode_base64(image_data):
+    # Remove data URL header jika ada
+    if ',' in image_data:
+        image_data = image_data.split(',', 1)[1]
+    try:
+        return base64.b64decode(image_data)
+    except (binascii.Error, ValueError) as e:
+        raise FrameDecodeError(str(e)) from e
+
+
+def read_request_image(request):
+    """
+    Ambil bytes image dari request tanpa decode, dalam salah satu format yang didukung:
+
+    - body mentah image/jpeg, image/webp atau image/png (field lain via query string)
+    - multipart/form-data dengan file 'image', 'frame' atau 'photo'
+    - JSON dengan 'image_data' base64 / data URL (format lama)
+
+    Args:
+        request: Flask request
+
+    Returns:
+        tuple: (bytes image atau None jika request tidak membawa image, field request lain)
+
+    Raises:
+        FrameDecodeError: jika base64 tidak valid
+    """
+    mimetype = request.mimetype
+
+    if mimetype in RAW_IMAGE_MIMETYPES:
+        return request.get_data(cache=False) or None, request.args.to_dict()
+
+    if mimetype == 'multipart/form-data':
+        fields = request.args.to_dict()
+        fields.update(request.form.to_dict())
+        for name in MULTIPART_IMAGE_FIELDS:
+            upload = request.files.get(name)
+            if upload is not None:
+                return upload.read() or None, fields
+        return None, fields
+
+    fields = request.get_json(silent=True) or {}
+    image_data = fields.get('image_data')
+    if not image_data:
+        return None, fields
+    return _decode_base64(image_data), fields
+
+
+def decode_frame(raw_bytes, fields, resize_scale=1.0):
+    """
+    Decode bytes image menjadi DecodedFrame (reduced-resolution decoding untuk JPEG)
+
+    Raises:
+        FrameDecodeError: jika image tidak valid
+    """
+    if not raw_bytes:
+        return DecodedFrame(None, resize_scale, None, None, fields)
+    image, remaining_scale, original_size = open_image(raw_bytes, resize_scale)
+    trace_annotate(bytes=len(raw_bytes), original_size=list(original_size), decoded_size=list(image.size))
+    return DecodedFrame(image, remaining_scale, raw_bytes, original_size, fields)
+
+
+def read_request_frame(request, resize_scale=1.0):
+    """
+    Ambil dan decode frame dari request (format seperti read_request_image)
+
+    Args:
+        request: Flask request
+        resize_scale: target scale (FRAME_RESIZE_SCALE)
+
+    Returns:
+        DecodedFrame, image None jika request tidak membawa image
+
+    Raises:
+        FrameDecodeError: jika image ada tetapi tidak valid
+    """
+    raw_bytes, fields = read_request_image(request)
+    return decode_frame(raw_bytes, fields, resize_scale)
+
+
+def _parse_box(box):
+    """Box face-api.js ({x, y, width, height}) atau face_recognition ({top, right, bottom, left})"""
+    if all(key in box for key in ('top', 'right', 'bottom', 'left')):
+        return (float(box['top']), float(box['right']), float(box['bottom']), float(box['left']))
+    x, y = float(box['x']), float(box['y'])
+    return (y, x + float(box['width']), y + float(box['height']), x)
+
+
+def parse_face_hints(frame):
+    """
+    Ambil bounding box wajah dari client (face-api.js) dan scale ke koordinat frame.image
+
+    Expects field 'face_boxes' (list atau JSON string) dan opsional
+    'frame_width'/'frame_height' - ukuran frame yang dipakai client saat deteksi.
+
+    Returns:
+        list of (top, right, bottom, left) atau None jika tidak ada hint valid
+    """
+    boxes = frame.fields.get('face_boxes')
+    if not boxes or frame.image is None:
+        return None
+
+    try:
+        if isinstance(boxes, str):
+            boxes = json.loads(boxes)
+        if isinstance(boxes, dict):
+            boxes = [boxes]
+
+        width, height = frame.image.size
+        scale_x = width / float(frame.fields.get('frame_width') or frame.original_size[0])
+        scale_y = height / float(frame.fields.get('frame_height') or frame.original_size[1])
+
+        hints = []
+        for box in boxes:
+            hint = clip_box(scale_box(_parse_box(box), scale_x, scale_y), width, height)
+            if hint is not None:
+                hints.append(hint)
+    except (TypeError, ValueError, KeyError, ZeroDivisionError) as e:
+        logger.warning(f"Face box dari client tidak valid: {str(e)}")
+        return None
+
+    return hints or None
@@ -0,0 +1,119 @@
+import numpy as np
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lebar thumbnail grayscale untuk pengukuran kualitas (cukup kecil supaya < 1 ms)
+QUALITY_THUMBNAIL_WIDTH = 160
+
+# Reason penolakan (machine-readable) dan pesan untuk halaman capture
+QUALITY_MESSAGES = {
+    'blurry': 'Gambar buram, tahan kamera dan wajah tetap diam',
+    'too_dark': 'Gambar terlalu gelap, tambah pencahayaan',
+    'too_bright': 'Gambar terlalu terang, hindari cahaya langsung ke kamera',
+    'face_too_small': 'Wajah terlalu kecil, mendekat ke kamera',
+}
+
+
+class FrameRejected(Exception):
+    """Frame ditolak quality gate sebelum detection/encoding"""
+
+    def __init__(self, reason, metrics=None):
+        super().__init__(QUALITY_MESSAGES.get(reason, reason))
+        self.reason = reason
+        self.metrics = metrics or {}
+
+    @property
+    def message(self):
+        return str(self)
+
+
+def measure_frame(image_array):
+    """
+    Ukur blur dan exposure dari thumbnail grayscale
+
+    Args:
+        image_array: numpy array RGB
+
+    Returns:
+        dict: blur (variance Laplacian), brightness (mean 0-255),
+              dark_fraction / bright_fraction (fraksi pixel < 16 / > 240)
+    """
+    import cv2
+
+    gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY) if image_array.ndim == 3 else image_array
+
+    height, width = gray.shape[:2]
+    if width > QUALITY_THUMBNAIL_WIDTH:
+        thumb_height = max(1, int(height * QUALITY_THUMBNAIL_WIDTH / width))
+        gray = cv2.resize(gray, (QUALITY_THUMBNAIL_WIDTH, thumb_height), interpolation=cv2.INTER_AREA)
+
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    total = float(gray.size)
+
+    return {
+        'blur': float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        'brightness': float(histogram @ np.arange(256) / total),
+        'dark_fraction': float(histogram[:16].sum() / total),
+        'bright_fraction': float(histogram[241:].sum() / total),
+    }
+
+
+def check_frame(image_array, options):
+    """
+    Quality gate sebelum detection
+
+    Args:
+        image_array: numpy array RGB
+        options: dict min_blur, min_brightness, max_brightness, max_clipped
+
+    Returns:
+        tuple: (reason atau None, metrics)
+    """
+    metrics = measure_frame(image_array)
+
+    if metrics['brightness'] < options.get('min_brightness', 40) or \
+            metrics['dark_fraction'] > options.get('max_clipped', 0.6):
+        return 'too_dark', metrics
+    if metrics['brightness'] > options.get('max_brightness', 220) or \
+            metrics['bright_fraction'] > options.get('max_clipped', 0.6):
+        return 'too_bright', metrics
+    if metrics['blur'] < options.get('min_blur', 30):
+        return 'blurry', metrics
+
+    return None, metrics
+
+
+def filter_small_faces(face_locations, image_height, min_face_ratio):
+    """Buang wajah yang tingginya kurang dari min_face_ratio x tinggi frame"""
+    min_height = image_height * min_face_ratio
+    return [loc for loc in face_locations if loc[2] - loc[0] >= min_height]
+
+
+class QualityStats:
+    """Counter hasil quality gate per reason (in-process)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._rejected = {reason: 0 for reason in QUALITY_MESSAGES}
+
+    def record(self, reason=None):
+        """Catat satu frame yang dicek (reason None = lolos)"""
+        with self._lock:
+            self._checked += 1
+            if reason is not None:
+                self._rejected[reason] = self._rejected.get(reason, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            rejected = sum(self._rejected.values())
+            return {
+                'checked': self._checked,
+                'passed': self._checked - rejected,
+                'rejected': dict(self._rejected)
+            }
+
+
+quality_stats = QualityStats()
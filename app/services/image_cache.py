@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from app.services.flight_recorder import trace_annotate
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Versi format entry (naikkan jika isi entry berubah supaya file disk lama diabaikan)
+IMAGE_CACHE_VERSION = 1
+
+# Parameter encode yang mempengaruhi hasil detect/encode (bagian dari key)
+_KEY_OPTIONS = ('resize_scale', 'detector', 'detector_params', 'mode', 'padding', 'model', 'jitters')
+
+# Prune disk tier setiap N penulisan
+_DISK_PRUNE_INTERVAL = 100
+
+
+class ImageEntry:
+    """
+    Hasil analisis satu image: lokasi semua wajah (detector) dan encoding per lokasi
+
+    Encoding yang belum dihitung berisi NaN, sehingga detect lalu encode pada
+    image yang sama hanya menghitung encoding wajah yang diminta.
+    """
+
+    __slots__ = ('locations', 'encodings')
+
+    def __init__(self, locations, encodings=None):
+        self.locations = [tuple(int(v) for v in location) for location in locations]
+        if encodings is None:
+            encodings = np.full((len(self.locations), 128), np.nan, dtype=np.float32)
+        self.encodings = np.asarray(encodings, dtype=np.float32).reshape(len(self.locations), 128)
+
+    def encoding(self, index):
+        """Encoding wajah ke-index, None jika belum dihitung"""
+        row = self.encodings[index]
+        return None if np.isnan(row[0]) else row
+
+    def set_encoding(self, index, encoding):
+        self.encodings[index] = np.asarray(encoding, dtype=np.float32)
+
+    def copy(self):
+        """Salinan yang boleh diubah (set_encoding) tanpa mempengaruhi entry di cache"""
+        return ImageEntry(self.locations, self.encodings.copy())
+
+
+class ImageResultCache:
+    """
+    Cache LRU content-addressed untuk /api/face/detect dan /api/face/encode
+
+    Key = hash pixel image hasil decode + parameter detect/encode, sehingga image
+    yang sama dikirim ulang (retry enrollment, detect lalu encode) tidak diproses
+    dua kali, walaupun dikirim dalam format berbeda (base64, body mentah, multipart).
+    Tier disk opsional (IMAGE_CACHE_DIR) bertahan saat worker restart dan dipakai
+    bersama oleh semua worker.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, disk_max_entries=10000):
+        self.enabled = True
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Baca ukuran cache dan direktori disk tier dari config aplikasi"""
+        self.enabled = app.config.get('IMAGE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('IMAGE_CACHE_SIZE', 256)
+        self.disk_dir = app.config.get('IMAGE_CACHE_DIR') or None
+        self.disk_max_entries = app.config.get('IMAGE_CACHE_DISK_MAX_ENTRIES', 10000)
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+        app.extensions['image_cache'] = self
+
+    @staticmethod
+    def key(image_array, options):
+        """Hash pixel + ukuran image + parameter yang mempengaruhi hasil"""
+        image_array = np.ascontiguousarray(image_array)
+        params = {name: options.get(name) for name in _KEY_OPTIONS}
+        params['shape'] = list(image_array.shape)
+        params['version'] = IMAGE_CACHE_VERSION
+
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        digest.update(memoryview(image_array).cast('B'))
+        return digest.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f'{key}.npz')
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return ImageEntry(data['locations'].reshape(-1, 4), data['encodings'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Entry image cache rusak, diabaikan: {path} ({e})")
+            return None
+
+    def _write_disk(self, key, entry):
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, locations=np.asarray(entry.locations, dtype=np.int32).reshape(-1, 4),
+                         encodings=entry.encodings)
+            # Atomic supaya worker lain tidak membaca file setengah jadi
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Gagal menulis image cache ke disk: {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % _DISK_PRUNE_INTERVAL == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Hapus file tertua jika disk tier melebihi disk_max_entries"""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith('.npz'):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+
+        excess = len(files) - self.disk_max_entries
+        if excess <= 0:
+            return
+
+        for _, path in sorted(files)[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        logger.info(f"✓ Image cache disk: {excess} entry lama dihapus")
+
+    def get(self, key):
+        """
+        Ambil entry dari memory, lalu dari disk (dipromosikan ke memory)
+
+        Entry di cache dibaca banyak request sekaligus, jadi yang dikembalikan
+        adalah salinan; perubahan disimpan kembali lewat put.
+
+        Returns:
+            ImageEntry (salinan) atau None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                trace_annotate(image_cache='memory')
+                return entry.copy()
+
+        entry = self._read_disk(key) if self.disk_dir else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                trace_annotate(image_cache='miss')
+                return None
+            self.disk_hits += 1
+            self._store(key, entry)
+        trace_annotate(image_cache='disk')
+        return entry.copy()
+
+    def put(self, key, entry):
+        """Simpan/perbarui entry (memory + disk tier)"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._store(key, entry)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counter hit/miss untuk monitoring"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk': bool(self.disk_dir),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+image_cache = ImageResultCache()
@@ -0,0 +1,438 @@
+from bisect import bisect_left
+from functools import wraps
+import tempfile
+import threading
+import time
+import json
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Batas atas bucket histogram (detik), sama di semua worker supaya bisa dijumlahkan
+DURATION_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Quantile yang dihitung dari histogram gabungan
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Jendela (detik) untuk frames/s
+RATE_WINDOW_SECONDS = 60
+
+_SNAPSHOT_PREFIX = 'worker-'
+
+# Total kumulatif worker yang sudah keluar (ditulis hanya oleh master gunicorn, child_exit)
+_RETIRED_SNAPSHOT = 'retired.json'
+
+
+def default_directory():
+    """METRICS_DIR default: <tempdir>/fr-presention-metrics"""
+    return os.path.join(tempfile.gettempdir(), 'fr-presention-metrics')
+
+
+def _write_json(path, data):
+    # Atomic supaya pembaca tidak melihat file setengah jadi
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def fold_snapshot(total, snapshot):
+    """
+    Tambahkan bagian kumulatif snapshot (histogram, counter, cache) ke total (dict, diubah in-place)
+
+    Returns:
+        dict total
+    """
+    for key in ('stages', 'calls'):
+        histograms = total.setdefault(key, {})
+        for name, data in snapshot.get(key, {}).items():
+            histogram = Histogram.from_dict(histograms[name]) if name in histograms else Histogram()
+            histogram.merge(Histogram.from_dict(data))
+            histograms[name] = histogram.as_dict()
+    counters = total.setdefault('counters', {})
+    for name, value in snapshot.get('counters', {}).items():
+        counters[name] = counters.get(name, 0) + value
+    cache = total.setdefault('cache', {})
+    for class_id, (hits, misses) in snapshot.get('cache', {}).items():
+        counts = cache.setdefault(class_id, [0, 0])
+        counts[0] += hits
+        counts[1] += misses
+    return total
+
+
+def retire_worker(directory, pid):
+    """
+    Pindahkan snapshot worker yang sudah keluar ke total retired.json (gunicorn child_exit, di master)
+
+    Counter tetap naik walaupun worker diganti, dan file per worker tidak menumpuk.
+    Hanya master yang menulis retired.json sehingga tidak perlu lock antar process.
+    """
+    try:
+        names = [name for name in os.listdir(directory)
+                 if name.startswith(_SNAPSHOT_PREFIX) and name.endswith('.json')]
+    except OSError:
+        return
+
+    retired_path = os.path.join(directory, _RETIRED_SNAPSHOT)
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get('pid') != pid:
+            continue
+
+        try:
+            with open(retired_path) as f:
+                retired = json.load(f)
+        except (OSError, ValueError):
+            retired = {}
+        try:
+            _write_json(retired_path, fold_snapshot(retired, snapshot))
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Gagal memindahkan snapshot metrics {name}: {str(e)}")
+
+
+class Histogram:
+    """Histogram bucket tetap: count per bucket (+Inf di akhir), sum dan count"""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, counts=None, total=0.0, count=0):
+        self.counts = list(counts) if counts is not None else [0] * (len(DURATION_BUCKETS) + 1)
+        self.total = total
+        self.count = count
+
+    def observe(self, seconds):
+        self.counts[bisect_left(DURATION_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def merge(self, other):
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+        self.total += other.total
+        self.count += other.count
+
+    def quantile(self, q):
+        """Perkiraan quantile (interpolasi linear di dalam bucket), None jika kosong"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, value in enumerate(self.counts):
+            if cumulative + value >= rank and value:
+                lower = DURATION_BUCKETS[i - 1] if i > 0 else 0.0
+                if i == len(DURATION_BUCKETS):
+                    return lower  # bucket +Inf: batas bawah adalah perkiraan terbaik
+                return lower + (DURATION_BUCKETS[i] - lower) * (rank - cumulative) / value
+            cumulative += value
+        return DURATION_BUCKETS[-1]
+
+    def as_dict(self):
+        return {'counts': self.counts, 'sum': self.total, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['counts'], data['sum'], data['count'])
+
+
+class Metrics:
+    """
+    Metrics capture per worker: histogram durasi per stage dan per method service,
+    counter frame/wajah/match, dan hit rate encoding cache per kelas
+
+    Setiap worker gunicorn menulis snapshot kumulatifnya ke METRICS_DIR
+    (worker-<id>.json, id acak per process sehingga PID yang dipakai ulang
+    setelah restart tidak menimpa snapshot lama; paling lambat setiap
+    METRICS_FLUSH_SECONDS saat ada traffic). /metrics menggabungkan semua
+    snapshot - histogram bucket tetap dan counter bisa dijumlahkan, sehingga
+    quantile dihitung dari data semua worker, bukan rata-rata quantile per
+    worker. Snapshot worker yang keluar dipindah master ke retired.json
+    (counter tidak turun); snapshot yang tidak ditulis ulang selama
+    METRICS_STALE_SECONDS (worker mati tanpa child_exit) dihapus.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.directory = None
+        self.flush_seconds = 5.0
+        self.stale_seconds = 86400
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._worker_id = uuid.uuid4().hex
+        self._stages = {}
+        self._calls = {}
+        self._counters = {'frames': 0, 'faces': 0, 'faces_matched': 0, 'frames_rejected': 0}
+        self._recent_frames = {}
+        self._last_flush = 0.0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', 5.0)
+        self.stale_seconds = app.config.get('METRICS_STALE_SECONDS', 86400)
+        self.directory = app.config.get('METRICS_DIR') or default_directory()
+        app.extensions['metrics'] = self
+
+    def _ensure_process(self):
+        # Counter dari master (sebelum fork) tidak boleh ikut di snapshot setiap worker
+        if self._pid != os.getpid():
+            self._reset()
+
+    def observe_capture(self, timer, payload):
+        """
+        Catat satu frame capture (HTTP, stream WebSocket atau job async)
+
+        Args:
+            timer: StageTimer frame
+            payload: hasil capture_frame
+        """
+        if not self.enabled:
+            return
+
+        if 'face_count' in payload:
+            faces = payload['face_count']
+            matched = payload.get('matched_count', 0)
+        else:
+            faces = 1 if payload.get('detected') else 0
+            matched = 1 if payload.get('matched') else 0
+
+        now = time.time()
+        with self._lock:
+            self._ensure_process()
+            for name, duration_ms in timer.stages.items():
+                self._histogram(self._stages, name).observe(duration_ms / 1000.0)
+            self._counters['frames'] += 1
+            self._counters['faces'] += faces
+            self._counters['faces_matched'] += matched
+            self._counters['frames_rejected'] += 1 if payload.get('rejected') else 0
+
+            second = int(now)
+            self._recent_frames[second] = self._recent_frames.get(second, 0) + 1
+            if len(self._recent_frames) > RATE_WINDOW_SECONDS:
+                for key in [key for key in self._recent_frames if key <= now - RATE_WINDOW_SECONDS]:
+                    del self._recent_frames[key]
+
+        self._maybe_flush(now)
+
+    def observe_call(self, name, seconds):
+        """Catat durasi satu pemanggilan method service"""
+        with self._lock:
+            self._ensure_process()
+            self._histogram(self._calls, name).observe(seconds)
+
+    def instrument(self, name):
+        """Decorator: catat durasi method ke histogram per method (juga saat exception)"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe_call(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _histogram(histograms, name):
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        return histogram
+
+    def snapshot(self):
+        """State kumulatif worker ini (JSON-able)"""
+        from app.services.encoding_cache import encoding_cache
+
+        with self._lock:
+            self._ensure_process()
+            return {
+                'worker': self._worker_id,
+                'pid': self._pid,
+                'written_at': time.time(),
+                'stages': {name: h.as_dict() for name, h in self._stages.items()},
+                'calls': {name: h.as_dict() for name, h in self._calls.items()},
+                'counters': dict(self._counters),
+                'recent_frames': {str(second): count for second, count in self._recent_frames.items()},
+                'cache': {str(class_id): counts for class_id, counts in encoding_cache.class_stats().items()}
+            }
+
+    def _maybe_flush(self, now):
+        if now - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Tulis snapshot worker ini ke METRICS_DIR (atomic rename)"""
+        self._last_flush = time.time()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            snapshot = self.snapshot()
+            _write_json(os.path.join(self.directory, f'{_SNAPSHOT_PREFIX}{snapshot["worker"]}.json'), snapshot)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Gagal menulis snapshot metrics: {str(e)}")
+
+    def _read_snapshots(self):
+        """Snapshot worker yang masih hidup (snapshot basi dihapus) dan total retired.json"""
+        snapshots, retired = [], {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return snapshots, retired
+
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.directory, name)
+            is_worker = name.startswith(_SNAPSHOT_PREFIX) and name.endswith('.json')
+            if not is_worker and name != _RETIRED_SNAPSHOT:
+                continue
+            try:
+                if is_worker and self.stale_seconds and now - os.path.getmtime(path) > self.stale_seconds:
+                    os.remove(path)
+                    logger.info(f"Snapshot metrics basi dihapus: {name}")
+                    continue
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Snapshot metrics {name} dilewati: {str(e)}")
+                continue
+            if is_worker:
+                snapshots.append(snapshot)
+            else:
+                retired = snapshot
+        return snapshots, retired
+
+    def collect(self):
+        """
+        Gabungkan snapshot semua worker (snapshot worker ini ditulis ulang dulu)
+
+        Returns:
+            dict: stages, calls (Histogram), counters, frames_per_second, cache, workers
+        """
+        self.flush()
+        now = time.time()
+        snapshots, retired = self._read_snapshots()
+
+        total = fold_snapshot({}, retired)
+        recent_frames = 0
+        workers = []
+        for snapshot in snapshots:
+            fold_snapshot(total, snapshot)
+            recent_frames += sum(count for second, count in snapshot.get('recent_frames', {}).items()
+                                 if int(second) > now - RATE_WINDOW_SECONDS)
+            workers.append({'worker': snapshot.get('worker'), 'pid': snapshot.get('pid'),
+                            'age_seconds': now - snapshot.get('written_at', now)})
+
+        return {
+            'stages': {name: Histogram.from_dict(data) for name, data in total['stages'].items()},
+            'calls': {name: Histogram.from_dict(data) for name, data in total['calls'].items()},
+            'counters': total['counters'],
+            'cache': total['cache'],
+            'workers': workers,
+            'frames_per_second': recent_frames / float(RATE_WINDOW_SECONDS)
+        }
+
+    def render(self, merged=None):
+        """Metrics gabungan dalam Prometheus text exposition format"""
+        merged = merged or self.collect()
+        counters = merged['counters']
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f'{name}{{{label_text}}} {_number(value)}' if label_text else f'{name} {_number(value)}')
+
+        for name, kind, help_text in (('frames', 'counter', 'Frame capture yang diproses'),
+                                      ('faces', 'counter', 'Wajah terdeteksi di frame capture'),
+                                      ('faces_matched', 'counter', 'Wajah yang dikenali sebagai mahasiswa'),
+                                      ('frames_rejected', 'counter', 'Frame yang ditolak quality gate')):
+            metric(f'fr_{name}_total', kind, help_text, [({}, counters.get(name, 0))])
+
+        frames, faces = counters.get('frames', 0), counters.get('faces', 0)
+        metric('fr_frames_per_second', 'gauge', f'Frame capture per detik ({RATE_WINDOW_SECONDS} detik terakhir)',
+               [({}, merged['frames_per_second'])])
+        metric('fr_faces_per_frame', 'gauge', 'Rata-rata wajah per frame',
+               [({}, faces / float(frames) if frames else 0.0)])
+        metric('fr_match_rate', 'gauge', 'Rasio wajah terdeteksi yang dikenali',
+               [({}, counters.get('faces_matched', 0) / float(faces) if faces else 0.0)])
+
+        for key, name, label, help_text in (
+            ('stages', 'fr_stage_duration_seconds', 'stage', 'Durasi per stage pipeline capture'),
+            ('calls', 'fr_service_call_duration_seconds', 'call', 'Durasi per pemanggilan method service')
+        ):
+            histograms = merged[key]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for label_value, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f'{name}_bucket{{{label}="{_escape(label_value)}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}="{_escape(label_value)}"}} {_number(histogram.total)}')
+                lines.append(f'{name}_count{{{label}="{_escape(label_value)}"}} {histogram.count}')
+
+            metric(name.replace('_duration_seconds', '_quantile_seconds'), 'gauge',
+                   f'{help_text}: quantile dari histogram gabungan semua worker', [
+                       ({label: label_value, 'quantile': q}, histogram.quantile(q))
+                       for label_value, histogram in sorted(histograms.items()) for q in QUANTILES
+                   ])
+
+        cache = sorted(merged['cache'].items(), key=lambda item: int(item[0]))
+        metric('fr_encoding_cache_lookups_total', 'counter', 'Lookup encoding cache per kelas', [
+            ({'class_id': class_id, 'result': result}, value)
+            for class_id, (hits, misses) in cache for result, value in (('hit', hits), ('miss', misses))
+        ])
+        metric('fr_encoding_cache_hit_ratio', 'gauge', 'Hit rate encoding cache per kelas', [
+            ({'class_id': class_id}, hits / float(hits + misses) if hits + misses else 0.0)
+            for class_id, (hits, misses) in cache
+        ])
+
+        metric('fr_metrics_workers', 'gauge', 'Snapshot worker yang digabung', [({}, len(merged['workers']))])
+        metric('fr_metrics_snapshot_age_seconds', 'gauge', 'Umur snapshot per worker', [
+            ({'worker': worker['worker'], 'pid': worker['pid']}, worker['age_seconds'])
+            for worker in merged['workers']
+        ])
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def server_timing(stages, total_ms=None):
+    """
+    Header Server-Timing dari durasi per stage (ms)
+
+    Returns:
+        str: misalnya 'decode;dur=1.2, detect;dur=20.5, total;dur=30.1'
+    """
+    parts = [f'{name};dur={duration_ms:.2f}' for name, duration_ms in stages.items()]
+    if total_ms is not None:
+        parts.append(f'total;dur={total_ms:.2f}')
+    return ', '.join(parts)
+
+
+metrics = Metrics()
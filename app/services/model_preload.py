@@ -0,0 +1,102 @@
+import gc
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Image kosong untuk warm-up: kecil supaya inference pertama di master (sebelum fork)
+# tidak menyalakan thread pool OpenCV/BLAS
+_WARM_UP_SHAPE = (240, 320, 3)
+_WARM_UP_BOX = (60, 200, 180, 120)
+
+# Option encode tanpa app context (worker recognition engine)
+_DEFAULT_OPTIONS = {'resize_scale': 1.0, 'mode': 'full', 'model': 'small', 'jitters': 1}
+
+
+def models_loaded():
+    """Apakah face_recognition (model dlib) sudah di-import di process ini"""
+    import sys
+    return 'face_recognition' in sys.modules
+
+
+def load_models():
+    """
+    Import face_recognition dan cv2; import face_recognition memuat model dlib
+    (detector, landmark predictor, encoder) ke memory
+
+    Returns:
+        float: durasi (ms)
+    """
+    started = time.perf_counter()
+    import cv2  # noqa: F401
+    import face_recognition  # noqa: F401
+    return (time.perf_counter() - started) * 1000.0
+
+
+def warm_up_models(options=None):
+    """
+    Detect + encode pertama di image kosong (inisialisasi buffer dlib/OpenCV dan backend detector)
+
+    Args:
+        options: dict dari FaceRecognitionService._encode_options; None = HOG + encoder small
+
+    Returns:
+        float: durasi (ms)
+    """
+    import numpy as np
+    from app.services.face_recognition_service import FaceRecognitionService
+    from app.services.frame_quality import measure_frame
+    from app.services.timing import StageTimer
+
+    options = options or _DEFAULT_OPTIONS
+    image = np.zeros(_WARM_UP_SHAPE, dtype=np.uint8)
+
+    started = time.perf_counter()
+    FaceRecognitionService._locate_faces(
+        image, options.get('resize_scale', 1.0), None, options.get('detector'), options.get('detector_params')
+    )
+    FaceRecognitionService._encode_locations(image, [_WARM_UP_BOX], options, StageTimer())
+    measure_frame(image)
+    return (time.perf_counter() - started) * 1000.0
+
+
+def preload_models(app):
+    """
+    Muat dan warm-up model recognition di process ini
+
+    Dipanggil di master gunicorn sebelum fork (RECOGNITION_PRELOAD, lihat
+    gunicorn.conf.py). Sharing copy-on-write terjadi di dua mode:
+
+    - Tanpa engine: master memuat model, worker gunicorn mewarisinya dan
+      berbagi page model; capture pertama di setiap worker tidak membayar load model.
+    - RECOGNITION_ENGINE_ENABLED (default Docker): inference tidak berjalan di
+      worker gunicorn, jadi master tidak memuat dlib. Forkserver engine di setiap
+      worker gunicorn memuat model sekali dan worker engine di-fork darinya
+      (berbagi page model); recognition_engine.start() di post_worker_init
+      memulai dan warm-up pool sebelum request pertama.
+
+    Returns:
+        dict: durasi startup (ms) di app.extensions['startup']
+    """
+    from app.services.recognition_engine import recognition_engine
+
+    timings = app.extensions.setdefault('startup', {})
+    if recognition_engine.enabled:
+        logger.info("Recognition engine aktif: model dimuat oleh worker engine, tidak di master")
+        return timings
+
+    with app.app_context():
+        from app.services.face_recognition_service import FaceRecognitionService
+
+        timings['model_load_ms'] = round(load_models(), 1)
+        timings['warm_up_ms'] = round(warm_up_models(FaceRecognitionService._encode_options()), 1)
+
+    # Objek yang sudah ada dikeluarkan dari GC generasional: koleksi di worker
+    # tidak menulis header GC objek warisan master, page tetap shared
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"✓ Model recognition dimuat dalam {timings['model_load_ms']:.0f} ms, "
+                f"warm-up {timings['warm_up_ms']:.0f} ms (pid {os.getpid()})")
+    return timings
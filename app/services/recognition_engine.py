@@ -0,0 +1,271 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Library native yang punya thread pool sendiri - dipin ke 1 thread per worker
+_THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+)
+
+# Dimuat sekali oleh forkserver; worker engine di-fork dari situ dan berbagi
+# page model dlib copy-on-write (bukan load model per worker seperti spawn)
+_FORKSERVER_PRELOAD = ['cv2', 'face_recognition', 'app.services.face_recognition_service']
+
+
+class EngineBusyError(Exception):
+    """Antrian recognition engine penuh, client harus retry"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Recognition engine sibuk, coba lagi dalam {retry_after} detik')
+        self.retry_after = retry_after
+
+
+def _init_worker(threads_per_worker):
+    """Initializer worker process: pin thread count lalu warm-up model dlib (sudah dimuat forkserver)"""
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads_per_worker)
+
+    import cv2
+    cv2.setNumThreads(threads_per_worker)
+
+    # No-op jika forkserver sudah memuat model; inference pertama inisialisasi buffer per worker
+    from app.services.model_preload import load_models, warm_up_models
+    load_models()
+    warm_up_models()
+
+
+def ready_task():
+    """Task worker kosong: worker sudah selesai initializer (model dimuat)"""
+    return os.getpid()
+
+
+def locate_faces_task(image_array, resize_scale, detector=None, detector_params=None):
+    """Task worker: detect wajah"""
+    from app.services.face_recognition_service import FaceRecognitionService
+    return FaceRecognitionService._locate_faces(image_array, resize_scale, None, detector, detector_params)
+
+
+def encode_faces_task(image_array, options, first_only):
+    """Task worker: detect + encode wajah"""
+    from app.services.face_recognition_service import FaceRecognitionService
+    return FaceRecognitionService._encode_array(image_array, options, first_only)
+
+
+def find_faces_task(image_array, options):
+    """Task worker: lokasi wajah (box client terverifikasi atau detector)"""
+    from app.services.face_recognition_service import FaceRecognitionService
+    return FaceRecognitionService._find_faces(image_array, options)
+
+
+def encode_locations_task(image_array, face_locations, options):
+    """Task worker: encode wajah di lokasi yang sudah diketahui"""
+    from app.services.face_recognition_service import FaceRecognitionService
+    from app.services.timing import StageTimer
+    timer = StageTimer()
+    encodings = FaceRecognitionService._encode_locations(image_array, face_locations, options, timer)
+    return {'encodings': encodings, 'stages': timer.stages}
+
+
+def encode_full_resolution_task(full_image, face_locations, options):
+    """Task worker: encode wajah dari bytes image asli (box dalam koordinat image asli)"""
+    from app.services.face_recognition_service import FaceRecognitionService
+    return FaceRecognitionService._encode_regions(full_image, face_locations, options)
+
+
+class RecognitionEngine:
+    """Pool worker process untuk detect/encode dengan antrian terbatas (backpressure)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.workers = 1
+        self.queue_size = 0
+        self.retry_after = 1
+        self.task_timeout = 30
+        self.threads_per_worker = 1
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._restarts = 0
+
+    def init_app(self, app):
+        """Baca konfigurasi engine (pool baru dibuat saat task pertama)"""
+        self.enabled = app.config.get('RECOGNITION_ENGINE_ENABLED', False)
+
+        workers = app.config.get('RECOGNITION_WORKERS', 0)
+        if not workers:
+            # Bagi core CPU ke semua worker gunicorn supaya tidak oversubscribe
+            web_workers = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+            workers = max(1, (os.cpu_count() or 1) // web_workers)
+        self.workers = workers
+
+        self.queue_size = app.config.get('RECOGNITION_QUEUE_SIZE', 0) or self.workers * 2
+        self.retry_after = app.config.get('RECOGNITION_RETRY_AFTER_SECONDS', 1)
+        self.task_timeout = app.config.get('RECOGNITION_TASK_TIMEOUT_SECONDS', 30)
+        self.threads_per_worker = app.config.get('RECOGNITION_THREADS_PER_WORKER', 1)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+
+        app.extensions['recognition_engine'] = self
+
+    def _ensure_executor(self):
+        # Pool dibuat per process (setelah fork gunicorn), bukan di master
+        if self._executor is not None and self._executor_pid == os.getpid():
+            return self._executor
+
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                # Forkserver (process bersih tanpa thread) memuat model sekali lalu
+                # mem-fork worker engine; env thread diwarisi forkserver sebelum
+                # OpenBLAS/OpenCV dimuat di sana
+                for var in _THREAD_ENV_VARS:
+                    os.environ[var] = str(self.threads_per_worker)
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(_FORKSERVER_PRELOAD)
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.threads_per_worker,)
+                )
+                self._executor_pid = os.getpid()
+                logger.info(f"✓ Recognition engine dimulai: {self.workers} worker, antrian {self.queue_size}")
+
+        return self._executor
+
+    def run(self, task, *args):
+        """
+        Jalankan task di worker pool dan tunggu hasilnya
+
+        Args:
+            task: fungsi module-level (picklable)
+            *args: argumen task
+
+        Returns:
+            hasil task
+
+        Raises:
+            EngineBusyError: jika semua worker dan slot antrian terpakai, atau
+                task tidak selesai dalam RECOGNITION_TASK_TIMEOUT_SECONDS
+        """
+        try:
+            return self._run_once(task, args)
+        except BrokenProcessPool:
+            # Worker mati (OOM / crash native): pool lama tidak bisa dipakai lagi,
+            # _run_once sudah membuangnya - retry sekali di pool baru
+            logger.warning("✗ Recognition engine: worker mati, pool dibuat ulang")
+            return self._run_once(task, args)
+
+    def _run_once(self, task, args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise EngineBusyError(self.retry_after)
+
+        with self._lock:
+            self._in_flight += 1
+
+        executor = None
+        try:
+            executor = self._ensure_executor()
+            future = executor.submit(task, *args)
+        except Exception as e:
+            self._finish(failed=True)
+            if isinstance(e, BrokenProcessPool):
+                self._discard_executor(executor)
+            raise
+
+        # Slot baru dilepas saat task benar-benar selesai di worker (juga setelah timeout)
+        future.add_done_callback(lambda f: self._finish(failed=f.cancelled() or f.exception() is not None))
+        try:
+            return future.result(timeout=self.task_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise EngineBusyError(self.retry_after) from None
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise
+
+    def _discard_executor(self, executor):
+        """Buang pool yang rusak (hanya jika belum diganti thread lain)"""
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+            self._executor_pid = None
+            self._restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, failed):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+        self._slots.release()
+
+    def start(self):
+        """
+        Start pool dan tunggu semua worker selesai warm-up (RECOGNITION_PRELOAD,
+        post_worker_init gunicorn) supaya capture pertama tidak menunggu forkserver + load model
+
+        Returns:
+            float: durasi (ms), 0 jika engine tidak aktif
+        """
+        if not self.enabled:
+            return 0.0
+
+        started = time.perf_counter()
+        executor = self._ensure_executor()
+        # Satu task per worker: pool men-spawn worker baru selama belum ada yang idle
+        pids = {future.result(timeout=self.task_timeout)
+                for future in [executor.submit(ready_task) for _ in range(self.workers)]}
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        logger.info(f"✓ Recognition engine siap: {len(pids)} worker dalam {elapsed_ms:.0f} ms")
+        return elapsed_ms
+
+    def stats(self):
+        """Counter engine untuk monitoring"""
+        with self._lock:
+            busy = min(self._in_flight, self.workers)
+            return {
+                'enabled': self.enabled,
+                'workers': self.workers,
+                'busy_workers': busy,
+                'queue_depth': self._in_flight - busy,
+                'queue_capacity': self.queue_size,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'restarts': self._restarts
+            }
+
+    def shutdown(self):
+        """Hentikan worker pool"""
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_pid = None
+
+
+recognition_engine = RecognitionEngine()
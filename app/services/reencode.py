@@ -0,0 +1,120 @@
+from app import db
+from app.models.student import Student
+from app.services.encoding_codec import LEGACY_ENCODING_MODEL, pack_encoding, unpack_encoding
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReencodeService:
+    """
+    Re-encode face encoding mahasiswa dari foto pendaftaran dengan model/parameter baru
+
+    Encoding baru ditulis ke kolom face_encoding_next_blob (encoding lama tetap
+    dipakai untuk capture), lalu seluruh kelas di-swap dalam satu transaksi
+    supaya matrix encoding kelas berpindah model sekaligus.
+    """
+
+    @staticmethod
+    def _outdated(model):
+        """Filter mahasiswa terdaftar yang encoding aktifnya bukan dari model target"""
+        enrolled = db.or_(Student.face_encoding_blob.isnot(None), Student.face_encoding_json.isnot(None))
+        if model == LEGACY_ENCODING_MODEL:
+            outdated = db.and_(Student.encoding_model.isnot(None), Student.encoding_model != model)
+        else:
+            outdated = db.or_(Student.encoding_model.is_(None), Student.encoding_model != model)
+        return db.and_(enrolled, outdated)
+
+    @staticmethod
+    def pending_classes(model, class_ids=None):
+        """
+        Kelas yang masih punya encoding dari model lain
+
+        Returns:
+            list of (class_id, jumlah mahasiswa)
+        """
+        query = db.session.query(Student.class_id, db.func.count(Student.id)).filter(
+            ReencodeService._outdated(model)
+        )
+        if class_ids:
+            query = query.filter(Student.class_id.in_(class_ids))
+        return query.group_by(Student.class_id).order_by(Student.class_id).all()
+
+    @staticmethod
+    def pending_students(class_id, model):
+        """
+        Mahasiswa kelas yang belum punya hasil re-encode untuk model target
+
+        Returns:
+            list of (id, student_id, photo_path)
+        """
+        staged = db.and_(Student.face_encoding_next_blob.isnot(None), Student.encoding_model_next == model)
+        return db.session.query(Student.id, Student.student_id, Student.photo_path).filter(
+            Student.class_id == class_id,
+            ReencodeService._outdated(model),
+            db.not_(staged)
+        ).order_by(Student.id).all()
+
+    @staticmethod
+    def resolve_photo(photo_path, root_path):
+        """Path foto (relatif ke working directory atau root project), None jika tidak ada"""
+        if not photo_path:
+            return None
+        for candidate in (photo_path, os.path.join(root_path, photo_path)):
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    @staticmethod
+    def stage(results, model):
+        """
+        Simpan hasil re-encode di samping encoding lama (belum dipakai untuk matching)
+
+        Args:
+            results: list of (student id, 128-dim encoding)
+            model: tag model encoding baru
+        """
+        if not results:
+            return
+        db.session.bulk_update_mappings(Student, [
+            {'id': student_id, 'face_encoding_next_blob': pack_encoding(encoding), 'encoding_model_next': model}
+            for student_id, encoding in results
+        ])
+        db.session.commit()
+
+    @staticmethod
+    def has_active_session(class_id):
+        from app.models.attendance_session import AttendanceSession
+        return db.session.query(
+            AttendanceSession.query.filter_by(class_id=class_id, is_active=True).exists()
+        ).scalar()
+
+    @staticmethod
+    def swap_class(class_id, model):
+        """
+        Aktifkan semua hasil re-encode satu kelas dalam satu transaksi
+
+        Gallery template hasil capture dibuang karena dibuat dengan model lama
+        dan tidak punya foto untuk di-encode ulang.
+
+        Returns:
+            int: jumlah mahasiswa yang di-swap
+        """
+        students = Student.query.filter(
+            Student.class_id == class_id,
+            Student.face_encoding_next_blob.isnot(None),
+            Student.encoding_model_next == model
+        ).all()
+
+        try:
+            for student in students:
+                student.set_face_encoding(unpack_encoding(student.face_encoding_next_blob)[0], model)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if students:
+            logger.info(f"✓ Encoding kelas {class_id} di-swap ke {model}: {len(students)} mahasiswa")
+        return len(students)
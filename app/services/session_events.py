@@ -0,0 +1,249 @@
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Id record yang dibaca ulang setiap poll: transaksi worker lain bisa commit
+# tidak berurutan dengan id-nya (duplikat dibuang lewat mahasiswa yang sudah diumumkan)
+_WATERMARK_OVERLAP = 50
+
+
+def present_event(record, student):
+    """
+    Event mahasiswa hadir
+
+    Args:
+        record: AttendanceRecord
+        student: dict id, student_id, name
+    """
+    return {
+        'type': 'present',
+        'id': record.id,
+        'session_id': record.session_id,
+        'student': student,
+        'timestamp': record.timestamp.isoformat() if record.timestamp else None,
+        'confidence': f"{record.confidence_score:.2f}" if record.confidence_score else '-',
+        'is_manual': bool(record.is_manual)
+    }
+
+
+class Subscription:
+    """Antrian event satu observer (satu koneksi SSE)"""
+
+    def __init__(self, session_id, max_events):
+        self.session_id = session_id
+        self.events = queue.Queue(maxsize=max_events)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            # Observer terlalu lambat: client diminta reconnect untuk snapshot baru
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Event berikutnya, None jika timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class SessionEventHub:
+    """
+    Fan-out event sesi absensi (mahasiswa hadir, sesi ditutup) ke observer SSE
+
+    Event dari process ini langsung diteruskan ke semua observer sesi. Event
+    dari worker gunicorn lain diambil oleh satu thread poller per process:
+    attendance_records dengan id di atas watermark dan sesi yang sudah ditutup
+    (hanya untuk sesi yang sedang diobservasi), sehingga tidak ada tabel atau
+    penulisan tambahan. Biaya per observer hanya satu Queue; tanpa observer
+    poller berhenti dan publish tidak melakukan apa-apa.
+
+    Setiap stream terbuka menahan satu thread worker gunicorn (gthread), jadi
+    jumlah observer per process dibatasi SESSION_EVENTS_MAX_STREAMS supaya
+    thread tetap tersisa untuk request capture.
+    """
+
+    def __init__(self):
+        self.poll_seconds = 1.0
+        self.max_events = 256
+        self.max_observers = 8
+        self._app = None
+        self._subscribers = {}
+        self._announced = {}
+        self._ended = set()
+        self._watermark = 0
+        self._poller = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.poll_seconds = app.config.get('SESSION_EVENTS_POLL_SECONDS', 1.0)
+        self.max_events = app.config.get('SESSION_EVENTS_QUEUE_SIZE', 256)
+        self.max_observers = app.config.get('SESSION_EVENTS_MAX_STREAMS', 8)
+        self._app = app
+        app.extensions['session_events'] = self
+
+    def has_subscribers(self, session_id):
+        return session_id in self._subscribers
+
+    def subscribe(self, session_id):
+        """
+        Daftarkan observer sesi
+
+        Dipanggil sebelum snapshot diambil supaya record yang dibuat di antaranya
+        tidak terlewat, lalu seed() dengan mahasiswa di snapshot.
+
+        Returns:
+            Subscription, None jika observer di worker ini sudah max_observers
+        """
+        subscription = Subscription(session_id, self.max_events)
+        with self._lock:
+            if sum(len(subscribers) for subscribers in self._subscribers.values()) >= self.max_observers:
+                return None
+            if self._poller is None:
+                self._watermark = self._max_record_id()
+                self._poller = threading.Thread(target=self._poll_loop, name='session-events', daemon=True)
+                self._poller.start()
+            self._subscribers.setdefault(session_id, set()).add(subscription)
+            self._announced.setdefault(session_id, set())
+        return subscription
+
+    def seed(self, session_id, present_ids):
+        """Tandai mahasiswa dari snapshot sebagai sudah diumumkan"""
+        with self._lock:
+            if session_id in self._announced:
+                self._announced[session_id].update(present_ids)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.session_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.session_id]
+                self._announced.pop(subscription.session_id, None)
+                self._ended.discard(subscription.session_id)
+
+    def _fan_out(self, session_id, event):
+        for subscription in list(self._subscribers.get(session_id, ())):
+            subscription.put(event)
+
+    def publish_present(self, session_id, records):
+        """
+        Umumkan kehadiran baru (dipanggil setelah record ter-commit)
+
+        Args:
+            session_id: ID sesi
+            records: list of AttendanceRecord
+        """
+        if not records or not self.has_subscribers(session_id):
+            return
+
+        with self._lock:
+            announced = self._announced.get(session_id, ())
+            records = [record for record in records if record.student_id not in announced]
+        if not records:
+            return
+
+        students = self._student_payloads({record.student_id for record in records})
+        with self._lock:
+            announced = self._announced.get(session_id)
+            if announced is None:
+                return
+            for record in records:
+                if record.student_id in announced:
+                    continue
+                announced.add(record.student_id)
+                self._fan_out(session_id, present_event(record, students.get(record.student_id)))
+
+    def publish_ended(self, session_id, end_time=None):
+        """Umumkan sesi ditutup"""
+        if not self.has_subscribers(session_id):
+            return
+        with self._lock:
+            if session_id in self._ended:
+                return
+            self._ended.add(session_id)
+            self._fan_out(session_id, {
+                'type': 'ended',
+                'session_id': session_id,
+                'end_time': end_time.isoformat() if end_time else None
+            })
+
+    @staticmethod
+    def _student_payloads(student_ids):
+        from app import db
+        from app.models.student import Student
+
+        return {
+            row.id: {'id': row.id, 'student_id': row.student_id, 'name': row.name}
+            for row in db.session.query(Student.id, Student.student_id, Student.name).filter(
+                Student.id.in_(student_ids)
+            )
+        }
+
+    @staticmethod
+    def _max_record_id():
+        from app import db
+        from app.models.attendance_record import AttendanceRecord
+
+        return db.session.query(db.func.max(AttendanceRecord.id)).scalar() or 0
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            with self._lock:
+                session_ids = list(self._subscribers)
+                if not session_ids:
+                    self._poller = None
+                    return
+
+            try:
+                with self._app.app_context():
+                    self._poll(session_ids)
+            except Exception as e:
+                logger.error(f"✗ Error poll event sesi: {str(e)}")
+
+    def _poll(self, session_ids):
+        """Ambil record dan penutupan sesi dari worker lain"""
+        from app import db
+        from app.models.attendance_record import AttendanceRecord
+        from app.models.attendance_session import AttendanceSession
+
+        records = AttendanceRecord.query.filter(
+            AttendanceRecord.id > self._watermark - _WATERMARK_OVERLAP,
+            AttendanceRecord.session_id.in_(session_ids)
+        ).order_by(AttendanceRecord.id).all()
+
+        if records:
+            self._watermark = max(self._watermark, records[-1].id)
+            by_session = {}
+            for record in records:
+                by_session.setdefault(record.session_id, []).append(record)
+            for session_id, session_records in by_session.items():
+                self.publish_present(session_id, session_records)
+
+        ended = db.session.query(AttendanceSession.id, AttendanceSession.end_time).filter(
+            AttendanceSession.id.in_(session_ids),
+            AttendanceSession.is_active.is_(False)
+        ).all()
+        for session_id, end_time in ended:
+            self.publish_ended(session_id, end_time)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._subscribers),
+                'observers': sum(len(subscribers) for subscribers in self._subscribers.values()),
+                'max_observers': self.max_observers,
+                'watermark': self._watermark,
+                'polling': self._poller is not None
+            }
+
+
+session_events = SessionEventHub()
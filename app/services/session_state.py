@@ -0,0 +1,247 @@
+from app.services.face_tracker import FaceTracker
+from app.services.frame_cache import FrameResultCache
+from collections import OrderedDict
+import numpy as np
+import functools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tracker per sesi dibatasi (LRU): client yang berhenti mengirim frame tidak menumpuk
+MAX_TRACKERS_PER_SESSION = 32
+
+
+class ActiveSessionState:
+    """
+    State in-memory satu sesi absensi: mahasiswa yang sudah hadir, face tracker
+    per stream/client dan cache hasil recognition untuk frame yang hampir identik
+
+    Cek duplikat dijawab dari set present_ids tanpa query AttendanceRecord, dan
+    matching hanya perlu mencari di mahasiswa yang belum hadir (remaining view).
+    Tracker mengasosiasikan box antar frame dari kamera yang sama, jadi setiap
+    stream (koneksi WebSocket atau client_id di /capture) punya tracker sendiri.
+    """
+
+    def __init__(self, session_id, class_id, present_ids, tracker_factory=None, frame_cache=None):
+        self.session_id = session_id
+        self.class_id = class_id
+        self.frame_cache = frame_cache
+        self._tracker_factory = tracker_factory
+        self._trackers = OrderedDict()
+        self.synced_at = time.monotonic()
+        self._present_ids = set(present_ids)
+        self._version = 0
+        self._views = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_present_ids(session_id):
+        from app import db
+        from app.models.attendance_record import AttendanceRecord
+
+        return {
+            row.student_id for row in
+            db.session.query(AttendanceRecord.student_id).filter_by(session_id=session_id)
+        }
+
+    @classmethod
+    def load(cls, session, tracker_factory=None, frame_cache=None):
+        """Bangun state dari database (satu query untuk mahasiswa yang sudah hadir)"""
+        return cls(session.id, session.class_id, cls._load_present_ids(session.id), tracker_factory, frame_cache)
+
+    def tracker(self, stream_key):
+        """
+        FaceTracker untuk satu stream/client
+
+        Args:
+            stream_key: ID stream (koneksi WebSocket) atau client; None = frame tanpa stream
+
+        Returns:
+            FaceTracker, atau None jika stream_key None atau tracker nonaktif
+        """
+        if stream_key is None or self._tracker_factory is None:
+            return None
+
+        with self._lock:
+            tracker = self._trackers.get(stream_key)
+            if tracker is None:
+                tracker = self._trackers[stream_key] = self._tracker_factory()
+                while len(self._trackers) > MAX_TRACKERS_PER_SESSION:
+                    self._trackers.popitem(last=False)
+            else:
+                self._trackers.move_to_end(stream_key)
+            return tracker
+
+    def release_tracker(self, stream_key):
+        """Buang tracker stream yang sudah ditutup"""
+        with self._lock:
+            self._trackers.pop(stream_key, None)
+
+    @property
+    def present_count(self):
+        return len(self._present_ids)
+
+    def is_present(self, student_id):
+        """Apakah mahasiswa sudah tercatat di sesi ini"""
+        return student_id in self._present_ids
+
+    def mark_present(self, *student_ids):
+        """Tandai mahasiswa sudah hadir (setelah record tersimpan)"""
+        with self._lock:
+            new_ids = set(student_ids) - self._present_ids
+            if new_ids:
+                self._present_ids.update(new_ids)
+                self._version += 1
+
+    def sync(self):
+        """Samakan present_ids dengan database (record dari worker lain)"""
+        present_ids = self._load_present_ids(self.session_id)
+        with self._lock:
+            if present_ids != self._present_ids:
+                self._present_ids = present_ids
+                self._version += 1
+            self.synced_at = time.monotonic()
+
+    def views(self, class_encodings):
+        """
+        Pisahkan matrix kelas menjadi mahasiswa yang belum dan sudah hadir
+
+        View di-cache sampai present_ids berubah atau matrix kelas di-rebuild.
+
+        Args:
+            class_encodings: ClassEncodings dari encoding_cache
+
+        Returns:
+            tuple: (ClassEncodings remaining, ClassEncodings present)
+        """
+        with self._lock:
+            cached = self._views
+            if cached is not None and cached[0] is class_encodings and cached[1] == self._version:
+                return cached[2], cached[3]
+
+            present_mask = np.isin(class_encodings.student_ids, list(self._present_ids))
+            remaining = class_encodings.subset(~present_mask)
+            present = class_encodings.subset(present_mask)
+            self._views = (class_encodings, self._version, remaining, present)
+            return remaining, present
+
+
+class SessionStateRegistry:
+    """ActiveSessionState per sesi aktif (in-process, disinkronkan berkala ke database)"""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+        self.refresh_seconds = 30
+        self.tracker_enabled = False
+        self.tracker_config = {}
+        self.frame_cache_enabled = False
+        self.frame_cache_config = {}
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.get('SESSION_STATE_REFRESH_SECONDS', 30)
+        self.tracker_enabled = app.config.get('TRACKER_ENABLED', True)
+        self.tracker_config = {
+            'iou_threshold': app.config.get('TRACKER_IOU_THRESHOLD', 0.3),
+            'max_age_seconds': app.config.get('TRACKER_MAX_AGE_SECONDS', 2.0),
+            'reverify_frames': app.config.get('TRACKER_REVERIFY_FRAMES', 10)
+        }
+        self.frame_cache_enabled = app.config.get('FRAME_CACHE_ENABLED', True)
+        self.frame_cache_config = {
+            'ttl_seconds': app.config.get('FRAME_CACHE_TTL_SECONDS', 3.0),
+            'max_distance': app.config.get('FRAME_CACHE_MAX_DISTANCE', 8),
+            'max_entries': app.config.get('FRAME_CACHE_SIZE', 8)
+        }
+        app.extensions['session_states'] = self
+
+    def _tracker_factory(self):
+        return functools.partial(FaceTracker, **self.tracker_config) if self.tracker_enabled else None
+
+    def _new_frame_cache(self):
+        return FrameResultCache(**self.frame_cache_config) if self.frame_cache_enabled else None
+
+    def start(self, session):
+        """Buat state untuk sesi yang baru dimulai"""
+        state = ActiveSessionState(session.id, session.class_id, (), self._tracker_factory(), self._new_frame_cache())
+        with self._lock:
+            self._states[session.id] = state
+        return state
+
+    def get(self, session_id, session=None):
+        """
+        Ambil state sesi
+
+        Sesi aktif yang belum punya state di process ini (dimulai di worker lain
+        atau setelah restart) di-load dari database. Untuk sesi yang sudah ditutup
+        dikembalikan state sementara tanpa tracker/frame cache yang tidak disimpan.
+
+        Args:
+            session_id: ID sesi
+            session: AttendanceSession jika sudah di-load (menghindari query ulang)
+
+        Returns:
+            ActiveSessionState atau None jika sesi tidak ada
+        """
+        with self._lock:
+            state = self._states.get(session_id)
+
+        if state is not None:
+            if time.monotonic() - state.synced_at > self.refresh_seconds:
+                state = self._refresh(state, session)
+            if state is not None:
+                return state
+
+        if session is None:
+            from app.models.attendance_session import AttendanceSession
+            session = AttendanceSession.query.get(session_id)
+            if session is None:
+                return None
+
+        if not session.is_active:
+            return ActiveSessionState.load(session)
+
+        state = ActiveSessionState.load(session, self._tracker_factory(), self._new_frame_cache())
+        with self._lock:
+            state = self._states.setdefault(session_id, state)
+        return state
+
+    def get_active(self, session_id):
+        """
+        State sesi yang masih aktif (untuk koneksi capture yang berumur panjang)
+
+        Returns:
+            ActiveSessionState atau None jika sesi sudah ditutup / tidak ada
+        """
+        state = self.get(session_id)
+        with self._lock:
+            return state if state is not None and self._states.get(session_id) is state else None
+
+    def _refresh(self, state, session=None):
+        # Sesi bisa ditutup atau mendapat record dari worker gunicorn lain
+        if session is None:
+            from app.models.attendance_session import AttendanceSession
+            session = AttendanceSession.query.get(state.session_id)
+
+        if session is None or not session.is_active:
+            self.drop(state.session_id)
+            return None
+
+        state.sync()
+        return state
+
+    def release_tracker(self, session_id, stream_key):
+        """Buang tracker stream yang ditutup (tanpa load state jika sesi tidak ada di process ini)"""
+        with self._lock:
+            state = self._states.get(session_id)
+        if state is not None:
+            state.release_tracker(stream_key)
+
+    def drop(self, session_id):
+        """Hapus state saat sesi ditutup"""
+        with self._lock:
+            self._states.pop(session_id, None)
+
+
+session_states = SessionStateRegistry()
@@ -0,0 +1,188 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.services.vector_index import IVFIndex
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Data mahasiswa untuk identifikasi lintas kelas (kelas dipakai untuk routing ke sesi aktif)
+IndexedStudent = namedtuple('IndexedStudent', ['id', 'student_id', 'name', 'class_id'])
+
+# Overlap watermark updated_at untuk clock skew antar server
+_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class StudentIndex:
+    """
+    Index ANN semua mahasiswa aktif (lintas kelas) untuk mode kiosk/gate
+
+    Index di-build sekali per worker saat dipakai, lalu disinkronkan secara
+    incremental: perubahan di process ini langsung (lewat event session),
+    perubahan dari worker lain lewat kolom updated_at setiap sync_seconds.
+    """
+
+    def __init__(self):
+        self.n_lists = 0
+        self.n_probe = 16
+        self.pca_dim = 32
+        self.sync_seconds = 30
+        self._index = None
+        self._students = {}
+        self._pending = set()
+        self._watermark = None
+        self._synced_at = 0.0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        """Baca parameter index dari config aplikasi"""
+        self.n_lists = app.config.get('VECTOR_INDEX_LISTS', 0)
+        self.n_probe = app.config.get('VECTOR_INDEX_PROBES', 16)
+        self.pca_dim = app.config.get('VECTOR_INDEX_PCA_DIM', 32)
+        self.sync_seconds = app.config.get('VECTOR_INDEX_SYNC_SECONDS', 30)
+        app.extensions['student_index'] = self
+
+    def _new_index(self):
+        return IVFIndex(n_lists=self.n_lists, n_probe=self.n_probe, pca_dim=self.pca_dim)
+
+    def _build(self):
+        from app.models.student import Student
+
+        started = time.perf_counter()
+        watermark = datetime.utcnow()
+        rows, matrix = Student.load_encodings(
+            columns=(Student.id, Student.student_id, Student.name, Student.class_id)
+        )
+
+        index = self._new_index()
+        index.build([row[0] for row in rows], matrix)
+
+        self._index = index
+        self._students = {row[0]: IndexedStudent(*row) for row in rows}
+        self._pending.clear()
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+
+        logger.info(f"✓ Student index dibangun: {len(index)} mahasiswa, {len(index.list_sizes())} partisi "
+                    f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    def _sync(self):
+        from app import db
+        from app.models.student import Student
+
+        watermark = datetime.utcnow()
+        criteria = [Student.updated_at >= self._watermark - _SYNC_OVERLAP]
+        if self._pending:
+            criteria.append(Student.id.in_(list(self._pending)))
+
+        rows = db.session.query(
+            Student.id, Student.student_id, Student.name, Student.class_id,
+            Student.is_active, Student.face_encoding_blob, Student.face_encoding_json
+        ).filter(db.or_(*criteria)).all()
+
+        seen = set()
+        for row_id, nim, name, class_id, is_active, blob, encoding_json in rows:
+            seen.add(row_id)
+            encoding = Student.decode_encoding(blob, encoding_json) if is_active else None
+            if encoding is None:
+                self._index.remove([row_id])
+                self._students.pop(row_id, None)
+            else:
+                self._index.add([row_id], encoding)
+                self._students[row_id] = IndexedStudent(row_id, nim, name, class_id)
+
+        # Id pending yang tidak ditemukan lagi sudah dihapus dari database
+        deleted = self._pending - seen
+        if deleted:
+            self._index.remove(deleted)
+            for row_id in deleted:
+                self._students.pop(row_id, None)
+
+        self._pending.clear()
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+
+        if self._index.needs_retrain():
+            self._build()
+
+    def _ensure(self):
+        if self._index is None:
+            self._build()
+        elif self._pending or time.monotonic() - self._synced_at > self.sync_seconds:
+            self._sync()
+
+    def search(self, encoding, k=1):
+        """
+        Cari mahasiswa terdekat di seluruh institusi
+
+        Args:
+            encoding: 128-dim array
+            k: jumlah kandidat
+
+        Returns:
+            list of (IndexedStudent, distance), urut dari yang terdekat
+        """
+        with self._lock:
+            self._ensure()
+            ids, distances = self._index.search(encoding, k)
+            return [
+                (self._students[item_id], float(distance))
+                for item_id, distance in zip(ids.tolist(), distances.tolist())
+                if item_id in self._students
+            ]
+
+    def mark_dirty(self, student_ids):
+        """Tandai mahasiswa yang berubah supaya di-sync sebelum search berikutnya"""
+        with self._lock:
+            if self._index is not None:
+                self._pending.update(student_ids)
+
+    def rebuild(self):
+        """Build ulang index (termasuk training centroid)"""
+        with self._lock:
+            self._build()
+
+    def stats(self):
+        """Ukuran index untuk monitoring"""
+        with self._lock:
+            if self._index is None:
+                return {'built': False}
+            sizes = self._index.list_sizes()
+            return {
+                'built': True,
+                'students': len(self._index),
+                'lists': len(sizes),
+                'max_list_size': max(sizes) if sizes else 0,
+                'n_probe': self._index.n_probe,
+                'pca_dim': self.pca_dim,
+                'pending': len(self._pending)
+            }
+
+
+student_index = StudentIndex()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dirty_students(session, flush_context):
+    """Catat mahasiswa yang ditambah/diubah/dihapus di transaksi ini"""
+    from app.models.student import Student
+
+    dirty = session.info.setdefault('student_index_dirty', set())
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, Student) and obj.id is not None:
+            dirty.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_dirty_students(session):
+    dirty = session.info.pop('student_index_dirty', None)
+    if dirty:
+        student_index.mark_dirty(dirty)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_dirty_students(session, previous_transaction):
+    session.info.pop('student_index_dirty', None)
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.services.flight_recorder import trace_span
+import time
+
+
+class StageTimer:
+    """Catat durasi per stage (ms) dalam satu request/task"""
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager untuk mengukur satu stage"""
+        start = time.perf_counter()
+        try:
+            with trace_span(name):
+                yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000.0)
+
+    def add(self, name, duration_ms):
+        """Tambah durasi ke stage (stage yang sama diakumulasi)"""
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def merge(self, stages):
+        """Gabungkan durasi dari timer lain (misalnya hasil worker process)"""
+        for name, duration_ms in stages.items():
+            self.add(name, duration_ms)
+
+    def elapsed_ms(self):
+        """Durasi sejak timer dibuat (ms)"""
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def as_dict(self):
+        """Durasi per stage dalam ms, dibulatkan untuk response JSON"""
+        return {name: round(duration_ms, 2) for name, duration_ms in self.stages.items()}
+
+
+def request_timer():
+    """
+    StageTimer untuk request saat ini, durasinya dikirim di header Server-Timing
+
+    Returns:
+        StageTimer yang disimpan di flask.g
+    """
+    from flask import g
+
+    g.stage_timer = StageTimer()
+    return g.stage_timer
@@ -0,0 +1,240 @@
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Jumlah baris per blok saat menghitung distance ke centroid (membatasi memory)
+_ASSIGN_CHUNK_ROWS = 4096
+
+# Maksimum vektor untuk training k-means / PCA
+_MAX_TRAIN_SAMPLES = 100000
+
+
+def _nearest_centroids(data, centroids):
+    """Index centroid terdekat untuk setiap baris data (squared euclidean, per blok)"""
+    centroid_sq = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), _ASSIGN_CHUNK_ROWS):
+        block = data[start:start + _ASSIGN_CHUNK_ROWS]
+        # ||x||^2 konstan per baris sehingga tidak perlu untuk argmin
+        scores = centroid_sq[None, :] - 2.0 * block @ centroids.T
+        labels[start:start + len(block)] = scores.argmin(axis=1)
+    return labels
+
+
+def kmeans(data, n_clusters, n_iter=20, seed=0):
+    """
+    Lloyd k-means sederhana (numpy)
+
+    Args:
+        data: array N x D float32
+        n_clusters: jumlah cluster (<= N)
+        n_iter: jumlah iterasi
+        seed: seed random untuk inisialisasi
+
+    Returns:
+        array n_clusters x D centroid
+    """
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = _nearest_centroids(data, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+        # Cluster kosong diisi ulang dengan titik random
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index untuk nearest-neighbour search encoding wajah
+
+    Vektor dibagi ke n_lists partisi k-means (opsional di ruang PCA yang lebih
+    kecil). Query hanya memeriksa n_probe partisi terdekat lalu menghitung
+    distance euclidean penuh (128 dimensi) ke kandidat di partisi tersebut.
+    Insert dan delete incremental tidak mengubah centroid; retrain jika ukuran
+    index sudah jauh berbeda dari saat training (lihat needs_retrain).
+    """
+
+    def __init__(self, dim=128, n_lists=0, n_probe=16, pca_dim=0, seed=0):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.pca_dim = pca_dim
+        self.seed = seed
+        self.trained_size = 0
+        self._mean = None
+        self._components = None
+        self._centroids = None
+        self._list_ids = []
+        self._list_vectors = []
+        self._list_sq_norms = []
+        self._where = {}
+
+    @staticmethod
+    def auto_lists(size):
+        """Jumlah partisi default: ~2 * sqrt(N), satu partisi (exact) untuk index kecil"""
+        if size < 2000:
+            return 1
+        return int(2 * np.sqrt(size))
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, item_id):
+        return item_id in self._where
+
+    @property
+    def is_trained(self):
+        return self._centroids is not None
+
+    def _project(self, vectors):
+        if self._components is None:
+            return vectors
+        return (vectors - self._mean) @ self._components.T
+
+    def train(self, vectors):
+        """
+        Hitung PCA (opsional) dan centroid partisi dari sampel vektor
+
+        Args:
+            vectors: array N x dim
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > _MAX_TRAIN_SAMPLES:
+            vectors = vectors[rng.choice(len(vectors), _MAX_TRAIN_SAMPLES, replace=False)]
+
+        n_lists = self.n_lists or self.auto_lists(len(vectors))
+        n_lists = max(1, min(n_lists, len(vectors)))
+
+        if self.pca_dim and self.pca_dim < self.dim and len(vectors) > self.pca_dim:
+            self._mean = vectors.mean(axis=0)
+            _, _, vt = np.linalg.svd(vectors - self._mean, full_matrices=False)
+            self._components = np.ascontiguousarray(vt[:self.pca_dim], dtype=np.float32)
+        else:
+            self._mean = None
+            self._components = None
+
+        reduced = np.ascontiguousarray(self._project(vectors), dtype=np.float32)
+        if n_lists == 1 or len(reduced) == 0:
+            self._centroids = reduced.mean(axis=0, keepdims=True) if len(reduced) else \
+                np.zeros((1, reduced.shape[1]), dtype=np.float32)
+        else:
+            self._centroids = kmeans(reduced, n_lists, seed=self.seed)
+
+        self._list_ids = [np.empty(0, dtype=np.int64) for _ in range(len(self._centroids))]
+        self._list_vectors = [np.empty((0, self.dim), dtype=np.float32) for _ in range(len(self._centroids))]
+        self._list_sq_norms = [np.empty(0, dtype=np.float32) for _ in range(len(self._centroids))]
+        self._where = {}
+        self.trained_size = len(vectors)
+
+    def build(self, ids, vectors):
+        """Train lalu isi index dengan semua vektor"""
+        self.train(vectors)
+        self.add(ids, vectors)
+
+    def add(self, ids, vectors):
+        """
+        Insert (atau replace) vektor
+
+        Args:
+            ids: list/array id (misalnya Student.id)
+            vectors: array len(ids) x dim
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+
+        self.remove([item_id for item_id in ids.tolist() if item_id in self._where])
+
+        labels = _nearest_centroids(self._project(vectors), self._centroids)
+        for list_no in np.unique(labels):
+            mask = labels == list_no
+            block = vectors[mask]
+            self._list_ids[list_no] = np.concatenate([self._list_ids[list_no], ids[mask]])
+            self._list_vectors[list_no] = np.concatenate([self._list_vectors[list_no], block])
+            self._list_sq_norms[list_no] = np.concatenate(
+                [self._list_sq_norms[list_no], np.einsum('ij,ij->i', block, block)]
+            )
+            for item_id in ids[mask].tolist():
+                self._where[item_id] = int(list_no)
+
+    def remove(self, ids):
+        """Hapus vektor berdasarkan id (id yang tidak ada diabaikan)"""
+        by_list = {}
+        for item_id in ids:
+            list_no = self._where.pop(int(item_id), None)
+            if list_no is not None:
+                by_list.setdefault(list_no, []).append(int(item_id))
+
+        for list_no, removed in by_list.items():
+            keep = ~np.isin(self._list_ids[list_no], removed)
+            self._list_ids[list_no] = self._list_ids[list_no][keep]
+            self._list_vectors[list_no] = self._list_vectors[list_no][keep]
+            self._list_sq_norms[list_no] = self._list_sq_norms[list_no][keep]
+
+    def search(self, query, k=1, n_probe=None):
+        """
+        Cari k vektor terdekat
+
+        Args:
+            query: vektor dim
+            k: jumlah hasil
+            n_probe: jumlah partisi yang diperiksa (default self.n_probe)
+
+        Returns:
+            tuple: (array id, array distance euclidean), urut dari yang terdekat
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        if not self._where:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        n_probe = min(n_probe or self.n_probe, len(self._centroids))
+        reduced = self._project(query[None, :])[0]
+        diff = self._centroids - reduced
+        centroid_distances = np.einsum('ij,ij->i', diff, diff)
+        if n_probe < len(self._centroids):
+            probes = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+        else:
+            probes = np.arange(len(self._centroids))
+
+        probes = [p for p in probes if len(self._list_ids[p])]
+        if not probes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidate_ids = np.concatenate([self._list_ids[p] for p in probes])
+        candidates = np.concatenate([self._list_vectors[p] for p in probes])
+        candidate_sq = np.concatenate([self._list_sq_norms[p] for p in probes])
+
+        sq_distances = candidate_sq + float(query @ query) - 2.0 * candidates @ query
+        distances = np.sqrt(np.maximum(sq_distances, 0.0))
+
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind='stable')]
+        return candidate_ids[top], distances[top]
+
+    def needs_retrain(self):
+        """Centroid perlu dihitung ulang jika ukuran index berubah lebih dari 2x"""
+        size = len(self._where)
+        if not self.is_trained:
+            return True
+        if self.trained_size == 0:
+            return size > 0
+        return size > 2 * self.trained_size or size * 2 < self.trained_size
+
+    def list_sizes(self):
+        """Jumlah vektor per partisi"""
+        return [len(ids) for ids in self._list_ids]
@@ -0,0 +1,9 @@
+"""
+Benchmark pipeline recognition (decode, resize, detect, encode, match, tulis database)
+dan route capture end-to-end dengan roster dan frame sintetis
+
+Jalankan dari root project:
+
+    python -m benchmarks run --output bench.json
+    python -m benchmarks compare before.json after.json
+"""
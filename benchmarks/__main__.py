@@ -0,0 +1,239 @@
+from datetime import datetime
+import click
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def _float_list(value):
+    return [float(item) for item in value.split(',') if item.strip()]
+
+
+@click.group()
+def cli():
+    """Benchmark pipeline recognition dan route capture"""
+
+
+@cli.command('run')
+@click.option('--rosters', default='50,500,5000,50000', show_default=True,
+              help='Ukuran roster untuk benchmark match')
+@click.option('--route-rosters', default='50,500,5000', show_default=True,
+              help='Ukuran roster (di database) untuk benchmark route; kosong = dilewati')
+@click.option('--resolutions', default='640x480,1280x720,1920x1080', show_default=True)
+@click.option('--faces', default='1,4', show_default=True, help='Jumlah wajah per frame')
+@click.option('--scales', default=None, help='Resize scale decode/detect (default FRAME_RESIZE_SCALE)')
+@click.option('--concurrency', default='1,2', show_default=True,
+              help='Jumlah client paralel untuk benchmark route')
+@click.option('--repeat', default=20, show_default=True, help='Pengulangan per kombinasi (setelah warm-up)')
+@click.option('--payload', type=click.Choice(['raw', 'json']), default='raw', show_default=True,
+              help='Format request route: body image/jpeg atau JSON base64')
+@click.option('--face-photo', type=click.Path(exists=True, dir_okay=False),
+              help='Foto wajah asli yang ditempel ke frame (detector realistis)')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--log-level', default='WARNING', show_default=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='File JSON hasil')
+def run_command(rosters, route_rosters, resolutions, faces, scales, concurrency, repeat, payload,
+                face_photo, seed, log_level, output):
+    """Jalankan benchmark per stage dan route, tulis hasil sebagai JSON"""
+    from app.models.student import Student
+    from benchmarks import results as bench_results
+    from benchmarks.fixtures import create_bench_app, bench_lecturer, seed_class, remove_database
+    from benchmarks.route import ROUTE_OVERRIDES, route_benchmark
+    from benchmarks.stages import frame_stages, match_stages, db_write_stages
+    from benchmarks.synthetic import FaceTemplate, parse_resolution, synthetic_roster
+
+    args = {
+        'rosters': rosters, 'route_rosters': route_rosters, 'resolutions': resolutions, 'faces': faces,
+        'scales': scales, 'concurrency': concurrency, 'repeat': repeat, 'payload': payload,
+        'face_photo': face_photo, 'seed': seed
+    }
+    roster_sizes = _int_list(rosters)
+    route_sizes = _int_list(route_rosters)
+    resolution_list = [parse_resolution(item) for item in resolutions.split(',') if item.strip()]
+    face_counts = _int_list(faces)
+    concurrency_list = _int_list(concurrency)
+
+    app, database_path = create_bench_app(log_level, ROUTE_OVERRIDES)
+    entries = []
+
+    def report(batch):
+        for entry in batch:
+            stats = entry['stats']
+            params = ' '.join(f'{key}={value}' for key, value in entry['params'].items())
+            click.echo(f'{entry["name"]:>16} {stats.get("p50_ms", 0):>10.2f} {stats.get("p95_ms", 0):>10.2f}  '
+                       f'{params}')
+        entries.extend(batch)
+
+    try:
+        with app.app_context():
+            template = FaceTemplate.load(face_photo) if face_photo else None
+            scale_list = _float_list(scales) if scales else [app.config.get('FRAME_RESIZE_SCALE', 0.25)]
+
+            click.echo(f'{"stage":>16} {"p50 ms":>10} {"p95 ms":>10}  parameter')
+            for width, height in resolution_list:
+                for face_count in face_counts:
+                    for scale in scale_list:
+                        report(frame_stages(width, height, face_count, scale, repeat, template, seed))
+
+            for roster_size in roster_sizes:
+                report(match_stages(roster_size, face_counts, repeat, seed))
+
+            lecturer_id = bench_lecturer().id
+            class_id = seed_class(synthetic_roster(max(face_counts), seed), lecturer_id, f'DB-{seed}')
+            student_ids = [row.id for row in Student.query.filter_by(class_id=class_id).order_by(Student.id)]
+            for face_count in face_counts:
+                report(db_write_stages(class_id, student_ids, lecturer_id, face_count, repeat))
+
+        for roster_size in route_sizes:
+            report(route_benchmark(app, roster_size, resolution_list, face_counts, concurrency_list, repeat,
+                                   payload, template, seed))
+
+        meta = bench_results.collect_meta(app, args)
+    finally:
+        remove_database(database_path)
+
+    if output:
+        bench_results.save(output, meta, entries)
+        click.echo(f'✓ {len(entries)} hasil disimpan ke {output}')
+
+
+@cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=10.0, show_default=True, help='Perubahan (%) yang dianggap regresi')
+@click.option('--metric', type=click.Choice(['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'min_ms']), default='p50_ms',
+              show_default=True)
+@click.option('--min-ms', default=0.05, show_default=True, help='Stage di bawah durasi ini diabaikan (noise)')
+@click.option('--fail-on-regression', is_flag=True, help='Exit code 1 jika ada regresi')
+def compare_command(baseline, candidate, threshold, metric, min_ms, fail_on_regression):
+    """Bandingkan dua file hasil benchmark (misalnya dari dua commit)"""
+    from benchmarks import results as bench_results
+
+    before, after = bench_results.load(baseline), bench_results.load(candidate)
+    click.echo(f'baseline  {before["meta"].get("git_commit") or "-"}')
+    click.echo(f'candidate {after["meta"].get("git_commit") or "-"}')
+    click.echo(f'{"stage":>16} {"before":>10} {"after":>10} {"change":>8}  parameter')
+
+    rows = bench_results.compare(before, after, threshold / 100.0, metric, min_ms)
+    markers = {'regression': '✗', 'improvement': '✓', 'same': ' ', 'new': '+', 'removed': '-'}
+    for row in rows:
+        params = ' '.join(f'{key}={value}' for key, value in row['params'].items())
+        change = f'{row["change"] * 100:+.1f}%' if row['change'] is not None else '-'
+        before_ms = f'{row["baseline"]:.2f}' if row['baseline'] is not None else '-'
+        after_ms = f'{row["candidate"]:.2f}' if row['candidate'] is not None else '-'
+        click.echo(f'{row["name"]:>16} {before_ms:>10} {after_ms:>10} {change:>8}  {params} '
+                   f'{markers[row["status"]]}')
+
+    regressions = sum(1 for row in rows if row['status'] == 'regression')
+    improvements = sum(1 for row in rows if row['status'] == 'improvement')
+    click.echo(f'{regressions} regresi, {improvements} lebih cepat (threshold {threshold:.0f}% pada {metric})')
+    if regressions and fail_on_regression:
+        raise SystemExit(1)
+
+
+@cli.command('cold-start')
+@click.option('--modes', default='lean,preload', show_default=True,
+              help='lean = model dimuat saat capture pertama, preload = dimuat sebelum request (gunicorn)')
+@click.option('--repeat', default=5, show_default=True, help='Process baru per mode')
+@click.option('--resolution', default='1280x720', show_default=True)
+@click.option('--faces', default=1, show_default=True)
+@click.option('--face-photo', type=click.Path(exists=True, dir_okay=False),
+              help='Foto wajah asli yang ditempel ke frame')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='File JSON hasil')
+def cold_start_command(modes, repeat, resolution, faces, face_photo, seed, output):
+    """Ukur cold start worker: import, create_app, load model, request pertama"""
+    from benchmarks import results as bench_results
+    from benchmarks.cold_start import MODES, cold_start_benchmark
+    from benchmarks.synthetic import FaceTemplate, parse_resolution
+
+    mode_list = [mode.strip() for mode in modes.split(',') if mode.strip()]
+    unknown = set(mode_list) - set(MODES)
+    if unknown:
+        raise click.BadParameter(f'Mode tidak dikenal: {", ".join(sorted(unknown))} (pilihan: {", ".join(MODES)})')
+
+    width, height = parse_resolution(resolution)
+    template = FaceTemplate.load(face_photo) if face_photo else None
+    entries = cold_start_benchmark(mode_list, repeat, width, height, faces, template, seed)
+
+    click.echo(f'{"fase":>22} {"mode":>8} {"p50 ms":>10} {"p95 ms":>10}')
+    for entry in entries:
+        stats = entry['stats']
+        click.echo(f'{entry["name"]:>22} {entry["params"]["mode"]:>8} {stats["p50_ms"]:>10.1f} {stats["p95_ms"]:>10.1f}')
+    for mode in mode_list:
+        extra = next((entry['extra'] for entry in entries if entry['params']['mode'] == mode), None)
+        if extra:
+            click.echo(f'{mode}: model dimuat saat start={extra["models_at_start"]}, '
+                       f'setelah request report={extra["models_after_report"]}, max RSS {extra["max_rss_mb"]} MB')
+
+    if output:
+        meta = {
+            'created_at': datetime.utcnow().isoformat(),
+            'git_commit': bench_results._git('rev-parse', 'HEAD') or None,
+            'args': {'modes': modes, 'repeat': repeat, 'resolution': resolution, 'faces': faces,
+                     'face_photo': face_photo, 'seed': seed}
+        }
+        bench_results.save(output, meta, entries)
+        click.echo(f'✓ {len(entries)} hasil disimpan ke {output}')
+
+
+@cli.command('replay')
+@click.argument('archives', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--url', default='http://127.0.0.1:5000', show_default=True, help='Server yang diuji')
+@click.option('--sessions', '-n', default=1, show_default=True, help='Sesi yang diputar bersamaan')
+@click.option('--speed', '-k', default=1.0, show_default=True, help='Kecepatan replay (2 = dua kali lebih cepat)')
+@click.option('--username', envvar='REPLAY_USERNAME', required=True, help='User dosen/admin pemilik kelas')
+@click.option('--password', envvar='REPLAY_PASSWORD', prompt=True, hide_input=True)
+@click.option('--class-ids', default=None, help='Kelas sesi replay (dipakai bergiliran); default kelas rekaman')
+@click.option('--max-in-flight', default=8, show_default=True, help='Request bersamaan maksimal per sesi')
+@click.option('--timeout', default=30.0, show_default=True, help='Timeout per request (detik)')
+@click.option('--keep-sessions', is_flag=True, help='Sesi replay tidak ditutup setelah selesai')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='File JSON hasil')
+def replay_command(archives, url, sessions, speed, username, password, class_ids, max_in_flight, timeout,
+                   keep_sessions, output):
+    """Putar archive rekaman capture (CAPTURE_RECORDING_ENABLED) ke server yang berjalan"""
+    from benchmarks import results as bench_results
+    from benchmarks.replay import ReplayError, replay
+
+    if sessions < 1 or speed <= 0:
+        raise click.BadParameter('--sessions minimal 1 dan --speed harus > 0')
+
+    try:
+        entries = replay(url, archives, sessions, speed, username, password,
+                         _int_list(class_ids) if class_ids else None, max_in_flight, timeout,
+                         keep_sessions, click.echo)
+    except ReplayError as e:
+        raise click.ClickException(str(e))
+
+    for entry in entries:
+        stats, extra = entry['stats'], entry['extra']
+        agreement = extra['agreement']
+        click.echo(f'frame        {extra["frames"]} dalam {extra["elapsed_s"]:.1f} s '
+                   f'(offered {extra["offered_rps"] or 0:.2f}/s, throughput {extra["throughput_rps"] or 0:.2f}/s)')
+        click.echo(f'latency      p50 {stats.get("p50_ms", 0):.1f} ms, p99 {stats.get("p99_ms", 0):.1f} ms '
+                   f'(run asli p50 {extra["original_p50_ms"] or 0:.1f} ms, p99 {extra["original_p99_ms"] or 0:.1f} ms)')
+        click.echo(f'status       {" ".join(f"{status}={count}" for status, count in extra["statuses"].items())} '
+                   f'(error {extra["error_rate"] * 100:.1f}%, 429/503 {extra["busy_rate"] * 100:.1f}%)')
+        click.echo(f'jadwal       p99 terlambat {extra["lag_p99_ms"] or 0:.1f} ms')
+        if agreement['frames']:
+            recall = agreement['student_recall']
+            click.echo(f'agreement    {agreement["frame_agreement"] * 100:.1f}% frame sama dari '
+                       f'{agreement["frames"]}, recall mahasiswa '
+                       f'{f"{recall * 100:.1f}%" if recall is not None else "-"}, '
+                       f'{agreement["students_extra"]} mahasiswa tambahan')
+
+    if output:
+        meta = {
+            'created_at': datetime.utcnow().isoformat(),
+            'git_commit': bench_results._git('rev-parse', 'HEAD') or None,
+            'url': url,
+            'args': {'archives': list(archives), 'sessions': sessions, 'speed': speed, 'class_ids': class_ids,
+                     'max_in_flight': max_in_flight}
+        }
+        bench_results.save(output, meta, entries)
+        click.echo(f'✓ Hasil disimpan ke {output}')
+
+
+if __name__ == '__main__':
+    cli()
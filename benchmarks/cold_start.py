@@ -0,0 +1,157 @@
+from benchmarks.results import result
+import subprocess
+import tempfile
+import json
+import time
+import sys
+import os
+
+# Metrik yang diukur di process baru (ms)
+PHASES = ('process', 'import', 'create_app', 'preload', 'report_request', 'first_capture', 'second_capture')
+
+MODES = ('lean', 'preload')
+
+_CHILD_CODE = 'import sys; from benchmarks.cold_start import child; child(sys.argv[1])'
+
+
+def child(spec_path):
+    """
+    Dijalankan di process Python baru: ukur import, create_app, preload model
+    (mode preload), request non-recognition lalu dua request capture
+
+    Hanya benchmarks.fixtures yang di-import (bukan synthetic/route yang memuat
+    cv2) supaya process lean benar-benar mulai tanpa OpenCV/dlib. Hasil dicetak
+    sebagai JSON di baris terakhir stdout.
+    """
+    import resource
+
+    with open(spec_path, encoding='utf-8') as f:
+        spec = json.load(f)
+
+    timings = {}
+    started = time.perf_counter()
+    from benchmarks.fixtures import create_bench_app
+    from app.services.model_preload import models_loaded, preload_models
+    timings['import_ms'] = (time.perf_counter() - started) * 1000.0
+
+    started = time.perf_counter()
+    app, _ = create_bench_app('WARNING', spec['overrides'], spec['database'])
+    timings['create_app_ms'] = (time.perf_counter() - started) * 1000.0
+    timings['models_at_start'] = models_loaded()
+
+    if spec['mode'] == 'preload':
+        started = time.perf_counter()
+        preload_models(app)
+        timings['preload_ms'] = (time.perf_counter() - started) * 1000.0
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(spec['user_id'])
+        session['_fresh'] = True
+
+    # Request report/admin (tanpa recognition) tidak boleh memuat dlib
+    started = time.perf_counter()
+    response = client.get(f'/api/attendance/sessions/{spec["session_id"]}/status')
+    timings['report_request_ms'] = (time.perf_counter() - started) * 1000.0
+    timings['report_status'] = response.status_code
+    timings['models_after_report'] = models_loaded()
+
+    with open(spec['frame'], 'rb') as f:
+        jpeg = f.read()
+    for phase in ('first_capture', 'second_capture'):
+        started = time.perf_counter()
+        response = client.post(spec['url'], query_string=spec['query'], data=jpeg, content_type='image/jpeg')
+        timings[f'{phase}_ms'] = (time.perf_counter() - started) * 1000.0
+        timings[f'{phase}_status'] = response.status_code
+
+    timings['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print(json.dumps(timings))
+
+
+def _run_child(spec_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', _CHILD_CODE, spec_path], cwd=root, env=env,
+                               capture_output=True, text=True, timeout=600)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    if completed.returncode != 0:
+        raise RuntimeError(f'Process cold start gagal:\n{completed.stderr[-2000:]}')
+
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = elapsed_ms
+    return timings
+
+
+def cold_start_benchmark(modes, repeat, width, height, faces, template=None, seed=0):
+    """
+    Cold start per mode di process baru (interpreter, import, create_app tanpa
+    bootstrap database, preload model, request report, capture pertama dan kedua)
+
+    Args:
+        modes: 'lean' (model dimuat saat capture pertama) dan/atau 'preload'
+            (preload_models sebelum request pertama, seperti master gunicorn)
+        repeat: jumlah process per mode
+
+    Returns:
+        list of result: cold_<phase> per mode (+ flag model dimuat dan max RSS di extra)
+    """
+    from benchmarks.fixtures import create_bench_app, bench_lecturer, seed_class, remove_database
+    from benchmarks.route import ROUTE_OVERRIDES, CAPTURE_URL, capture_request
+    from benchmarks.synthetic import render_frame, encode_jpeg, synthetic_roster
+
+    app, database_path = create_bench_app('WARNING', ROUTE_OVERRIDES)
+    handle, frame_path = tempfile.mkstemp(prefix='fr-cold-', suffix='.jpg')
+    os.close(handle)
+    handle, spec_path = tempfile.mkstemp(prefix='fr-cold-', suffix='.json')
+    os.close(handle)
+
+    results = []
+    try:
+        with app.app_context():
+            from app.services.attendance_service import AttendanceService
+
+            lecturer_id = bench_lecturer().id
+            class_id = seed_class(synthetic_roster(max(faces, 1) * 10, seed), lecturer_id, f'COLD-{seed}')
+            session_id = AttendanceService.start_session(class_id, 'Cold start', lecturer_id).id
+
+        image, boxes = render_frame(width, height, faces, seed, template)
+        with open(frame_path, 'wb') as f:
+            f.write(encode_jpeg(image))
+        request = capture_request(session_id, b'', boxes, width, height)
+
+        params = {'resolution': f'{width}x{height}', 'faces': faces}
+        for mode in modes:
+            spec = {
+                'mode': mode,
+                'database': database_path,
+                'overrides': dict(ROUTE_OVERRIDES, AUTO_INIT_DB=False),
+                'user_id': lecturer_id,
+                'session_id': session_id,
+                'frame': frame_path,
+                'url': CAPTURE_URL,
+                'query': request['query_string']
+            }
+            with open(spec_path, 'w', encoding='utf-8') as f:
+                json.dump(spec, f)
+
+            runs = [_run_child(spec_path) for _ in range(repeat)]
+            extra = {
+                'models_at_start': any(run['models_at_start'] for run in runs),
+                'models_after_report': any(run['models_after_report'] for run in runs),
+                'capture_status': sorted({run['first_capture_status'] for run in runs}),
+                'max_rss_mb': round(max(run['max_rss_mb'] for run in runs), 1)
+            }
+            for phase in PHASES:
+                durations = [run[f'{phase}_ms'] / 1000.0 for run in runs if f'{phase}_ms' in run]
+                if durations:
+                    results.append(result(f'cold_{phase}', dict(params, mode=mode), durations, **extra))
+    finally:
+        remove_database(database_path)
+        for path in (frame_path, spec_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return results
@@ -0,0 +1,271 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import build_opener, HTTPCookieProcessor, Request
+from app.services.capture_recorder import read_archive, matched_ids, KIND_HEADER, KIND_FRAME
+from benchmarks.results import result
+import numpy as np
+import threading
+import json
+import time
+import os
+
+CAPTURE_URL = '/api/attendance/capture'
+LOGIN_URL = '/auth/api/login'
+
+# Response "server penuh": 429 dari proxy/rate limiter, 503 dari recognition engine / antrian job
+BUSY_STATUSES = (429, 503)
+
+
+class ReplayError(Exception):
+    """Replay tidak bisa dimulai (login / start sesi gagal, archive tidak valid)"""
+
+
+def load_archive(path):
+    """
+    Archive rekaman capture: header sesi + frame urut waktu datang
+
+    Returns:
+        tuple: (header dict, list of (meta, bytes image))
+    """
+    header, frames = None, []
+    for kind, meta, blob in read_archive(path):
+        if kind == KIND_HEADER:
+            header = meta
+        elif kind == KIND_FRAME:
+            frames.append((meta, blob))
+
+    if header is None:
+        raise ReplayError(f'{path} bukan archive capture (header tidak ada)')
+    if not frames:
+        raise ReplayError(f'{path} tidak berisi frame')
+
+    frames.sort(key=lambda item: item[0]['t'])
+    return header, frames
+
+
+def _content_type(blob):
+    if blob[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if blob[:4] == b'RIFF' and blob[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def _query_value(value):
+    # Field dari request JSON (bool, list face_boxes) dikirim lewat query string seperti request raw
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return json.dumps(value)
+
+
+class ReplayClient:
+    """Koneksi HTTP ke server yang diuji (cookie login Flask-Login sendiri per sesi replay)"""
+
+    def __init__(self, base_url, timeout=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._opener = build_opener(HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, body=None, content_type=None, query=None):
+        """
+        Returns:
+            tuple: (HTTP status, body JSON atau {}); status 0 jika koneksi gagal / timeout
+        """
+        url = self.base_url + path + ('?' + urlencode(query) if query else '')
+        request = Request(url, data=body, method=method)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return response.status, _json(response.read())
+        except HTTPError as e:
+            return e.code, _json(e.read())
+        except OSError:
+            return 0, {}
+
+    def post_json(self, path, data):
+        return self.request('POST', path, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def login(self, username, password):
+        status, body = self.post_json(LOGIN_URL, {'username': username, 'password': password})
+        if status != 200:
+            raise ReplayError(f'Login {username} gagal ({status}): {body.get("error", "server tidak merespon")}')
+
+    def start_session(self, class_id, session_name):
+        status, body = self.post_json('/api/attendance/sessions/start',
+                                      {'class_id': class_id, 'session_name': session_name})
+        if status != 201:
+            raise ReplayError(f'Start sesi kelas {class_id} gagal ({status}): {body.get("error", "")}')
+        return body['session']['id']
+
+    def end_session(self, session_id):
+        return self.post_json(f'/api/attendance/sessions/{session_id}/end', {})[0]
+
+
+def _json(data):
+    try:
+        return json.loads(data) if data else {}
+    except ValueError:
+        return {}
+
+
+def _replay_session(client, session_id, frames, speed, max_in_flight, started_at):
+    """
+    Kirim frame satu archive sesuai jadwal rekaman (open loop: frame berikutnya
+    dikirim pada waktunya walaupun response sebelumnya belum datang, maksimal
+    max_in_flight request bersamaan)
+
+    Returns:
+        list of dict per frame: duration, status, lag (terlambat dari jadwal), matched_ids, original
+    """
+    first_t = frames[0][0]['t']
+    outcomes = [None] * len(frames)
+
+    def send(index, meta, blob, scheduled):
+        query = {key: _query_value(value) for key, value in meta['fields'].items()}
+        query['session_id'] = session_id
+        start = time.perf_counter()
+        status, body = client.request('POST', CAPTURE_URL, blob, _content_type(blob), query)
+        outcomes[index] = {
+            'duration': time.perf_counter() - start,
+            'finished': time.perf_counter(),
+            'lag': start - scheduled,
+            'status': status,
+            'matched_ids': matched_ids(body) if status == 200 else None,
+            'original': meta
+        }
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for index, (meta, blob) in enumerate(frames):
+            scheduled = started_at + (meta['t'] - first_t) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index, meta, blob, scheduled)
+
+    return outcomes
+
+
+def agreement(outcomes):
+    """
+    Kesesuaian hasil recognition replay dengan run asli (frame yang sukses di keduanya)
+
+    Returns:
+        dict: frames (yang dibandingkan), frame_agreement (set mahasiswa per frame sama),
+        student_recall (mahasiswa run asli yang juga dikenali replay), students_extra
+        (mahasiswa yang hanya dikenali replay)
+    """
+    compared = [
+        outcome for outcome in outcomes
+        if outcome['status'] == 200 and outcome['original'].get('status') == 200
+        and outcome['original'].get('matched_ids') is not None
+    ]
+    if not compared:
+        return {'frames': 0, 'frame_agreement': None, 'student_recall': None, 'students_extra': 0}
+
+    same = sum(1 for outcome in compared if outcome['matched_ids'] == outcome['original']['matched_ids'])
+    original_ids = {student_id for outcome in compared for student_id in outcome['original']['matched_ids']}
+    replay_ids = {student_id for outcome in compared for student_id in outcome['matched_ids']}
+    return {
+        'frames': len(compared),
+        'frame_agreement': round(same / len(compared), 4),
+        'student_recall': round(len(original_ids & replay_ids) / len(original_ids), 4) if original_ids else None,
+        'students_extra': len(replay_ids - original_ids)
+    }
+
+
+def _percentile_ms(values, q):
+    return round(float(np.percentile(np.asarray(values) * 1000.0, q)), 3) if values else None
+
+
+def replay(base_url, archives, sessions, speed, username, password, class_ids=None, max_in_flight=8,
+           timeout=30.0, keep_sessions=False, echo=print):
+    """
+    Putar archive rekaman ke server lokal dengan N sesi bersamaan dan kecepatan K×
+
+    Setiap sesi replay login sendiri, memulai sesi absensi baru di kelasnya
+    (default kelas rekaman; archive dipakai bergiliran jika sesi > archive) lalu
+    mengirim frame sesuai jadwal rekaman dibagi speed. Server harus memakai
+    database yang sama (ID kelas dan mahasiswa) dengan run asli agar agreement
+    bermakna.
+
+    Returns:
+        list of result: satu baris 'replay' (latency semua response) dengan
+        throughput, status, error/busy rate dan agreement di extra
+    """
+    loaded = [(os.path.basename(path),) + load_archive(path) for path in archives]
+
+    plans = []
+    for index in range(sessions):
+        name, header, frames = loaded[index % len(loaded)]
+        class_id = class_ids[index % len(class_ids)] if class_ids else header['class_id']
+        plans.append({'archive': name, 'header': header, 'frames': frames, 'class_id': class_id})
+
+    shared = sessions - len({plan['class_id'] for plan in plans})
+    if shared:
+        # start_session menutup sesi aktif kelas yang sama: frame tetap diproses
+        # tetapi tanpa tracker / frame cache sesi aktif
+        echo(f'! {shared} sesi replay memakai kelas yang sama dengan sesi lain; '
+             f'gunakan --class-ids dengan kelas berbeda untuk beban yang realistis')
+
+    for index, plan in enumerate(plans):
+        plan['client'] = ReplayClient(base_url, timeout)
+        plan['client'].login(username, password)
+        plan['session_id'] = plan['client'].start_session(
+            plan['class_id'], f'Replay {index + 1}: {plan["header"].get("session_name", plan["archive"])}'
+        )
+        echo(f'✓ Sesi replay {plan["session_id"]} (kelas {plan["class_id"]}) <- {plan["archive"]}, '
+             f'{len(plan["frames"])} frame')
+
+    started_at = time.perf_counter() + 0.5
+    threads = []
+    for plan in plans:
+        thread = threading.Thread(
+            target=lambda plan=plan: plan.update(outcomes=_replay_session(
+                plan['client'], plan['session_id'], plan['frames'], speed, max_in_flight, started_at
+            ))
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    if not keep_sessions:
+        for plan in plans:
+            plan['client'].end_session(plan['session_id'])
+
+    outcomes = [outcome for plan in plans for outcome in plan['outcomes']]
+    elapsed = max(outcome['finished'] for outcome in outcomes) - started_at
+    recorded_span = sum(plan['frames'][-1][0]['t'] - plan['frames'][0][0]['t'] for plan in plans) / len(plans)
+    statuses = Counter(outcome['status'] for outcome in outcomes)
+    answered = [outcome['duration'] for outcome in outcomes if outcome['status']]
+    original = [outcome['original']['elapsed_ms'] / 1000.0 for outcome in outcomes
+                if outcome['original'].get('status') == 200]
+
+    params = {
+        'archives': ','.join(sorted({plan['archive'] for plan in plans})),
+        'sessions': sessions,
+        'speed': speed
+    }
+    return [result(
+        'replay', params, answered,
+        frames=len(outcomes),
+        elapsed_s=round(elapsed, 3),
+        offered_rps=round(len(outcomes) / (recorded_span / speed), 3) if recorded_span > 0 else None,
+        throughput_rps=round(len(outcomes) / elapsed, 3) if elapsed > 0 else None,
+        statuses={str(status): count for status, count in sorted(statuses.items())},
+        error_rate=round(sum(count for status, count in statuses.items()
+                             if not 200 <= status < 300) / len(outcomes), 4),
+        busy_rate=round(sum(statuses[status] for status in BUSY_STATUSES) / len(outcomes), 4),
+        lag_p99_ms=_percentile_ms([max(0.0, outcome['lag']) for outcome in outcomes], 99),
+        original_p50_ms=_percentile_ms(original, 50),
+        original_p99_ms=_percentile_ms(original, 99),
+        agreement=agreement(outcomes),
+        session_ids=[plan['session_id'] for plan in plans]
+    )]
@@ -0,0 +1,129 @@
+from datetime import datetime
+import numpy as np
+import platform
+import subprocess
+import json
+import os
+
+# Config yang mempengaruhi hasil benchmark (disimpan di meta supaya run bisa dibandingkan)
+CONFIG_KEYS = (
+    'FRAME_RESIZE_SCALE', 'FACE_DETECTOR_CAPTURE', 'FACE_DETECTOR_UPSAMPLE', 'FACE_ENCODE_MODE',
+    'FACE_ENCODING_MODEL', 'FACE_ENCODING_JITTERS', 'FACE_HINT_VALIDATION', 'FRAME_QUALITY_ENABLED',
+    'RECOGNITION_ENGINE_ENABLED', 'RECOGNITION_WORKERS', 'TRACKER_ENABLED', 'FRAME_CACHE_ENABLED',
+    'ENCODING_CACHE_MAX_MB'
+)
+
+
+def summarize(durations):
+    """
+    Statistik durasi (detik) dalam ms
+
+    Returns:
+        dict: n, p50_ms, p95_ms, p99_ms, mean_ms, min_ms, max_ms
+    """
+    values = np.asarray(durations, dtype=np.float64) * 1000.0
+    if len(values) == 0:
+        return {'n': 0}
+    return {
+        'n': int(len(values)),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'mean_ms': round(float(values.mean()), 3),
+        'min_ms': round(float(values.min()), 3),
+        'max_ms': round(float(values.max()), 3)
+    }
+
+
+def result(name, params, durations, **extra):
+    """Satu baris hasil: stage + parameter + statistik (+ metrik tambahan)"""
+    entry = {'name': name, 'params': params, 'stats': summarize(durations)}
+    if extra:
+        entry['extra'] = extra
+    return entry
+
+
+def _git(*args):
+    try:
+        return subprocess.run(('git',) + args, capture_output=True, text=True, timeout=10,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def collect_meta(app, args):
+    """Informasi commit, environment dan config untuk file hasil"""
+    import cv2
+
+    return {
+        'created_at': datetime.utcnow().isoformat(),
+        'git_commit': _git('rev-parse', 'HEAD') or None,
+        'git_dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {key: app.config.get(key) for key in CONFIG_KEYS if key in app.config},
+        'args': args
+    }
+
+
+def save(path, meta, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, default=str)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def result_key(entry):
+    return entry['name'], json.dumps(entry['params'], sort_keys=True)
+
+
+def compare(baseline, candidate, threshold=0.10, metric='p50_ms', min_ms=0.05):
+    """
+    Bandingkan dua file hasil per (stage, parameter)
+
+    Args:
+        baseline, candidate: dict hasil load()
+        threshold: kenaikan relatif yang dianggap regresi (0.10 = 10%)
+        metric: statistik yang dibandingkan
+        min_ms: stage yang lebih cepat dari ini di kedua run dianggap noise (tidak pernah regresi)
+
+    Returns:
+        list of dict: name, params, baseline, candidate, change (relatif), status
+        (regression, improvement, same, new, removed)
+    """
+    before = {result_key(entry): entry for entry in baseline['results']}
+    after = {result_key(entry): entry for entry in candidate['results']}
+
+    rows = []
+    for key in list(before) + [key for key in after if key not in before]:
+        old, new = before.get(key), after.get(key)
+        row = {'name': key[0], 'params': (old or new)['params'],
+               'baseline': old['stats'].get(metric) if old else None,
+               'candidate': new['stats'].get(metric) if new else None,
+               'change': None}
+
+        if old is None:
+            row['status'] = 'new'
+        elif new is None:
+            row['status'] = 'removed'
+        elif not row['baseline'] or row['candidate'] is None:
+            row['status'] = 'same'
+        else:
+            row['change'] = (row['candidate'] - row['baseline']) / row['baseline']
+            if max(row['baseline'], row['candidate']) < min_ms:
+                row['status'] = 'same'
+            elif row['change'] > threshold:
+                row['status'] = 'regression'
+            elif row['change'] < -threshold:
+                row['status'] = 'improvement'
+            else:
+                row['status'] = 'same'
+        rows.append(row)
+
+    return rows
@@ -0,0 +1,174 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.services.encoding_cache import ClassEncodings
+from app.services.face_recognition_service import FaceRecognitionService
+from app.services.frame_decoder import decode_frame, parse_face_hints, full_resolution_source
+from benchmarks.fixtures import bench_lecturer, seed_class, set_encodings
+from benchmarks.results import result
+from benchmarks.stages import _timed
+from benchmarks.synthetic import render_frame, encode_jpeg, synthetic_roster
+import numpy as np
+import base64
+import json
+import time
+
+CAPTURE_URL = '/api/attendance/capture'
+
+# Config yang dipakai route benchmark: box ground truth dipercaya apa adanya
+# (wajah sintetis belum tentu lolos detector) dan setiap request diproses penuh
+ROUTE_OVERRIDES = {
+    'FACE_HINT_VALIDATION': 'none',
+    'TRACKER_ENABLED': False,
+    'FRAME_CACHE_ENABLED': False,
+    'SESSION_COOKIE_SECURE': False
+}
+
+
+def _client(app, user_id):
+    """Test client yang sudah login (session Flask-Login diisi langsung)"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def _face_boxes(boxes):
+    # Format face-api.js seperti yang dikirim halaman capture
+    return [{'x': left, 'y': top, 'width': right - left, 'height': bottom - top}
+            for top, right, bottom, left in boxes]
+
+
+def capture_request(session_id, jpeg, boxes, width, height, payload='raw'):
+    """
+    Argumen client.post untuk satu frame multi_face
+
+    Args:
+        payload: 'raw' (body image/jpeg, field di query string) atau 'json' (base64, format lama)
+    """
+    fields = {
+        'session_id': session_id,
+        'multi_face': 'true',
+        'face_boxes': json.dumps(_face_boxes(boxes)),
+        'frame_width': width,
+        'frame_height': height
+    }
+    if payload == 'json':
+        fields['image_data'] = 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')
+        return {'json': fields}
+    return {'query_string': fields, 'data': jpeg, 'content_type': 'image/jpeg'}
+
+
+def _plant_faces(class_id, jpeg, boxes, width, height):
+    """
+    Set encoding mahasiswa pertama kelas ke encoding wajah di frame (dihitung lewat
+    jalur yang sama dengan route) sehingga request menghasilkan match
+    """
+    fields = {'face_boxes': _face_boxes(boxes), 'frame_width': width, 'frame_height': height}
+    frame = decode_frame(jpeg, fields, current_app.config.get('FRAME_RESIZE_SCALE', 0.25))
+    _, encodings = FaceRecognitionService.encode_faces(
+        frame.image, frame.resize_scale, face_hints=parse_face_hints(frame),
+        full_image=full_resolution_source(frame)
+    )
+    if len(encodings):
+        set_encodings(class_id, list(encodings))
+    return len(encodings)
+
+
+def _send(client, request_kwargs):
+    start = time.perf_counter()
+    response = client.post(CAPTURE_URL, **request_kwargs)
+    return time.perf_counter() - start, response.status_code, response.get_json(silent=True) or {}
+
+
+def _run_sequential(client, request_kwargs, repeat):
+    _send(client, request_kwargs)  # warm-up: state sesi dan encoding_cache dimuat, kehadiran pertama dicatat
+
+    durations, stages, responses = [], {}, []
+    for _ in range(repeat):
+        duration, status, body = _send(client, request_kwargs)
+        durations.append(duration)
+        responses.append((status, body))
+        for name, duration_ms in body.get('timings', {}).items():
+            stages.setdefault(name, []).append(duration_ms)
+    return durations, stages, responses
+
+
+def _run_concurrent(clients, request_kwargs, repeat):
+    def worker(client):
+        return [_send(client, request_kwargs) for _ in range(repeat)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        batches = list(executor.map(worker, clients))
+    elapsed = time.perf_counter() - start
+
+    sent = [item for batch in batches for item in batch]
+    durations = [duration for duration, _, _ in sent]
+    responses = [(status, body) for _, status, body in sent]
+    return durations, responses, elapsed
+
+
+def route_benchmark(app, roster_size, resolutions, faces_list, concurrency_list, repeat,
+                    payload='raw', template=None, seed=0):
+    """
+    POST /api/attendance/capture lewat test client untuk satu ukuran roster
+
+    Request diulang ke sesi yang sama: request warm-up mencatat kehadiran,
+    request yang diukur menemukan mahasiswa yang sama sebagai duplikat (kondisi
+    steady state saat kelas sudah berjalan).
+
+    Returns:
+        list of result
+    """
+    results = []
+
+    with app.app_context():
+        from app.services.attendance_service import AttendanceService
+
+        lecturer_id = bench_lecturer().id
+        class_id = seed_class(synthetic_roster(roster_size, seed), lecturer_id, f'R{roster_size}-{seed}')
+
+        reduction = current_app.config.get('FACE_GALLERY_MATCH', 'min')
+        durations, _ = _timed(lambda: ClassEncodings.build(class_id, reduction), repeat)
+        results.append(result('cache_build', {'roster': roster_size}, durations))
+
+        for width, height in resolutions:
+            for faces in faces_list:
+                image, boxes = render_frame(width, height, faces, seed, template)
+                jpeg = encode_jpeg(image)
+                planted = _plant_faces(class_id, jpeg, boxes, width, height)
+                session_id = AttendanceService.start_session(
+                    class_id, f'Benchmark {width}x{height} {faces}', lecturer_id
+                ).id
+                request_kwargs = capture_request(session_id, jpeg, boxes, width, height, payload)
+
+                for concurrency in concurrency_list:
+                    params = {'roster': roster_size, 'resolution': f'{width}x{height}', 'faces': faces,
+                              'concurrency': concurrency, 'payload': payload}
+
+                    if concurrency == 1:
+                        durations, stages, responses = _run_sequential(
+                            _client(app, lecturer_id), request_kwargs, repeat
+                        )
+                        elapsed = sum(durations)
+                        extra = {'stages_p50_ms': {name: round(float(np.percentile(values, 50)), 3)
+                                                   for name, values in stages.items()}}
+                    else:
+                        clients = [_client(app, lecturer_id) for _ in range(concurrency)]
+                        durations, responses, elapsed = _run_concurrent(clients, request_kwargs, repeat)
+                        extra = {}
+
+                    last_body = responses[-1][1] if responses else {}
+                    results.append(result(
+                        'route', params, durations,
+                        throughput_rps=round(len(durations) / elapsed, 2) if elapsed else None,
+                        errors=sum(1 for status, _ in responses if status != 200),
+                        planted=planted,
+                        matched=sum(1 for face in last_body.get('faces', []) if face.get('matched')),
+                        **extra
+                    ))
+
+                AttendanceService.end_session(session_id)
+
+    return results
@@ -0,0 +1,145 @@
+from app.services.encoding_cache import ClassEncodings, CachedStudent
+from app.services.face_detectors import detect_faces
+from app.services.face_geometry import scale_box
+from app.services.face_recognition_service import FaceRecognitionService
+from app.services.frame_decoder import open_image
+from app.services.timing import StageTimer
+from benchmarks.results import result
+from benchmarks.synthetic import render_frame, encode_jpeg, synthetic_roster, roster_queries
+import numpy as np
+import cv2
+import time
+
+
+def _timed(fn, repeat):
+    """Jalankan fn sekali (warm-up) lalu `repeat` kali, return (durasi detik, hasil terakhir)"""
+    value = fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        durations.append(time.perf_counter() - start)
+    return durations, value
+
+
+def frame_stages(width, height, faces, resize_scale, repeat, template=None, seed=0):
+    """
+    Decode, resize, detect dan encode satu frame sintetis
+
+    Encode memakai box ground truth (seperti face_boxes dari client) supaya
+    waktu encode tidak bergantung pada berhasil tidaknya detector menemukan
+    wajah sintetis.
+
+    Returns:
+        list of result
+    """
+    image, boxes = render_frame(width, height, faces, seed, template)
+    jpeg = encode_jpeg(image)
+    params = {'resolution': f'{width}x{height}', 'faces': faces, 'scale': resize_scale}
+    results = []
+
+    def decode():
+        return open_image(jpeg, resize_scale)
+
+    durations, (decoded, remaining_scale, _) = _timed(decode, repeat)
+    results.append(result('decode', params, durations, bytes=len(jpeg), decoded_size=list(decoded.size)))
+
+    decoded_array = np.asarray(decoded)
+    small_size = (max(1, int(decoded_array.shape[1] * remaining_scale)),
+                  max(1, int(decoded_array.shape[0] * remaining_scale)))
+
+    def resize():
+        if remaining_scale == 1.0:
+            return decoded_array
+        return cv2.resize(decoded_array, small_size)
+
+    durations, small = _timed(resize, repeat)
+    results.append(result('resize', params, durations))
+
+    detector, detector_params = FaceRecognitionService._detector_options()
+    durations, locations = _timed(lambda: detect_faces(small, detector, detector_params), repeat)
+    results.append(result('detect', dict(params, detector=detector), durations, found=len(locations)))
+
+    # Box ground truth di koordinat image hasil decode (tempat encode dijalankan di route)
+    decoded_scale = decoded_array.shape[1] / float(width)
+    hints = [scale_box(box, decoded_scale) for box in boxes]
+    options = FaceRecognitionService._encode_options(resize_scale)
+    durations, encodings = _timed(
+        lambda: FaceRecognitionService._encode_locations(decoded_array, hints, options, StageTimer()), repeat
+    )
+    results.append(result('encode', dict(params, mode=options['mode'], model=options['model']),
+                          durations, encodings=len(encodings)))
+
+    return results
+
+
+def match_stages(roster_size, faces_list, repeat, seed=0):
+    """
+    Match wajah ke roster sintetis: matrix (match_encodings) dan jalur legacy (compare_faces)
+
+    Returns:
+        list of result
+    """
+    roster = synthetic_roster(roster_size, seed)
+    students = [CachedStudent(i, f'BENCH-{i:06d}', f'Mahasiswa {i}') for i in range(roster_size)]
+
+    def build():
+        return ClassEncodings(0, np.arange(roster_size, dtype=np.int64), roster, students)
+
+    durations, class_encodings = _timed(build, repeat)
+    results = [result('match_prepare', {'roster': roster_size}, durations)]
+
+    # Jalur lama: list (Student, encoding) dan face_distance per wajah
+    known_students = list(zip(students, roster))
+
+    for faces in faces_list:
+        queries, sources = roster_queries(roster, faces, seed)
+        params = {'roster': roster_size, 'faces': faces}
+
+        durations, matches = _timed(lambda: FaceRecognitionService.match_encodings(queries, class_encodings),
+                                    repeat)
+        correct = sum(1 for (student, _), source in zip(matches, sources)
+                      if student is not None and student.id == source)
+        results.append(result('match', params, durations, correct=correct))
+
+        durations, _ = _timed(
+            lambda: [FaceRecognitionService.compare_faces(query, known_students) for query in queries], repeat
+        )
+        results.append(result('match_legacy', params, durations))
+
+    return results
+
+
+def db_write_stages(class_id, student_ids, lecturer_id, faces, repeat):
+    """
+    Catat kehadiran `faces` mahasiswa: satu transaksi bulk vs satu commit per mahasiswa
+
+    Setiap pengulangan memakai sesi baru supaya record selalu baru (bukan duplikat).
+
+    Returns:
+        list of result
+    """
+    from app.services.attendance_service import AttendanceService
+
+    matches = [(student_id, 0.9) for student_id in student_ids[:faces]]
+    params = {'faces': len(matches)}
+    results = []
+
+    for name, write in (
+        ('db_write_bulk', lambda session_id: AttendanceService.record_attendance_bulk(session_id, matches)),
+        ('db_write_single', lambda session_id: [
+            AttendanceService.record_attendance(student_id, session_id, confidence)
+            for student_id, confidence in matches
+        ])
+    ):
+        durations = []
+        for i in range(repeat + 1):
+            session = AttendanceService.start_session(class_id, f'Benchmark {name} {i}', lecturer_id)
+            start = time.perf_counter()
+            write(session.id)
+            if i:
+                durations.append(time.perf_counter() - start)
+            AttendanceService.end_session(session.id)
+        results.append(result(name, params, durations))
+
+    return results
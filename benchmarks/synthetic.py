@@ -0,0 +1,163 @@
+from PIL import Image
+import numpy as np
+import cv2
+import io
+
+# Std per dimensi encoding sintetis: jarak antar orang ~16 * std = ~0.9,
+# mirip jarak encoding dlib untuk orang berbeda
+ENCODING_STD = 0.056
+
+# Std noise query: jarak ke encoding asli ~0.35 (foto lain dari orang yang sama)
+QUERY_NOISE_STD = 0.031
+
+# Warna kulit / rambut wajah sintetis (RGB)
+_SKIN = (224, 172, 130)
+_HAIR = (60, 40, 30)
+
+
+def synthetic_roster(size, seed=0):
+    """
+    Encoding sintetis untuk roster `size` mahasiswa
+
+    Returns:
+        array size x 128 float32
+    """
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, ENCODING_STD, size=(size, 128)).astype(np.float32)
+
+
+def roster_queries(roster, count, seed=0):
+    """
+    Encoding query: encoding roster yang diberi noise
+
+    Returns:
+        tuple: (array count x 128, index roster sumber per query)
+    """
+    rng = np.random.default_rng(seed + 1)
+    sources = rng.integers(0, len(roster), size=count)
+    queries = roster[sources] + rng.normal(0.0, QUERY_NOISE_STD, size=(count, 128)).astype(np.float32)
+    return queries, sources
+
+
+def parse_resolution(value):
+    """'1280x720' -> (1280, 720)"""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def face_boxes(width, height, faces):
+    """
+    Posisi wajah dalam grid (kolom x baris) di tengah frame
+
+    Tinggi wajah ~25% tinggi frame untuk satu wajah, mengecil untuk banyak wajah
+    tetapi tetap di atas FACE_MIN_SIZE_RATIO default.
+
+    Returns:
+        list of (top, right, bottom, left)
+    """
+    columns = int(np.ceil(np.sqrt(faces * width / float(height))))
+    rows = int(np.ceil(faces / float(columns)))
+    cell_width, cell_height = width / float(columns), height / float(rows)
+    size = int(min(cell_height * 0.6, cell_width * 0.6, height * 0.25))
+
+    boxes = []
+    for i in range(faces):
+        cx = int((i % columns + 0.5) * cell_width)
+        cy = int((i // columns + 0.5) * cell_height)
+        half_width = int(size * 0.4)
+        boxes.append((cy - size // 2, cx + half_width, cy + size // 2, cx - half_width))
+    return boxes
+
+
+def _background(width, height, rng):
+    # Gradient halus + noise sensor supaya blur/brightness gate lolos dan dHash antar frame berbeda
+    base = rng.integers(70, 170, size=(3, 3, 3)).astype(np.uint8)
+    image = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0.0, 6.0, size=image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def _draw_face(image, box):
+    top, right, bottom, left = box
+    height, width = bottom - top, right - left
+    cx, cy = (left + right) // 2, (top + bottom) // 2
+
+    cv2.ellipse(image, (cx, top + height // 5), (width // 2, height // 4), 0, 180, 360, _HAIR, -1)
+    cv2.ellipse(image, (cx, cy), (width // 2, height // 2), 0, 0, 360, _SKIN, -1)
+    eye_y = top + int(height * 0.4)
+    eye_radius = max(1, width // 12)
+    for eye_x in (cx - width // 5, cx + width // 5):
+        cv2.circle(image, (eye_x, eye_y), eye_radius, (255, 255, 255), -1)
+        cv2.circle(image, (eye_x, eye_y), max(1, eye_radius // 2), (40, 30, 20), -1)
+    cv2.line(image, (cx, eye_y), (cx - width // 16, top + int(height * 0.62)), (180, 120, 90), max(1, width // 40))
+    cv2.ellipse(image, (cx, top + int(height * 0.75)), (width // 6, height // 16), 0, 0, 180,
+                (150, 60, 60), max(1, width // 30))
+
+
+class FaceTemplate:
+    """Foto wajah asli (crop ber-padding) yang ditempel ke frame sebagai pengganti wajah sintetis"""
+
+    def __init__(self, crop, box):
+        self.crop = crop
+        self.box = box
+
+    @classmethod
+    def load(cls, path, padding=0.5):
+        """Load foto dan crop di sekitar wajah terbesar (detector HOG)"""
+        from app.services.face_detectors import detect_faces
+
+        image = np.asarray(Image.open(path).convert('RGB'))
+        locations = detect_faces(image, 'hog')
+        if not locations:
+            raise ValueError(f'Tidak ada wajah terdeteksi di {path}')
+
+        top, right, bottom, left = max(locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+        pad_y, pad_x = int((bottom - top) * padding), int((right - left) * padding)
+        y0, x0 = max(0, top - pad_y), max(0, left - pad_x)
+        y1, x1 = min(image.shape[0], bottom + pad_y), min(image.shape[1], right + pad_x)
+        return cls(np.ascontiguousarray(image[y0:y1, x0:x1]), (top - y0, right - x0, bottom - y0, left - x0))
+
+    def paste(self, image, box):
+        """Tempel crop sehingga box wajah template jatuh di box target (dipotong di tepi frame)"""
+        top, right, bottom, left = box
+        t_top, t_right, t_bottom, t_left = self.box
+        scale = (bottom - top) / float(t_bottom - t_top)
+
+        resized = cv2.resize(self.crop, (max(1, int(self.crop.shape[1] * scale)),
+                                         max(1, int(self.crop.shape[0] * scale))))
+        y0, x0 = top - int(t_top * scale), left - int(t_left * scale)
+        height, width = image.shape[:2]
+        sy0, sx0 = max(0, -y0), max(0, -x0)
+        dy0, dx0 = max(0, y0), max(0, x0)
+        dy1 = min(height, y0 + resized.shape[0])
+        dx1 = min(width, x0 + resized.shape[1])
+        if dy1 > dy0 and dx1 > dx0:
+            image[dy0:dy1, dx0:dx1] = resized[sy0:sy0 + dy1 - dy0, sx0:sx0 + dx1 - dx0]
+
+
+def render_frame(width, height, faces, seed=0, template=None):
+    """
+    Render frame RGB dengan `faces` wajah di posisi grid
+
+    Tanpa template wajah digambar sintetis (detector asli mungkin tidak
+    mendeteksinya; route benchmark memakai box sebagai face_boxes client).
+
+    Returns:
+        tuple: (array height x width x 3 uint8, list box (top, right, bottom, left))
+    """
+    rng = np.random.default_rng(seed)
+    image = _background(width, height, rng)
+    boxes = face_boxes(width, height, faces)
+    for box in boxes:
+        if template is not None:
+            template.paste(image, box)
+        else:
+            _draw_face(image, box)
+    return image, boxes
+
+
+def encode_jpeg(image, quality=85):
+    """Encode array RGB ke JPEG (seperti canvas.toBlob di browser)"""
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
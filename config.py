@@ -19,6 +19,9 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
+    # Bootstrap database di create_app (tabel + admin default); False = jalankan `flask init-db`
+    AUTO_INIT_DB = os.getenv('AUTO_INIT_DB', 'True').lower() == 'true'
+
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=int(os.getenv('SESSION_TIMEOUT_MINUTES', 60)))
     SESSION_COOKIE_SECURE = True
@@ -35,6 +38,114 @@ class Config:
     MIN_CONFIDENCE_SCORE = float(os.getenv('MIN_CONFIDENCE_SCORE', 0.4))
     CAPTURE_INTERVAL_MS = int(os.getenv('CAPTURE_INTERVAL_MS', 500))
     FRAME_RESIZE_SCALE = float(os.getenv('FRAME_RESIZE_SCALE', 0.25))
+    # Detection di frame hasil reduced decoding, encoding di image asli (sebanding dengan foto pendaftaran)
+    FRAME_ENCODE_FULL_RESOLUTION = os.getenv('FRAME_ENCODE_FULL_RESOLUTION', 'False').lower() == 'true'
+    FACE_ENCODE_MODE = os.getenv('FACE_ENCODE_MODE', 'crop')  # crop atau full
+    FACE_CROP_PADDING = float(os.getenv('FACE_CROP_PADDING', 0.5))  # fraksi ukuran box
+    FACE_DETECTOR_CAPTURE = os.getenv('FACE_DETECTOR_CAPTURE', 'hog')  # hog, haar, yunet atau cnn (capture live)
+    FACE_DETECTOR_ENROLL = os.getenv('FACE_DETECTOR_ENROLL', 'hog')  # detector untuk foto pendaftaran
+    FACE_DETECTOR_UPSAMPLE = int(os.getenv('FACE_DETECTOR_UPSAMPLE', 1))  # hog/cnn
+    FACE_DETECTOR_YUNET_MODEL = os.getenv('FACE_DETECTOR_YUNET_MODEL', '')  # path face_detection_yunet_*.onnx
+    FACE_DETECTOR_MIN_SCORE = float(os.getenv('FACE_DETECTOR_MIN_SCORE', 0.8))  # yunet
+    FACE_ENCODING_MODEL = os.getenv('FACE_ENCODING_MODEL', 'small')  # landmark model: small (5 titik) atau large (68 titik)
+    FACE_ENCODING_JITTERS = int(os.getenv('FACE_ENCODING_JITTERS', 1))  # re-sample per wajah saat encoding
+    FACE_HINT_VALIDATION = os.getenv('FACE_HINT_VALIDATION', 'verify')  # verify atau none
+    FACE_HINT_MIN_IOU = float(os.getenv('FACE_HINT_MIN_IOU', 0.3))
+
+    # Quality gate frame capture (sebelum detection/encoding)
+    FRAME_QUALITY_ENABLED = os.getenv('FRAME_QUALITY_ENABLED', 'True').lower() == 'true'
+    FRAME_MIN_BLUR = float(os.getenv('FRAME_MIN_BLUR', 20))  # variance Laplacian thumbnail 160px
+    FRAME_MIN_BRIGHTNESS = float(os.getenv('FRAME_MIN_BRIGHTNESS', 40))
+    FRAME_MAX_BRIGHTNESS = float(os.getenv('FRAME_MAX_BRIGHTNESS', 220))
+    FRAME_MAX_CLIPPED = float(os.getenv('FRAME_MAX_CLIPPED', 0.6))  # fraksi pixel hitam/putih
+    FACE_MIN_SIZE_RATIO = float(os.getenv('FACE_MIN_SIZE_RATIO', 0.08))  # tinggi wajah / tinggi frame
+
+    # Gallery template per mahasiswa (encoding utama + tambahan dari upload/capture)
+    FACE_GALLERY_SIZE = int(os.getenv('FACE_GALLERY_SIZE', 5))
+    FACE_GALLERY_MATCH = os.getenv('FACE_GALLERY_MATCH', 'min')  # min atau centroid
+    FACE_GALLERY_HARVEST_CONFIDENCE = float(os.getenv('FACE_GALLERY_HARVEST_CONFIDENCE', 0.55))
+    FACE_GALLERY_MIN_DISTANCE = float(os.getenv('FACE_GALLERY_MIN_DISTANCE', 0.15))  # template lebih dekat dianggap duplikat
+
+    # Face tracker per sesi (identitas dibawa antar frame, encode hanya untuk wajah baru)
+    TRACKER_ENABLED = os.getenv('TRACKER_ENABLED', 'True').lower() == 'true'
+    TRACKER_IOU_THRESHOLD = float(os.getenv('TRACKER_IOU_THRESHOLD', 0.3))
+    TRACKER_MAX_AGE_SECONDS = float(os.getenv('TRACKER_MAX_AGE_SECONDS', 2.0))  # track hilang setelah tidak terlihat
+    TRACKER_REVERIFY_FRAMES = int(os.getenv('TRACKER_REVERIFY_FRAMES', 10))  # re-encode track setiap N frame
+
+    # State sesi aktif in-memory (mahasiswa hadir), disinkronkan ke database setiap N detik
+    SESSION_STATE_REFRESH_SECONDS = float(os.getenv('SESSION_STATE_REFRESH_SECONDS', 30))
+
+    # Cache hasil recognition per sesi untuk frame yang hampir identik (dHash 256 bit)
+    FRAME_CACHE_ENABLED = os.getenv('FRAME_CACHE_ENABLED', 'True').lower() == 'true'
+    FRAME_CACHE_TTL_SECONDS = float(os.getenv('FRAME_CACHE_TTL_SECONDS', 3.0))
+    FRAME_CACHE_MAX_DISTANCE = int(os.getenv('FRAME_CACHE_MAX_DISTANCE', 8))  # bit berbeda (Hamming) dari 256
+    FRAME_CACHE_SIZE = int(os.getenv('FRAME_CACHE_SIZE', 8))  # frame yang diingat per sesi
+
+    # Live status sesi (Server-Sent Events), event dari worker lain di-poll dari attendance_records
+    SESSION_EVENTS_POLL_SECONDS = float(os.getenv('SESSION_EVENTS_POLL_SECONDS', 1.0))
+    SESSION_EVENTS_KEEPALIVE_SECONDS = float(os.getenv('SESSION_EVENTS_KEEPALIVE_SECONDS', 15))
+    SESSION_EVENTS_QUEUE_SIZE = int(os.getenv('SESSION_EVENTS_QUEUE_SIZE', 256))  # event tertunda per observer
+    SESSION_EVENTS_MAX_STREAMS = int(os.getenv('SESSION_EVENTS_MAX_STREAMS', 8))  # stream terbuka per worker, penuh = 503 (page polling)
+
+    # Job capture async (/capture dengan async=true), thread pool per worker + tabel capture_jobs
+    CAPTURE_JOB_WORKERS = int(os.getenv('CAPTURE_JOB_WORKERS', 2))
+    CAPTURE_JOB_QUEUE_SIZE = int(os.getenv('CAPTURE_JOB_QUEUE_SIZE', 16))  # job menunggu per worker, penuh = 503
+    CAPTURE_JOB_TTL_SECONDS = int(os.getenv('CAPTURE_JOB_TTL_SECONDS', 600))  # hasil disimpan selama ini
+
+    # Rekaman frame /capture per sesi untuk load replay (python -m benchmarks replay)
+    CAPTURE_RECORDING_ENABLED = os.getenv('CAPTURE_RECORDING_ENABLED', 'False').lower() == 'true'
+    CAPTURE_RECORDING_ALL = os.getenv('CAPTURE_RECORDING_ALL', 'False').lower() == 'true'  # False = hanya sesi 'record': true
+    CAPTURE_RECORDING_DIR = os.getenv('CAPTURE_RECORDING_DIR', 'recordings')
+    CAPTURE_RECORDING_MAX_MB = float(os.getenv('CAPTURE_RECORDING_MAX_MB', 500))  # per sesi, rekaman berhenti jika penuh
+
+    # Stream capture WebSocket per sesi (butuh flask-sock)
+    CAPTURE_STREAM_WINDOW = int(os.getenv('CAPTURE_STREAM_WINDOW', 2))  # frame yang boleh menunggu diproses
+    CAPTURE_STREAM_MAX_AGE_SECONDS = float(os.getenv('CAPTURE_STREAM_MAX_AGE_SECONDS', 1.0))  # frame lebih tua dilewati
+    CAPTURE_STREAM_MAX_STREAMS = int(os.getenv('CAPTURE_STREAM_MAX_STREAMS', 4))  # stream terbuka per worker, penuh = error 'busy'
+
+    # Index ANN semua mahasiswa untuk mode kiosk (/api/attendance/identify)
+    VECTOR_INDEX_LISTS = int(os.getenv('VECTOR_INDEX_LISTS', 0))  # 0 = otomatis (~2 * sqrt(N))
+    VECTOR_INDEX_PROBES = int(os.getenv('VECTOR_INDEX_PROBES', 16))  # partisi yang diperiksa per query
+    VECTOR_INDEX_PCA_DIM = int(os.getenv('VECTOR_INDEX_PCA_DIM', 32))  # 0 = tanpa PCA
+    VECTOR_INDEX_SYNC_SECONDS = float(os.getenv('VECTOR_INDEX_SYNC_SECONDS', 30))
+
+    # Encoding cache (matrix encoding per kelas di memory)
+    ENCODING_CACHE_MAX_MB = float(os.getenv('ENCODING_CACHE_MAX_MB', 64))
+    ENCODING_CACHE_TTL_SECONDS = int(os.getenv('ENCODING_CACHE_TTL_SECONDS', 60))
+
+    # Cache hasil /api/face/detect dan /api/face/encode per isi image (LRU + tier disk opsional)
+    IMAGE_CACHE_ENABLED = os.getenv('IMAGE_CACHE_ENABLED', 'True').lower() == 'true'
+    IMAGE_CACHE_SIZE = int(os.getenv('IMAGE_CACHE_SIZE', 256))  # jumlah image di memory per worker
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', '')  # kosong = tanpa tier disk
+    IMAGE_CACHE_DISK_MAX_ENTRIES = int(os.getenv('IMAGE_CACHE_DISK_MAX_ENTRIES', 10000))
+
+    # Recognition engine (pool worker process untuk detect/encode)
+    RECOGNITION_ENGINE_ENABLED = os.getenv('RECOGNITION_ENGINE_ENABLED', 'False').lower() == 'true'
+    RECOGNITION_WORKERS = int(os.getenv('RECOGNITION_WORKERS', 0))  # 0 = CPU core / WEB_CONCURRENCY
+    RECOGNITION_QUEUE_SIZE = int(os.getenv('RECOGNITION_QUEUE_SIZE', 0))  # 0 = 2x jumlah worker
+    RECOGNITION_RETRY_AFTER_SECONDS = int(os.getenv('RECOGNITION_RETRY_AFTER_SECONDS', 1))
+    RECOGNITION_TASK_TIMEOUT_SECONDS = int(os.getenv('RECOGNITION_TASK_TIMEOUT_SECONDS', 30))
+    RECOGNITION_THREADS_PER_WORKER = int(os.getenv('RECOGNITION_THREADS_PER_WORKER', 1))
+
+    # Metrics (/metrics Prometheus + header Server-Timing), snapshot per worker di METRICS_DIR
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR = os.getenv('METRICS_DIR', '')  # kosong = <tempdir>/fr-presention-metrics
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5.0))
+    METRICS_STALE_SECONDS = float(os.getenv('METRICS_STALE_SECONDS', 86400))  # 0 = snapshot basi tidak dihapus
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer token untuk scraper; tanpa token hanya admin yang login
+
+    # Flight recorder request lambat (span tree + SQL per request, disimpan jika > threshold)
+    FLIGHT_RECORDER_ENABLED = os.getenv('FLIGHT_RECORDER_ENABLED', 'False').lower() == 'true'
+    FLIGHT_RECORDER_THRESHOLD_MS = float(os.getenv('FLIGHT_RECORDER_THRESHOLD_MS', 1000))
+    FLIGHT_RECORDER_DEBUG_HEADER = os.getenv('FLIGHT_RECORDER_DEBUG_HEADER', 'X-Debug-Trace')  # paksa simpan
+    FLIGHT_RECORDER_FILE = os.getenv('FLIGHT_RECORDER_FILE', 'logs/slow_requests.jsonl')
+    FLIGHT_RECORDER_MAX_MB = float(os.getenv('FLIGHT_RECORDER_MAX_MB', 10))  # ukuran file sebelum rotate
+    FLIGHT_RECORDER_BACKUPS = int(os.getenv('FLIGHT_RECORDER_BACKUPS', 5))
+    FLIGHT_RECORDER_MAX_SPANS = int(os.getenv('FLIGHT_RECORDER_MAX_SPANS', 500))
+    FLIGHT_RECORDER_PROFILE = os.getenv('FLIGHT_RECORDER_PROFILE', 'False').lower() == 'true'
+    FLIGHT_RECORDER_PROFILE_INTERVAL_MS = float(os.getenv('FLIGHT_RECORDER_PROFILE_INTERVAL_MS', 5))
+    FLIGHT_RECORDER_PROFILE_DIR = os.getenv('FLIGHT_RECORDER_PROFILE_DIR', 'logs/profiles')
+    FLIGHT_RECORDER_PROFILE_MAX_FILES = int(os.getenv('FLIGHT_RECORDER_PROFILE_MAX_FILES', 200))
 
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
@@ -64,6 +175,7 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     TESTING = False
+    AUTO_INIT_DB = os.getenv('AUTO_INIT_DB', 'False').lower() == 'true'
     SESSION_COOKIE_SECURE = True
 
 
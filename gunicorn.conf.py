@@ -0,0 +1,64 @@
+"""
+Konfigurasi gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+
+RECOGNITION_PRELOAD=true memuat app sebelum fork (preload_app) dan model
+sebelum request pertama:
+
+- Tanpa recognition engine: model dlib dimuat sekali di master, worker
+  berbagi page model copy-on-write.
+- Dengan RECOGNITION_ENGINE_ENABLED: forkserver engine setiap worker memuat
+  model sekali, worker engine di-fork darinya (copy-on-write); pool di-start
+  dan di-warm-up sebelum worker menerima request.
+
+Tanpa RECOGNITION_PRELOAD worker start ringan: dlib/OpenCV baru di-import
+saat recognition pertama, sehingga process report/admin tidak memuatnya sama sekali.
+Database di-bootstrap terpisah dengan `flask init-db`.
+
+Worker gthread: stream SSE live status dan WebSocket capture masing-masing
+menahan satu thread selama terbuka (bukan satu worker), dan worker tetap
+heartbeat ke master sehingga stream yang lebih lama dari timeout tidak di-kill.
+Jumlah stream per worker dibatasi SESSION_EVENTS_MAX_STREAMS +
+CAPTURE_STREAM_MAX_STREAMS; jaga totalnya di bawah GUNICORN_THREADS supaya
+request capture selalu mendapat thread.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+accesslog = '-'
+errorlog = '-'
+
+preload_app = os.getenv('RECOGNITION_PRELOAD', 'False').lower() == 'true'
+
+
+def when_ready(server):
+    """Master: app sudah di-load (preload_app), worker belum di-fork"""
+    if preload_app:
+        from app.services.model_preload import preload_models
+        preload_models(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    """Worker baru: koneksi pool database warisan master tidak dipakai bersama"""
+    if preload_app:
+        from app import db
+        with server.app.wsgi().app_context():
+            db.engine.dispose()
+
+
+def child_exit(server, worker):
+    """Master: snapshot metrics worker yang keluar digabung ke retired.json"""
+    from config import Config
+    if Config.METRICS_ENABLED:
+        from app.services.metrics import retire_worker, default_directory
+        retire_worker(Config.METRICS_DIR or default_directory(), worker.pid)
+
+
+def post_worker_init(worker):
+    """Worker siap: pool recognition engine di-start sebelum request pertama"""
+    if preload_app:
+        from app.services.recognition_engine import recognition_engine
+        recognition_engine.start()
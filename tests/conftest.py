@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.services.encoding_cache import encoding_cache
+
+
+@pytest.fixture
+def app():
+    """Aplikasi testing dengan database sqlite in-memory"""
+    app = create_app('testing')
+    # Singleton service in-process: entry dari test lain (ID kelas sama) tidak boleh terbawa
+    encoding_cache.clear()
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    """Test client yang sudah login sebagai admin default"""
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+
+@pytest.fixture
+def student(app):
+    """Satu mahasiswa dengan encoding di kelas milik admin"""
+    from app.models.class_model import Class
+    from app.models.student import Student
+    from app.models.user import User
+
+    admin = User.query.filter_by(username='admin').first()
+    class_record = Class(name='Kelas A', code='KA1', lecturer_id=admin.id, academic_year='2024/2025', semester=1)
+    db.session.add(class_record)
+    db.session.commit()
+
+    student = Student(student_id='2024001', name='Mahasiswa A', class_id=class_record.id)
+    student.set_face_encoding(np.zeros(128), 'small')
+    db.session.add(student)
+    db.session.commit()
+    return student
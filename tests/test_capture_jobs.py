@@ -0,0 +1,34 @@
+from app.models.user import User
+from app.routes.attendance import _run_capture_job
+from app.services.attendance_service import AttendanceService
+
+
+def _start_session(student):
+    admin = User.query.filter_by(username='admin').first()
+    return AttendanceService.start_session(student.class_id, 'Pertemuan 1', admin.id)
+
+
+def test_job_for_ended_session_is_not_recorded(student):
+    session = _start_session(student)
+    session_id = session.id
+    # Job sudah diantrikan, lalu sesi ditutup sebelum job dijalankan
+    AttendanceService.end_session(session_id)
+
+    payload = _run_capture_job(session_id, b'bukan-image', {})
+    assert payload == {'error': 'Sesi absensi sudah ditutup'}
+
+
+def test_job_for_missing_session(app):
+    assert _run_capture_job(999, b'', {}) == {'error': 'Session tidak ditemukan'}
+
+
+def test_capture_rejects_ended_session(student, admin_client):
+    session = _start_session(student)
+    session_id = session.id
+    AttendanceService.end_session(session_id)
+
+    for extra in ('', '&async=1'):
+        response = admin_client.post(f'/api/attendance/capture?session_id={session_id}{extra}',
+                                     data=b'\xff\xd8frame', content_type='image/jpeg')
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'Sesi absensi sudah ditutup'}
@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+
+from app.services import face_detectors
+
+
+class FakeDetector:
+    """Satu deteksi tepat di wajah berlabel dan satu false positive"""
+
+    def detect(self, image_array):
+        return [(10, 60, 60, 10), (70, 95, 95, 70)]
+
+
+def test_benchmark_detectors_counts_iou_matches(app, tmp_path, monkeypatch):
+    photos = tmp_path / 'photos'
+    photos.mkdir()
+    for name in ('a.jpg', 'b.jpg', 'unlabeled.jpg'):
+        Image.new('RGB', (100, 100)).save(photos / name)
+
+    labels = tmp_path / 'labels.csv'
+    labels.write_text(
+        'filename,x,y,width,height\n'
+        'a.jpg,10,10,50,50\n'
+        'a.jpg,70,10,20,20\n'
+        'b.jpg\n'
+    )
+    monkeypatch.setattr(face_detectors, 'create_detector', lambda name, params: FakeDetector())
+
+    result = app.test_cli_runner().invoke(args=[
+        'benchmark-detectors', str(photos), '--labels', str(labels), '--backends', 'fake'
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert '2 foto, 2 wajah berlabel' in result.output
+    row = result.output.strip().splitlines()[-1].split()
+    # a.jpg: 1 TP, 1 FP, 1 FN; b.jpg (tanpa wajah): 2 FP
+    assert row[0] == 'fake'
+    assert row[3:6] == ['1', '3', '1']
+    assert np.isclose(float(row[6]), 0.25) and np.isclose(float(row[7]), 0.5)
+
+
+def test_benchmark_detectors_requires_labels(app, tmp_path):
+    result = app.test_cli_runner().invoke(args=['benchmark-detectors', str(tmp_path)])
+    assert result.exit_code != 0
+    assert '--labels' in result.output
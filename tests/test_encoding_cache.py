@@ -0,0 +1,94 @@
+import numpy as np
+
+from app.services.encoding_cache import ClassEncodings, EncodingCache
+
+
+def _entry(class_id):
+    matrix = np.zeros((1, 128), dtype=np.float32)
+    return ClassEncodings(class_id, np.array([1]), matrix, [None])
+
+
+def test_hit_after_miss(monkeypatch):
+    cache = EncodingCache(ttl_seconds=0)
+    builds = []
+
+    def build(class_id, reduction='min'):
+        builds.append(class_id)
+        return _entry(class_id)
+
+    monkeypatch.setattr(ClassEncodings, 'build', staticmethod(build))
+    first = cache.get_class(1)
+    assert cache.get_class(1) is first
+    assert builds == [1]
+    assert cache.stats()['hits'] == 1
+
+
+def test_invalidate_during_build_is_not_cached(monkeypatch):
+    cache = EncodingCache(ttl_seconds=0)
+    builds = []
+
+    def build(class_id, reduction='min'):
+        builds.append(class_id)
+        if len(builds) == 1:
+            # Simulasi enroll yang commit ketika query build masih berjalan
+            cache.invalidate(class_id)
+        return _entry(class_id)
+
+    monkeypatch.setattr(ClassEncodings, 'build', staticmethod(build))
+    stale = cache.get_class(1)
+    fresh = cache.get_class(1)
+    assert fresh is not stale
+    assert builds == [1, 1]
+    assert cache.get_class(1) is fresh
+
+
+def test_clear_during_build_is_not_cached(monkeypatch):
+    cache = EncodingCache(ttl_seconds=0)
+    builds = []
+
+    def build(class_id, reduction='min'):
+        builds.append(class_id)
+        if len(builds) == 1:
+            cache.clear()
+        return _entry(class_id)
+
+    monkeypatch.setattr(ClassEncodings, 'build', staticmethod(build))
+    cache.get_class(7)
+    cache.get_class(7)
+    assert builds == [7, 7]
+
+
+def test_harvest_updates_cached_class_in_place(student, monkeypatch):
+    from app.services.encoding_cache import encoding_cache
+    from app.services.face_gallery import FaceGalleryService
+
+    class_id = student.class_id
+    cached = encoding_cache.get_class(class_id)
+    assert cached.template_count == 1
+
+    def fail_build(class_id, reduction='min'):
+        raise AssertionError('kelas tidak boleh di-build ulang karena harvest')
+
+    monkeypatch.setattr(ClassEncodings, 'build', staticmethod(fail_build))
+    assert FaceGalleryService.harvest(student.id, np.ones(128), 0.9)
+
+    updated = encoding_cache.get_class(class_id)
+    assert updated is not cached
+    assert updated.template_count == 2
+    assert np.allclose(updated.distances(np.ones((1, 128))), 0.0, atol=1e-5)
+
+
+def test_reenroll_after_gallery_change_invalidates(student):
+    from app import db
+    from app.services.encoding_cache import encoding_cache
+    from app.services.face_gallery import FaceGalleryService
+
+    encoding_cache.get_class(student.class_id)
+
+    FaceGalleryService.add_template(student, np.ones(128))
+    student.set_face_encoding(np.full(128, 0.5), 'small')
+    db.session.commit()
+
+    rebuilt = encoding_cache.get_class(student.class_id)
+    assert rebuilt.template_count == 1
+    assert np.allclose(rebuilt.distances(np.full((1, 128), 0.5)), 0.0, atol=1e-5)
@@ -0,0 +1,30 @@
+from app.services.face_geometry import box_iou, clip_box, match_boxes, scale_box
+
+FACE = (10, 60, 60, 10)
+
+
+def test_box_iou():
+    assert box_iou(FACE, FACE) == 1.0
+    assert box_iou(FACE, (100, 150, 150, 100)) == 0.0
+    assert abs(box_iou(FACE, (10, 85, 60, 35)) - 1 / 3.0) < 1e-9
+
+
+def test_match_boxes_requires_iou():
+    # Deteksi yang bergeser jauh bukan true positive walaupun jumlahnya sama
+    assert match_boxes([(10, 85, 60, 35)], [FACE], 0.5) == []
+    assert match_boxes([(12, 62, 62, 12)], [FACE], 0.5) == [(0, 0)]
+
+
+def test_match_boxes_one_to_one():
+    truth = [FACE, (10, 160, 60, 110)]
+    predicted = [(11, 61, 61, 11), (10, 60, 60, 10), (10, 161, 60, 111)]
+    matches = match_boxes(predicted, truth, 0.5)
+    assert sorted(j for _, j in matches) == [0, 1]
+    assert (1, 0) in matches
+
+
+def test_scale_and_clip():
+    assert scale_box(FACE, 2) == (20, 120, 120, 20)
+    assert scale_box(FACE, 2, 0.5) == (5, 120, 30, 20)
+    assert clip_box((-5, 200, 40, 20), 100, 50) == (0, 100, 40, 20)
+    assert clip_box((60, 200, 80, 20), 100, 50) is None
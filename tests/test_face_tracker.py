@@ -0,0 +1,49 @@
+from app.services.encoding_cache import CachedStudent
+from app.services.face_tracker import FaceTracker
+from app.services.session_state import ActiveSessionState
+
+BOX = (100, 200, 200, 100)
+STUDENT = CachedStudent(1, 'NIM1', 'Mahasiswa 1')
+
+
+def test_identity_carried_between_frames():
+    tracker = FaceTracker(reverify_frames=3)
+    track, = tracker.update([BOX], now=0.0)
+    assert tracker.needs_encoding(track)
+    tracker.identify(track, STUDENT, 0.9)
+
+    moved, = tracker.update([(104, 204, 204, 104)], now=0.1)
+    assert moved is track
+    assert moved.student is STUDENT
+    assert not tracker.needs_encoding(moved)
+
+
+def test_reverify_after_n_frames():
+    tracker = FaceTracker(reverify_frames=2)
+    track, = tracker.update([BOX], now=0.0)
+    tracker.identify(track, STUDENT, 0.9)
+    tracker.update([BOX], now=0.1)
+    track, = tracker.update([BOX], now=0.2)
+    assert tracker.needs_encoding(track)
+
+
+def test_track_expires():
+    tracker = FaceTracker(max_age_seconds=1.0)
+    track, = tracker.update([BOX], now=0.0)
+    tracker.identify(track, STUDENT, 0.9)
+    later, = tracker.update([BOX], now=5.0)
+    assert later is not track
+    assert not later.identified
+
+
+def test_streams_do_not_share_identity():
+    # Dua kamera di sesi yang sama: box di posisi yang sama bukan wajah yang sama
+    state = ActiveSessionState(10, 1, [], tracker_factory=FaceTracker)
+    front = state.tracker('ws:front')
+    track, = front.update([BOX], now=0.0)
+    front.identify(track, STUDENT, 0.9)
+
+    back = state.tracker('ws:back')
+    other, = back.update([BOX], now=0.1)
+    assert not other.identified
+    assert back.needs_encoding(other)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.services.frame_cache import FrameResultCache, dhash, hamming_distance
+
+
+def _frame(seed):
+    return (np.random.default_rng(seed).random((120, 160, 3)) * 255).astype('uint8')
+
+
+def test_dhash_tolerates_noise():
+    frame = _frame(0)
+    noisy = np.clip(frame.astype(np.int16) + np.random.default_rng(1).integers(-2, 3, frame.shape), 0, 255)
+    assert hamming_distance(dhash(frame), dhash(noisy.astype('uint8'))) <= 8
+    assert hamming_distance(dhash(frame), dhash(_frame(2))) > 8
+
+
+def test_lookup_hit_miss_and_mode():
+    cache = FrameResultCache(ttl_seconds=3.0, max_distance=2)
+    cache.store(0b1011, 'single', 'hasil', now=0.0)
+
+    assert cache.lookup(0b1010, 'single', now=1.0) == 'hasil'
+    assert cache.lookup(0b0100, 'single', now=1.0) is None
+    assert cache.lookup(0b1011, 'multi', now=1.0) is None
+
+
+def test_entries_expire():
+    cache = FrameResultCache(ttl_seconds=3.0)
+    cache.store(1, 'single', 'hasil', now=0.0)
+    assert cache.lookup(1, 'single', now=3.5) is None
+    assert len(cache) == 0
+
+
+def test_closest_entry_wins_and_size_is_bounded():
+    cache = FrameResultCache(max_distance=4, max_entries=2)
+    cache.store(0b0000, 'single', 'jauh', now=0.0)
+    cache.store(0b0111, 'single', 'dekat', now=0.0)
+    assert cache.lookup(0b0011, 'single', now=0.0) == 'dekat'
+
+    cache.store(0b1111, 'single', 'baru', now=0.0)
+    assert len(cache) == 2
+    assert cache.lookup(0b0000, 'single', now=0.0) != 'jauh'
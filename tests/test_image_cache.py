@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.services.image_cache import ImageEntry, ImageResultCache
+
+
+def test_get_returns_independent_copy():
+    cache = ImageResultCache()
+    cache.put('key', ImageEntry([(0, 10, 10, 0), (20, 30, 30, 20)]))
+
+    first = cache.get('key')
+    first.set_encoding(0, np.ones(128))
+    # Request lain tidak melihat encoding yang belum di-put
+    assert cache.get('key').encoding(0) is None
+
+    cache.put('key', first)
+    second = cache.get('key')
+    assert np.allclose(second.encoding(0), 1.0)
+    assert second.encoding(1) is None
+    assert second is not cache.get('key')
+
+
+def test_disk_tier_round_trip(tmp_path):
+    entry = ImageEntry([(0, 10, 10, 0)])
+    entry.set_encoding(0, np.full(128, 0.25))
+    ImageResultCache(disk_dir=str(tmp_path)).put('ab' * 20, entry)
+
+    fresh = ImageResultCache(disk_dir=str(tmp_path))
+    loaded = fresh.get('ab' * 20)
+    assert loaded.locations == [(0, 10, 10, 0)]
+    assert np.allclose(loaded.encoding(0), 0.25)
+    assert fresh.stats()['disk_hits'] == 1
+
+
+def test_lru_eviction():
+    cache = ImageResultCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, ImageEntry([]))
+    assert cache.get('a') is None
+    assert cache.get('c') is not None
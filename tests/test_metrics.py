@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+from app.services.metrics import Metrics, retire_worker
+from app.services.timing import StageTimer
+
+
+def _metrics(directory, stale_seconds=86400):
+    metrics = Metrics()
+    metrics.directory = str(directory)
+    metrics.flush_seconds = 3600
+    metrics.stale_seconds = stale_seconds
+    return metrics
+
+
+def _observe(metrics, frames, faces=1):
+    timer = StageTimer()
+    timer.stages['detect'] = 20.0
+    for _ in range(frames):
+        metrics.observe_capture(timer, {'detected': True, 'face_count': faces, 'matched_count': faces})
+
+
+def test_snapshots_of_workers_are_merged(tmp_path):
+    first, second = _metrics(tmp_path), _metrics(tmp_path)
+    _observe(first, 3)
+    _observe(second, 2, faces=2)
+    first.flush()
+
+    merged = second.collect()
+    assert merged['counters']['frames'] == 5
+    assert merged['counters']['faces'] == 7
+    assert merged['stages']['detect'].count == 5
+    assert len(merged['workers']) == 2
+    # Nama file dari id acak per process, bukan PID (kedua instance ada di process yang sama)
+    assert len({worker['worker'] for worker in merged['workers']}) == 2
+
+
+def test_retired_worker_keeps_counters(tmp_path):
+    retiring, alive = _metrics(tmp_path), _metrics(tmp_path)
+    _observe(retiring, 4)
+    retiring.flush()
+
+    retire_worker(str(tmp_path), os.getpid())
+    assert sorted(os.listdir(tmp_path)) == ['retired.json']
+
+    _observe(alive, 1)
+    merged = alive.collect()
+    assert merged['counters']['frames'] == 5
+    assert merged['stages']['detect'].count == 5
+    assert len(merged['workers']) == 1
+
+    # Worker berikutnya yang keluar ditambahkan ke total yang sama
+    retire_worker(str(tmp_path), os.getpid())
+    with open(tmp_path / 'retired.json') as f:
+        assert json.load(f)['counters']['frames'] == 5
+
+
+def test_stale_snapshots_are_pruned(tmp_path):
+    dead, alive = _metrics(tmp_path), _metrics(tmp_path, stale_seconds=60)
+    _observe(dead, 2)
+    dead.flush()
+    stale_path, = [tmp_path / name for name in os.listdir(tmp_path)]
+    old = time.time() - 120
+    os.utime(stale_path, (old, old))
+
+    merged = alive.collect()
+    assert not stale_path.exists()
+    assert merged['counters'].get('frames', 0) == 0
+    assert len(merged['workers']) == 1
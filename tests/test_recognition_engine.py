@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.recognition_engine import EngineBusyError, RecognitionEngine
+
+
+class FakeExecutor:
+    """Executor palsu: broken=True meniru pool yang worker-nya mati"""
+
+    def __init__(self, broken=False, hang=False):
+        self.broken = broken
+        self.hang = hang
+        self.shut_down = False
+
+    def submit(self, task, *args):
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool('worker mati'))
+        elif not self.hang:
+            future.set_result(task(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def _engine(monkeypatch, executors, task_timeout=1):
+    engine = RecognitionEngine()
+    engine.workers = 1
+    engine.queue_size = 1
+    engine.task_timeout = task_timeout
+    engine._slots = threading.BoundedSemaphore(2)
+
+    def ensure():
+        if engine._executor is None:
+            engine._executor = executors.pop(0)
+        return engine._executor
+
+    monkeypatch.setattr(engine, '_ensure_executor', ensure)
+    return engine
+
+
+def test_broken_pool_is_rebuilt_and_retried_once(monkeypatch):
+    broken = FakeExecutor(broken=True)
+    engine = _engine(monkeypatch, [broken, FakeExecutor()])
+
+    assert engine.run(lambda x: x * 2, 21) == 42
+    assert broken.shut_down
+    stats = engine.stats()
+    assert stats['restarts'] == 1
+    assert stats['failed'] == 1
+    assert stats['completed'] == 1
+    assert engine._slots.acquire(blocking=False) and engine._slots.acquire(blocking=False)
+
+
+def test_broken_pool_twice_raises(monkeypatch):
+    engine = _engine(monkeypatch, [FakeExecutor(broken=True), FakeExecutor(broken=True)])
+
+    with pytest.raises(BrokenProcessPool):
+        engine.run(lambda: None)
+    assert engine.stats()['restarts'] == 2
+
+
+def test_timeout_maps_to_engine_busy(monkeypatch):
+    engine = _engine(monkeypatch, [FakeExecutor(hang=True)], task_timeout=0.01)
+
+    with pytest.raises(EngineBusyError):
+        engine.run(lambda: None)
+    stats = engine.stats()
+    assert stats['timed_out'] == 1
+    # Task yang belum mulai dibatalkan dan slot-nya kembali
+    assert stats['failed'] == 1
+    assert engine._slots.acquire(blocking=False) and engine._slots.acquire(blocking=False)
@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services.encoding_cache import CachedStudent, ClassEncodings
+from app.services.face_tracker import FaceTracker
+from app.services.session_state import ActiveSessionState, MAX_TRACKERS_PER_SESSION
+
+
+def _class_encodings(student_ids):
+    matrix = np.random.rand(len(student_ids), 128).astype(np.float32)
+    students = [CachedStudent(student_id, f'NIM{student_id}', f'Mahasiswa {student_id}')
+                for student_id in student_ids]
+    return ClassEncodings(1, np.array(student_ids), matrix, students)
+
+
+def test_views_split_present_and_remaining():
+    state = ActiveSessionState(10, 1, [2])
+    class_encodings = _class_encodings([1, 2, 3])
+
+    remaining, present = state.views(class_encodings)
+    assert list(remaining.student_ids) == [1, 3]
+    assert list(present.student_ids) == [2]
+    # View di-cache selama present_ids dan matrix kelas tidak berubah
+    assert state.views(class_encodings)[0] is remaining
+
+    state.mark_present(3)
+    assert state.is_present(3)
+    assert state.present_count == 2
+    remaining, present = state.views(class_encodings)
+    assert list(remaining.student_ids) == [1]
+    assert list(present.student_ids) == [2, 3]
+
+
+def test_mark_present_existing_keeps_views():
+    state = ActiveSessionState(10, 1, [2])
+    class_encodings = _class_encodings([1, 2])
+    remaining, _ = state.views(class_encodings)
+
+    state.mark_present(2)
+    assert state.views(class_encodings)[0] is remaining
+
+
+def test_tracker_per_stream():
+    state = ActiveSessionState(10, 1, [], tracker_factory=FaceTracker)
+
+    assert state.tracker(None) is None
+    first = state.tracker('ws:a')
+    assert state.tracker('ws:a') is first
+    assert state.tracker('ws:b') is not first
+
+    state.release_tracker('ws:a')
+    assert state.tracker('ws:a') is not first
+
+
+def test_tracker_disabled():
+    state = ActiveSessionState(10, 1, [])
+    assert state.tracker('ws:a') is None
+
+
+def test_trackers_are_bounded():
+    state = ActiveSessionState(10, 1, [], tracker_factory=FaceTracker)
+    oldest = state.tracker('client-0')
+    for i in range(1, MAX_TRACKERS_PER_SESSION + 1):
+        state.tracker(f'client-{i}')
+    assert state.tracker('client-0') is not oldest
@@ -0,0 +1,60 @@
+import numpy as np
+
+from app.services.vector_index import IVFIndex
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).random((n, 128), dtype=np.float32)
+
+
+def _exact_nearest(vectors, query):
+    return int(np.argmin(np.linalg.norm(vectors - query, axis=1)))
+
+
+def test_single_list_is_exact():
+    vectors = _vectors(200)
+    index = IVFIndex()
+    index.build(np.arange(200), vectors)
+
+    for row in (0, 57, 199):
+        query = vectors[row] + 0.001
+        ids, distances = index.search(query, k=3)
+        assert ids[0] == _exact_nearest(vectors, query)
+        assert list(distances) == sorted(distances)
+
+
+def test_probing_all_lists_matches_exact_search():
+    vectors = _vectors(500, seed=1)
+    index = IVFIndex(n_lists=8, n_probe=8, pca_dim=32)
+    index.build(np.arange(500), vectors)
+    assert sum(index.list_sizes()) == 500
+
+    query = _vectors(1, seed=2)[0]
+    ids, _ = index.search(query)
+    assert ids[0] == _exact_nearest(vectors, query)
+
+
+def test_add_replaces_and_remove_deletes():
+    vectors = _vectors(50)
+    index = IVFIndex()
+    index.build(np.arange(50), vectors)
+
+    replacement = _vectors(1, seed=3)
+    index.add([7], replacement)
+    assert len(index) == 50
+    ids, distances = index.search(replacement[0])
+    assert ids[0] == 7 and distances[0] < 1e-3
+
+    index.remove([7, 999])
+    assert 7 not in index
+    assert len(index) == 49
+    assert 7 not in index.search(replacement[0], k=5)[0]
+
+
+def test_needs_retrain_after_growth():
+    index = IVFIndex()
+    assert index.needs_retrain()
+    index.build(np.arange(10), _vectors(10))
+    assert not index.needs_retrain()
+    index.add(np.arange(10, 30), _vectors(20, seed=4))
+    assert index.needs_retrain()